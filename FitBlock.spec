@@ -7,33 +7,14 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('icon.icns', '.')] if os.path.exists('icon.icns') else [],
+    # The PyObjC frameworks and Tk are imported inside functions, once FitBlock
+    # needs them; build_app.py warns if any of these stops resolving.
     hiddenimports=[
-        'Quartz',
-        'Foundation', 
-        'AppKit',
-        'PyObjCTools',
         'objc',
-        'objc._objc',
-        'objc._pyobjc',
+        'Foundation',
+        'AppKit',
+        'Quartz',
         'tkinter',
-        'tkinter.ttk',
-        'tkinter.messagebox',
-        'PyObjCTools.AppHelper',
-        'PyObjCTools.NibClassBuilder',
-        'PyObjCTools.Conversion',
-        'PyObjCTools.KeyValueCoding',
-        'PyObjCTools.LazyProperty',
-        'PyObjCTools.NSObjectController',
-        'PyObjCTools.NSObjectControllerHelper',
-        'PyObjCTools.NSObjectControllerHelper2',
-        'PyObjCTools.NSObjectControllerHelper3',
-        'PyObjCTools.NSObjectControllerHelper4',
-        'PyObjCTools.NSObjectControllerHelper5',
-        'PyObjCTools.NSObjectControllerHelper6',
-        'PyObjCTools.NSObjectControllerHelper7',
-        'PyObjCTools.NSObjectControllerHelper8',
-        'PyObjCTools.NSObjectControllerHelper9',
-        'PyObjCTools.NSObjectControllerHelper10',
     ],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark control-socket round trips with many concurrent clients.
+
+Each client opens a fresh connection per request, like `main.py ctl status`
+run from a fleet script, while a writer thread keeps mutating the state.
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import control  # noqa: E402
+from state_store import StateStore  # noqa: E402
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    requests_per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    store = StateStore({'paused': False, 'sessions_completed': 0})
+    cache = {'version': None, 'response': None}
+
+    def status():
+        version, state = store.snapshot()
+        if cache['version'] != version:
+            cache['response'] = control.encode_response(dict(state, version=version))
+            cache['version'] = version
+        return cache['response']
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "fitblock.sock")
+        server = control.ControlServer(path, {'status': status})
+        server.start()
+
+        stop = threading.Event()
+
+        def writer():
+            while not stop.is_set():
+                with store.transaction() as state:
+                    state['sessions_completed'] += 1
+                    state['paused'] = not state['paused']
+                time.sleep(0.001)
+
+        latencies = []
+        torn = []
+
+        def client():
+            local = []
+            for _ in range(requests_per_client):
+                t0 = time.perf_counter()
+                result = control.request(path, "status")
+                local.append(time.perf_counter() - t0)
+                # paused flips together with every increment, so parity must match.
+                if (result['sessions_completed'] % 2 == 1) != result['paused']:
+                    torn.append(result)
+            latencies.extend(local)
+
+        writer_thread = threading.Thread(target=writer)
+        writer_thread.start()
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        writer_thread.join()
+        server.stop()
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"Control socket benchmark ({clients} clients x {requests_per_client} requests)")
+    print(f"throughput: {total / elapsed:8.0f} req/s")
+    print(f"latency:    p50 {statistics.median(latencies) * 1e6:6.0f} us  "
+          f"p99 {latencies[int(total * 0.99) - 1] * 1e6:6.0f} us  "
+          f"max {latencies[-1] * 1e6:6.0f} us")
+    print(f"torn reads: {len(torn)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark the session helper protocol against a stub helper process.
+
+Spawning the helper is paid once at launch; after that a session costs a
+BEGIN and an END round trip, which should stay in the low milliseconds.
+The helper's own log lines are hidden unless --verbose is given.
+
+    python3 benchmarks/bench_helper.py [--verbose] [CALLS]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from helper import HelperClient  # noqa: E402
+
+
+def per_call(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the session helper protocol.")
+    parser.add_argument("calls", type=int, nargs="?", default=2000, help="ping round trips to time")
+    parser.add_argument("--verbose", action="store_true", help="show the helper's log output")
+    args = parser.parse_args()
+    n = args.calls
+
+    with tempfile.TemporaryDirectory() as directory:
+        journal = os.path.join(directory, "recovery.plist")
+        start = time.perf_counter()
+        client = HelperClient.spawn([sys.executable, os.path.join(ROOT, "helper.py")],
+                                    ["--stub", "--journal", journal],
+                                    output=None if args.verbose else subprocess.DEVNULL)
+        client.ping()
+        print(f"spawn + first ping   {(time.perf_counter() - start) * 1e3:8.1f} ms")
+
+        print(f"ping round trip      {per_call(client.ping, n) * 1e6:8.1f} us")
+
+        def session():
+            client.begin('full', time.time())
+            client.end()
+        print(f"begin + end          {per_call(session, max(1, n // 200)) * 1e3:8.2f} ms")
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark menu updates: full NSMenu rebuild per tick vs. the diffing menu model.
+
+Runs on any platform; NSMenu/NSMenuItem are replaced by counting fakes.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from menu_model import SEPARATOR, MenuModel, compute_menu_items  # noqa: E402
+
+allocations = {'objects': 0, 'setters': 0}
+
+
+class FakeMenuItem:
+    def __init__(self, title="", action=None, key_equivalent=""):
+        allocations['objects'] += 1
+        self._title = title
+        self.action = action
+        self.key_equivalent = key_equivalent
+        self.enabled = True
+        self.target = None
+
+    def title(self):
+        return self._title
+
+    def setTitle_(self, title):
+        allocations['setters'] += 1
+        self._title = title
+
+    def setAction_(self, action):
+        allocations['setters'] += 1
+        self.action = action
+
+    def setEnabled_(self, enabled):
+        allocations['setters'] += 1
+        self.enabled = enabled
+
+    def setTarget_(self, target):
+        allocations['setters'] += 1
+        self.target = target
+
+
+class FakeMenu:
+    def __init__(self):
+        allocations['objects'] += 1
+        self.items = []
+
+    def addItem_(self, item):
+        self.items.append(item)
+
+
+def render_full(state, now):
+    """Mirror of the old update_menu(): a new menu and items every tick."""
+    menu = FakeMenu()
+    for spec in compute_menu_items(state, now):
+        if spec.title is SEPARATOR:
+            item = FakeMenuItem()
+        else:
+            item = FakeMenuItem(spec.title, spec.action, spec.key_equivalent)
+            if spec.action:
+                item.setTarget_(None)
+            item.setEnabled_(spec.enabled)
+        menu.addItem_(item)
+    return menu
+
+
+class DiffRenderer:
+    """Mirror of AppDelegate.update_menu() on top of MenuModel."""
+
+    def __init__(self):
+        self.model = MenuModel()
+        self.items = {}
+
+    def render(self, state, now):
+        diff = self.model.update(state, now)
+        if diff.rebuild:
+            render_full(state, now)
+            self.items = {spec.key: FakeMenuItem(spec.title) for spec in diff.items}
+            return
+        for spec in diff.changed:
+            item = self.items[spec.key]
+            if item.title() != spec.title:
+                item.setTitle_(spec.title)
+            item.setAction_(spec.action)
+            item.setEnabled_(spec.enabled)
+
+
+def run(name, render, state, ticks):
+    start = datetime(2025, 1, 1, 9, 0, 0)
+
+    t0 = time.perf_counter()
+    for tick in range(ticks):
+        render(state, start + timedelta(seconds=tick))
+    elapsed = time.perf_counter() - t0
+
+    allocations['objects'] = allocations['setters'] = 0
+    peak_bytes = 0
+    tracemalloc.start()
+    for tick in range(ticks):
+        now = start + timedelta(seconds=ticks + tick)
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        render(state, now)
+        peak_bytes += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    print(f"{name:<26} {elapsed / ticks * 1e6:7.1f} us/tick "
+          f"{allocations['objects'] / ticks:6.2f} menu objs/tick "
+          f"{allocations['setters'] / ticks:6.2f} setters/tick "
+          f"{peak_bytes / ticks:8.0f} B peak/tick")
+
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 3600
+    idle = {
+        'start_time': datetime(2024, 12, 1, 8, 0, 0),
+        'sessions_completed': 42,
+        'current_session_start': None,
+        'paused': False,
+        'pause_start_time': None,
+    }
+    active = dict(idle, current_session_start=datetime(2025, 1, 1, 9, 0, 0))
+
+    print(f"Menu update benchmark ({ticks} ticks at 1 Hz simulated time)")
+    for label, state in (("idle", idle), ("active session", active)):
+        run(f"rebuild ({label})", render_full, state, ticks)
+        run(f"diff ({label})", DiffRenderer().render, state, ticks)
+
+
+if __name__ == "__main__":
+    main()
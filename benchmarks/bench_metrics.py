@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark metric recording and /metrics scrapes.
+
+Recording sits on the session path, so it has to stay in the sub-microsecond
+range. Scrapes are served from the cached exposition unless a metric changed.
+"""
+
+import os
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import MetricsServer, Registry  # noqa: E402
+
+
+def per_call(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    registry = Registry()
+    counter = registry.counter("bench_total", "Counter.")
+    phases = registry.histogram("bench_phase_seconds", "Histogram.", label="phase",
+                                label_values=('a', 'b', 'c', 'd'))
+
+    print(f"counter.inc          {per_call(counter.inc, n) * 1e9:8.0f} ns")
+    print(f"histogram.observe    {per_call(lambda: phases.observe(0.3, 'b'), n) * 1e9:8.0f} ns")
+
+    def timed():
+        with phases.time('c'):
+            pass
+    print(f"histogram.time       {per_call(timed, n) * 1e9:8.0f} ns")
+
+    registry.render()
+    print(f"render (cached)      {per_call(registry.render, n) * 1e9:8.0f} ns")
+
+    def changed():
+        counter.inc()
+        registry.render()
+    print(f"render (changed)     {per_call(changed, n // 100) * 1e6:8.1f} us")
+
+    server = MetricsServer(registry, 0)
+    server.start()
+    url = f"http://127.0.0.1:{server.port}/metrics"
+    scrapes = 200
+    elapsed = per_call(lambda: urllib.request.urlopen(url).read(), scrapes)
+    server.stop()
+    print(f"HTTP scrape          {elapsed * 1e6:8.1f} us ({len(registry.render())} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark time-to-visible-lock: persistent overlay vs. a new window per session.
+
+Uses the real tkinter when a display is available and the recording fake from
+fake_platform otherwise (which only measures the Python side of the work).
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from countdown import CountdownEngine  # noqa: E402
+from overlay import OverlayManager, TkRenderer  # noqa: E402
+
+
+def load_tk():
+    import tkinter
+    try:
+        tkinter.Tk().destroy()
+        return tkinter, "real Tk"
+    except tkinter.TclError:
+        import fake_platform
+        fake_platform.install()
+        return sys.modules['tkinter'], "fake Tk (no display)"
+
+
+def run(manager, sessions):
+    """Return time-to-visible samples (seconds) for sessions short sessions."""
+    samples = []
+    for _ in range(sessions):
+        countdown = CountdownEngine(0.001, manager.renderer.set_timer_text, manager.renderer.set_info_text,
+                                    info_text=lambda: "Session #1")
+        visible = []
+        start = time.perf_counter()
+        asyncio.run(manager.run_session(countdown, on_visible=lambda: visible.append(time.perf_counter())))
+        samples.append(visible[0] - start)
+    return samples
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    tk, label = load_tk()
+    print(f"Time to visible lock over {sessions} sessions ({label})")
+
+    medians = {}
+    for name, persistent in (("create per session", False), ("persistent overlay", True)):
+        manager = OverlayManager(TkRenderer(tk), persistent=persistent)
+        if persistent:
+            start = time.perf_counter()
+            manager.prepare()
+            print(f"  (startup prepare: {(time.perf_counter() - start) * 1000:.2f} ms)")
+        samples = sorted(run(manager, sessions))
+        medians[persistent] = statistics.median(samples)
+        print(f"{name:<20} median {statistics.median(samples) * 1000:8.3f} ms  "
+              f"p95 {samples[int(len(samples) * 0.95) - 1] * 1000:8.3f} ms  "
+              f"windows created {manager.renderer.windows_created}")
+        manager.renderer.destroy()
+
+    created, persistent = medians[False], medians[True]
+    if persistent < created:
+        print(f"persistent overlay is {created / persistent:.1f}x faster per session")
+    else:
+        print(f"persistent overlay is {persistent / created:.1f}x slower per session")
+    if label != "real Tk":
+        print("the fake Tk creates no real window, so it cannot show the window-creation "
+              "cost the persistent overlay saves; run with a display for that")
+
+
+if __name__ == "__main__":
+    main()
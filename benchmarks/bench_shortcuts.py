@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark shortcut disable/restore: the old per-hotkey path against the
+batched DefaultsStore path, process spawns included.
+
+The old implementation ran one `defaults write` per hotkey plus
+`killall SystemUIServer`, each way. The batched path runs `defaults export`,
+`defaults import` and `killall`. Where `defaults` exists both paths run it
+for real against a scratch domain; elsewhere every `defaults` call on both
+paths is stood in by a `/bin/true` spawn, a lower bound for each. Neither
+path restarts the real SystemUIServer: its `killall` is a `/bin/true` spawn
+on both sides.
+"""
+
+import os
+import plistlib
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shortcuts import (HOTKEYS_KEY, SHORTCUTS_TO_DISABLE, DefaultsStore,  # noqa: E402
+                       ShortcutManager)
+
+TRUE = "/bin/true" if os.path.exists("/bin/true") else "true"
+HAVE_DEFAULTS = sys.platform == "darwin" and shutil.which("defaults") is not None
+SCRATCH_DOMAIN = "com.fitblock.bench-shortcuts"
+OLD_ENTRY = '{"enabled" = %d; "value" = { "parameters" = (); "type" = "standard"; };}'
+
+
+def make_hotkeys_plist(path):
+    """Write a plist resembling a real symbolichotkeys domain."""
+    hotkeys = {}
+    for i in range(200):
+        hotkeys[str(i)] = {
+            'enabled': i % 7 != 0,
+            'value': {'parameters': [65535, i, 1048576], 'type': 'standard'},
+        }
+    # A few of the managed hotkeys are absent (system default) or user-disabled.
+    hotkeys.pop("162", None)
+    hotkeys.pop("163", None)
+    hotkeys["98"]['enabled'] = False
+    with open(path, 'wb') as f:
+        plistlib.dump({HOTKEYS_KEY: hotkeys}, f)
+
+
+def spawn(argv):
+    subprocess.run(argv, check=True, capture_output=True)
+
+
+class BenchStore(DefaultsStore):
+    """DefaultsStore on the scratch domain, or on in-memory `defaults export` output.
+
+    Without `defaults`, load() and save() still parse and serialise the XML
+    the real commands exchange, and spawn /bin/true in place of each command
+    (unless spawning is false, which leaves only the in-process plist work).
+    """
+
+    def __init__(self, exported, spawning=True):
+        super().__init__(SCRATCH_DOMAIN)
+        self.exported = exported
+        self.spawning = spawning
+
+    def load(self):
+        if HAVE_DEFAULTS and self.spawning:
+            return super().load()
+        self._stand_in()
+        return plistlib.loads(self.exported)
+
+    def save(self, data):
+        if HAVE_DEFAULTS and self.spawning:
+            return super().save(data)
+        self._stand_in()
+        self.exported = plistlib.dumps(data)
+
+    def reload(self):
+        self._stand_in()  # killall SystemUIServer
+
+    def _stand_in(self):
+        self.spawns += 1
+        if self.spawning:
+            spawn([TRUE])
+
+
+def old_path(enabled):
+    """The pre-batching implementation: one `defaults write` per hotkey, then killall."""
+    for shortcut in SHORTCUTS_TO_DISABLE:
+        if HAVE_DEFAULTS:
+            spawn(["defaults", "write", SCRATCH_DOMAIN, HOTKEYS_KEY, "-dict-add", shortcut, OLD_ENTRY % enabled])
+        else:
+            spawn([TRUE])
+    spawn([TRUE])  # killall SystemUIServer
+    return len(SHORTCUTS_TO_DISABLE) + 1
+
+
+def time_rounds(rounds, disable, restore):
+    """Mean seconds of disable() and restore() over rounds, and the spawns of one round each way."""
+    disable_total = restore_total = 0.0
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        disable_spawns = disable()
+        t1 = time.perf_counter()
+        restore_spawns = restore()
+        t2 = time.perf_counter()
+        disable_total += t1 - t0
+        restore_total += t2 - t1
+    return disable_total / rounds, restore_total / rounds, disable_spawns, restore_spawns
+
+
+def time_store(store, rounds):
+    """time_rounds() for a ShortcutManager on store; also checks the restore round trip."""
+    manager = ShortcutManager(store)
+
+    def counted(step):
+        def run():
+            before = store.spawns
+            step()
+            return store.spawns - before
+        return run
+
+    original = store.load()
+    snapshot = manager.disable()
+    manager.restore()
+    result = time_rounds(rounds, counted(manager.disable), counted(manager.restore))
+    assert store.load() == original, "restore did not reproduce the original hotkeys"
+    return result, len(snapshot)
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "com.apple.symbolichotkeys.plist")
+        make_hotkeys_plist(path)
+        with open(path, 'rb') as f:
+            exported = f.read()
+
+        if HAVE_DEFAULTS:
+            spawn(["defaults", "import", SCRATCH_DOMAIN, path])
+        try:
+            batched, changed = time_store(BenchStore(exported), rounds)
+            old = time_rounds(rounds, lambda: old_path(0), lambda: old_path(1))
+        finally:
+            if HAVE_DEFAULTS:
+                subprocess.run(["defaults", "delete", SCRATCH_DOMAIN], capture_output=True)
+        in_process, _ = time_store(BenchStore(exported, spawning=False), rounds)
+
+    source = (f"real `defaults` on {SCRATCH_DOMAIN}" if HAVE_DEFAULTS
+              else "`defaults` stood in by /bin/true on both paths")
+    print(f"Shortcut benchmark ({rounds} rounds, {changed} of {len(SHORTCUTS_TO_DISABLE)} "
+          f"hotkeys changed, {source})")
+    print(f"{'':<28} {'disable':>10} {'restore':>10} {'spawns':>8}")
+    for name, (disable, restore, disable_spawns, restore_spawns) in (
+            ("old path (per hotkey)", old), ("batched path", batched)):
+        print(f"{name:<28} {disable * 1e3:7.2f} ms {restore * 1e3:7.2f} ms "
+              f"{disable_spawns:>3} + {restore_spawns:<3}")
+    print(f"{'batched, plist work only':<28} {in_process[0] * 1e3:7.2f} ms {in_process[1] * 1e3:7.2f} ms")
+    old_total, batched_total = old[0] + old[1], batched[0] + batched[1]
+    if batched_total < old_total:
+        print(f"batched path is {old_total / batched_total:.1f}x faster per session")
+    else:
+        print(f"batched path is {batched_total / old_total:.1f}x slower per session: "
+              "its plist work outweighs the spawns it saves here")
+    print("restore round-trip: identical")
+
+
+if __name__ == "__main__":
+    main()
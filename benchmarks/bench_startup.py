@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark FitBlock's startup: the import of main.py, the command-line paths,
+and what each platform backend adds when it is first loaded.
+
+Every measurement runs in a fresh interpreter, because import time is only
+paid once per process. Where PyObjC is missing (or with --fake) the backends
+are loaded against the recording fakes from fake_platform.py, which still
+shows the cost of FitBlock's own code around them.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+
+CHILD_SETUP = f"""
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {ROOT!r})
+sys.path.insert(0, {BENCH_DIR!r})
+FAKE = %s
+if not FAKE:
+    try:
+        import objc
+    except ImportError:
+        FAKE = True
+if FAKE:
+    import fake_platform
+    fake_platform.install()
+    fake_platform.stub_subprocess()
+"""
+
+# Each snippet runs after CHILD_SETUP and prints {"seconds": ...} for the step it times.
+BACKENDS = {
+    'input_blocker': "import main\nt = time.perf_counter()\nmain.load_input_blocker()\n",
+    'overlay': "import main\nt = time.perf_counter()\nmain.overlay.prepare()\n",
+    'menu_bar': ("import main\nt = time.perf_counter()\nimport menu_bar\n"
+                 "menu_bar.create_delegate(main).applicationDidFinishLaunching_(None)\n"),
+    'notifier': "import main\nt = time.perf_counter()\nmain.notifier.start()\n",
+}
+
+TIME_TO_MENU_BAR = ("import contextlib, io\n"
+                    "with contextlib.redirect_stdout(io.StringIO()):\n"
+                    "    import main, menu_bar\n"
+                    "    main.load_state()\n"
+                    "    menu_bar.create_delegate(main).applicationDidFinishLaunching_(None)\n"
+                    "t = start\n")
+
+
+def run_child(code, home, fake):
+    """Run one snippet in a new interpreter and return the seconds it reports."""
+    script = CHILD_SETUP % fake + code + (
+        "import json\nsys.__stdout__.write(json.dumps({'seconds': time.perf_counter() - t}) + '\\n')\n")
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                            env=dict(os.environ, HOME=home), cwd=ROOT)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])['seconds']
+
+
+def run_command(argv, home):
+    """Wall time of one main.py invocation, interpreter startup included."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(ROOT, "main.py")] + argv, capture_output=True,
+                   env=dict(os.environ, HOME=home), cwd=ROOT)
+    return time.perf_counter() - start
+
+
+def run_bare_interpreter(home):
+    """Wall time of an interpreter that does nothing, the floor for every command."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], env=dict(os.environ, HOME=home))
+    return time.perf_counter() - start
+
+
+def median_ms(fn, repeats):
+    return statistics.median(fn() for _ in range(repeats)) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--fake", action="store_true", help="use the fake platform even where PyObjC exists")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as home:
+        results['interpreter'] = median_ms(lambda: run_bare_interpreter(home), args.repeats)
+        results['import_main'] = median_ms(
+            lambda: run_child("t = time.perf_counter()\nimport main\n", home, args.fake), args.repeats)
+        results['ctl_status'] = median_ms(lambda: run_command(["ctl", "status"], home), args.repeats)
+        results['stats'] = median_ms(lambda: run_command(["stats"], home), args.repeats)
+
+        for name, code in BACKENDS.items():
+            try:
+                results[f'backend_{name}'] = median_ms(lambda: run_child(code, home, args.fake), args.repeats)
+            except RuntimeError as e:
+                results[f'backend_{name}'] = None
+                print(f"{name}: {e}")
+
+        results['time_to_menu_bar'] = median_ms(lambda: run_child(TIME_TO_MENU_BAR, home, args.fake),
+                                                args.repeats)
+
+    print(f"{'interpreter (python -c pass)':<32} {results['interpreter']:8.1f} ms")
+    print(f"{'import main':<32} {results['import_main']:8.1f} ms")
+    print(f"{'main.py ctl status (no app)':<32} {results['ctl_status']:8.1f} ms")
+    print(f"{'main.py stats':<32} {results['stats']:8.1f} ms")
+    for name in BACKENDS:
+        value = results[f'backend_{name}']
+        text = f"{value:8.1f} ms" if value is not None else "  unavailable"
+        print(f"{'backend ' + name:<32} {text}")
+    print(f"{'time to menu bar':<32} {results['time_to_menu_bar']:8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
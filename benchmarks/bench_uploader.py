@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark session uploads against the reference collector on localhost.
+
+submit() runs at the end of every session and has to stay in microseconds.
+The catch-up case is a laptop that was offline for a while: its spool is
+already full when the uploader starts, and should drain in a few batches.
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import collector  # noqa: E402
+from uploader import SessionUploader  # noqa: E402
+
+START = 1700000000.0
+
+
+def fill_spool(spool, n):
+    """Spool n sessions while the collector is unreachable."""
+    offline = SessionUploader("http://127.0.0.1:9/sessions", spool, backoff=3600)
+    with contextlib.redirect_stdout(io.StringIO()):
+        offline.start()
+        start = time.perf_counter()
+        for i in range(n):
+            offline.submit(START + i * 3600, START + i * 3600 + 120, 120, False)
+        elapsed = time.perf_counter() - start
+        offline.close()
+    return elapsed / n
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    with tempfile.TemporaryDirectory() as directory:
+        server = collector.make_server(os.path.join(directory, "sessions.db"), port=0, quiet=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/sessions"
+        spool = os.path.join(directory, "spool")
+
+        print(f"submit()                 {fill_spool(spool, n) * 1e6:8.1f} us")
+        spooled = os.path.getsize(os.path.join(spool, "sessions.jsonl"))
+
+        uploader = SessionUploader(url, spool)
+        start = time.perf_counter()
+        uploader.start()
+        while uploader.pending():
+            time.sleep(0.005)
+        elapsed = time.perf_counter() - start
+        uploader.close()
+        print(f"catch up {n} sessions  {elapsed * 1e3:8.1f} ms in {uploader.batches} batches "
+              f"({spooled / 1024:.0f} KB spooled, {uploader.bytes_sent / 1024:.0f} KB sent)")
+
+        # The same sessions again, as after a lost response: nothing may be counted twice.
+        fill_spool(spool, n)
+        uploader = SessionUploader(url, spool)
+        uploader.start()
+        while uploader.pending():
+            time.sleep(0.005)
+        uploader.close()
+        completed = sum(machine['completed'] for machine in server.store.summary().values())
+        print(f"resent {n}, collector holds {completed} sessions")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Stand-ins for objc, Foundation, AppKit and tkinter, plus a subprocess stub.
+
+install() puts them (and fake_quartz as Quartz) into sys.modules so that
+menu_bar.py, the overlay window and the event tap load on any platform and
+run their real code against objects that only record what was done.
+"""
+
+import builtins
+import os
+import plistlib
+import subprocess
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_quartz  # noqa: E402
+
+counters = {'menu_objects': 0, 'menu_setters': 0, 'windows': 0, 'subprocesses': 0}
+
+
+# -- objc / Foundation -------------------------------------------------------
+
+class NSObject:
+    @classmethod
+    def alloc(cls):
+        return cls.__new__(cls)
+
+    def init(self):
+        return self
+
+    def performSelectorOnMainThread_withObject_waitUntilDone_(self, selector, obj, wait):
+        getattr(self, selector.replace(":", "_"))(obj)
+
+
+class _Observers:
+    def __init__(self):
+        self.observers = []
+
+    def addObserver_selector_name_object_(self, observer, selector, name, obj):
+        self.observers.append((observer, selector, name))
+
+
+_default_center = _Observers()
+
+
+class NSNotificationCenter:
+    @staticmethod
+    def defaultCenter():
+        return _default_center
+
+
+class NSTimer:
+    def __init__(self, interval, target, selector, repeats):
+        self.interval = interval
+        self.target = target
+        self.selector = selector
+        self.valid = True
+
+    @classmethod
+    def timerWithTimeInterval_target_selector_userInfo_repeats_(cls, interval, target, selector, info, repeats):
+        return cls(interval, target, selector, repeats)
+
+    def invalidate(self):
+        self.valid = False
+
+
+class _RunLoop:
+    def __init__(self):
+        self.timers = []
+
+    def addTimer_forMode_(self, timer, mode):
+        self.timers.append(timer)
+
+
+_main_run_loop = _RunLoop()
+
+
+class NSRunLoop:
+    @staticmethod
+    def currentRunLoop():
+        return _main_run_loop
+
+
+def NSLog(message, *args):
+    pass
+
+
+# -- AppKit ------------------------------------------------------------------
+
+class NSMenuItem(NSObject):
+    def initWithTitle_action_keyEquivalent_(self, title, action, key_equivalent):
+        counters['menu_objects'] += 1
+        self._title = title
+        self.action = action
+        self.key_equivalent = key_equivalent
+        self.enabled = True
+        self.target = None
+        return self
+
+    @classmethod
+    def separatorItem(cls):
+        return cls.alloc().initWithTitle_action_keyEquivalent_("", None, "")
+
+    def title(self):
+        return self._title
+
+    def setTitle_(self, title):
+        counters['menu_setters'] += 1
+        self._title = title
+
+    def setAction_(self, action):
+        counters['menu_setters'] += 1
+        self.action = action
+
+    def setEnabled_(self, enabled):
+        counters['menu_setters'] += 1
+        self.enabled = enabled
+
+    def setTarget_(self, target):
+        counters['menu_setters'] += 1
+        self.target = target
+
+
+class NSMenu(NSObject):
+    def init(self):
+        counters['menu_objects'] += 1
+        self.items = []
+        self.delegate = None
+        return self
+
+    def setDelegate_(self, delegate):
+        self.delegate = delegate
+
+    def addItem_(self, item):
+        self.items.append(item)
+
+
+class _Button:
+    def setImage_(self, image):
+        self.image = image
+
+    def setTitle_(self, title):
+        self.title = title
+
+
+class _StatusItem:
+    def __init__(self):
+        self._button = _Button()
+        self.menu = None
+
+    def button(self):
+        return self._button
+
+    def setMenu_(self, menu):
+        self.menu = menu
+
+
+class NSStatusBar:
+    @staticmethod
+    def systemStatusBar():
+        return NSStatusBar()
+
+    def statusItemWithLength_(self, length):
+        return _StatusItem()
+
+
+class NSImage(NSObject):
+    def initByReferencingFile_(self, path):
+        self.path = path
+        return self
+
+    def isValid(self):
+        return False
+
+
+class NSApplication:
+    _shared = None
+
+    @classmethod
+    def sharedApplication(cls):
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def setDelegate_(self, delegate):
+        self.delegate = delegate
+
+    def run(self):
+        pass
+
+    def terminate_(self, sender):
+        pass
+
+    def performSelectorOnMainThread_withObject_waitUntilDone_(self, selector, argument, wait):
+        getattr(self, selector.replace(":", "_"))(argument)
+
+
+class NSWorkspace:
+    _center = _Observers()
+
+    @classmethod
+    def sharedWorkspace(cls):
+        return cls()
+
+    def notificationCenter(self):
+        return self._center
+
+
+# -- tkinter -----------------------------------------------------------------
+
+class Tk:
+    """Window that counts how often it is pumped with update()."""
+
+    def __init__(self):
+        counters['windows'] += 1
+        self.updates = 0
+        self.protocols = {}
+
+    def attributes(self, *args):
+        pass
+
+    def configure(self, **options):
+        pass
+
+    def overrideredirect(self, flag):
+        pass
+
+    def focus_force(self):
+        pass
+
+    def withdraw(self):
+        pass
+
+    def deiconify(self):
+        pass
+
+    def lift(self):
+        pass
+
+    def grab_release(self):
+        pass
+
+    def grab_set(self):
+        pass
+
+    def protocol(self, name, callback):
+        self.protocols[name] = callback
+
+    def update(self):
+        self.updates += 1
+
+    def destroy(self):
+        pass
+
+
+class Label:
+    def __init__(self, master=None, **options):
+        self.options = options
+
+    def config(self, **options):
+        self.options.update(options)
+
+    configure = config
+
+    def pack(self, **options):
+        pass
+
+
+# -- subprocess ----------------------------------------------------------------
+
+class FakeDefaults:
+    """subprocess.run replacement serving `defaults export/import` from memory."""
+
+    def __init__(self):
+        self.domains = {}
+        self.calls = []
+
+    def __call__(self, cmd, input=None, check=False, capture_output=False, **kwargs):
+        counters['subprocesses'] += 1
+        self.calls.append(cmd[0])
+        stdout = b""
+        if cmd[:2] == ["defaults", "export"]:
+            stdout = self.domains.get(cmd[2], b"")
+        elif cmd[:2] == ["defaults", "import"]:
+            self.domains[cmd[2]] = input
+        return subprocess.CompletedProcess(cmd, 0, stdout, b"")
+
+    def set_domain(self, domain, data):
+        self.domains[domain] = plistlib.dumps(data, fmt=plistlib.FMT_BINARY)
+
+
+def _module(name, namespace):
+    module = types.ModuleType(name)
+    for key, value in namespace.items():
+        setattr(module, key, value)
+    return module
+
+
+def install():
+    """Register the fake platform modules; call before importing main."""
+    sys.modules['objc'] = _module('objc', {
+        'python_method': lambda function: function,
+        'super': builtins.super,
+    })
+    sys.modules['Quartz'] = fake_quartz
+    sys.modules['Foundation'] = _module('Foundation', {
+        'NSObject': NSObject,
+        'NSLog': NSLog,
+        'NSNotificationCenter': NSNotificationCenter,
+        'NSRunLoop': NSRunLoop,
+        'NSRunLoopCommonModes': "kCFRunLoopCommonModes",
+        'NSSystemClockDidChangeNotification': "NSSystemClockDidChangeNotification",
+        'NSTimer': NSTimer,
+    })
+    sys.modules['AppKit'] = _module('AppKit', {
+        'NSApplication': NSApplication,
+        'NSStatusBar': NSStatusBar,
+        'NSMenu': NSMenu,
+        'NSMenuItem': NSMenuItem,
+        'NSImage': NSImage,
+        'NSVariableStatusItemLength': -1,
+        'NSWorkspace': NSWorkspace,
+        'NSWorkspaceDidWakeNotification': "NSWorkspaceDidWakeNotification",
+    })
+    sys.modules['tkinter'] = _module('tkinter', {'Tk': Tk, 'Label': Label})
+
+
+def stub_subprocess():
+    """Replace subprocess.run with a FakeDefaults instance and return it."""
+    fake = FakeDefaults()
+    subprocess.run = fake
+    return fake
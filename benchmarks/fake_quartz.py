@@ -0,0 +1,91 @@
+"""
+Minimal stand-in for the Quartz module, enough to create and drive event taps.
+
+Constants use the real CoreGraphics values. FakeTap.post() mimics the window
+server: events whose type is not in the tap mask never reach Python.
+"""
+
+kCGEventLeftMouseDown = 1
+kCGEventLeftMouseUp = 2
+kCGEventRightMouseDown = 3
+kCGEventRightMouseUp = 4
+kCGEventMouseMoved = 5
+kCGEventLeftMouseDragged = 6
+kCGEventRightMouseDragged = 7
+kCGEventKeyDown = 10
+kCGEventKeyUp = 11
+kCGEventFlagsChanged = 12
+kCGEventScrollWheel = 22
+kCGEventTapDisabledByTimeout = 0xFFFFFFFE
+kCGEventTapDisabledByUserInput = 0xFFFFFFFF
+
+kCGSessionEventTap = 1
+kCGHeadInsertEventTap = 0
+kCFRunLoopCommonModes = "kCFRunLoopCommonModes"
+
+taps = []
+
+
+def CGEventMaskBit(event_type):
+    return 1 << event_type
+
+
+class FakeTap:
+    def __init__(self, mask, callback, refcon):
+        self.mask = mask
+        self.callback = callback
+        self.refcon = refcon
+        self.enabled = False
+        self.delivered = 0
+        self.passed = 0
+
+    def post(self, event_type, event=None):
+        """Deliver one event; returns what the tap let through to the system."""
+        if not self.enabled or not (self.mask >> event_type) & 1:
+            self.passed += 1
+            return event
+        self.delivered += 1
+        return self.callback(None, event_type, event, self.refcon)
+
+    def disable(self, event_type=kCGEventTapDisabledByTimeout):
+        """Simulate the window server disabling the tap."""
+        self.enabled = False
+        return self.callback(None, event_type, None, self.refcon)
+
+
+def CGEventTapCreate(tap, place, options, mask, callback, refcon):
+    fake_tap = FakeTap(mask, callback, refcon)
+    taps.append(fake_tap)
+    return fake_tap
+
+
+def CGEventTapEnable(tap, enable):
+    tap.enabled = bool(enable)
+
+
+def CGEventTapIsEnabled(tap):
+    return tap.enabled
+
+
+def CFMachPortInvalidate(port):
+    port.enabled = False
+
+
+def CFMachPortCreateRunLoopSource(allocator, port, order):
+    return ("source", port)
+
+
+def CFRunLoopGetCurrent():
+    return "run-loop"
+
+
+def CFRunLoopAddSource(run_loop, source, mode):
+    pass
+
+
+def CFRunLoopRun():
+    pass
+
+
+def CFRunLoopStop(run_loop):
+    pass
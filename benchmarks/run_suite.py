@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for main.py on any platform.
+
+Fake objc/Foundation/AppKit/Quartz/tkinter modules are installed before
+main.py is imported, and subprocess.run is stubbed, so the real menu, window,
+event-tap and session code runs without macOS. Results are written as JSON
+and compared with the limits in thresholds.json; the exit status is 1 if any
+benchmark is slower than its threshold.
+
+Afterwards a day of hourly sessions is simulated on a virtual clock and the
+wakeups per hour are checked against the "budget" limits in the same file,
+so an idle FitBlock can't quietly start waking the laptop more often.
+
+    python3 benchmarks/run_suite.py [--output results.json] [--only NAME ...]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import fake_platform  # noqa: E402
+
+THRESHOLDS_FILE = os.path.join(BENCH_DIR, "thresholds.json")
+BENCHMARKS = []
+
+
+def benchmark(name, iterations):
+    """Register fn(app, iterations) as a benchmark; it must run the operation iterations times."""
+    def register(fn):
+        BENCHMARKS.append((name, iterations, fn))
+        return fn
+    return register
+
+
+def measure(fn, app, iterations, repeats):
+    """Median time per operation in microseconds over several repeats."""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(app, iterations)
+        samples.append((time.perf_counter() - start) / iterations * 1e6)
+    return statistics.median(samples)
+
+
+@benchmark("load_state", 2000)
+def bench_load_state(app, n):
+    for _ in range(n):
+        app.load_state()
+
+
+@benchmark("save_state", 20000)
+def bench_save_state(app, n):
+    for _ in range(n):
+        app.save_state()
+
+
+@benchmark("state_write", 200)
+def bench_state_write(app, n):
+    for _ in range(n):
+        app.save_state()
+        app.state_writer.flush()
+
+
+@benchmark("format_duration_since_start", 50000)
+def bench_format_duration(app, n):
+    for _ in range(n):
+        app.format_duration_since_start()
+
+
+@benchmark("update_menu_steady", 20000)
+def bench_update_menu_steady(app, n):
+    delegate = _delegate(app)
+    for _ in range(n):
+        delegate.update_menu()
+
+
+@benchmark("update_menu_state_change", 2000)
+def bench_update_menu_change(app, n):
+    delegate = _delegate(app)
+    for i in range(n):
+        app.app_state['sessions_completed'] = i
+        delegate.update_menu()
+
+
+@benchmark("countdown_tick", 50000)
+def bench_countdown_tick(app, n):
+    now = [0.0]
+    countdown = app.CountdownEngine(
+        n, set_timer_text=lambda text: None, set_info_text=lambda text: None,
+        info_text=lambda: "info", notify=lambda text: None, clock=lambda: now[0])
+    countdown.start()
+    for _ in range(n):
+        now[0] += 1.0
+        countdown.tick()
+
+
+@benchmark("event_tap_callback", 200000)
+def bench_event_tap(app, n):
+    app.tap_supervisor.create("full")
+    tap = fake_platform.fake_quartz.taps[-1]
+    key_down = fake_platform.fake_quartz.kCGEventKeyDown
+    for _ in range(n):
+        tap.post(key_down, "event")
+    app.tap_supervisor.stop()
+
+
+@benchmark("run_blocker", 20)
+def bench_run_blocker(app, n):
+    async def sessions():
+        for _ in range(n):
+            await app.run_blocker()
+    app.orchestrator.run(sessions())
+
+
+def check_budget(app, limits, directory):
+    """Simulate a day of hourly sessions; returns {limit name: (per hour, limit, ok)}."""
+    args = argparse.Namespace(sessions=24, duration=120, interval=3600, start=None,
+                              quiet_hours=None, rules=None, dir=directory)
+    # Drop the menus the benchmarks subscribed; the app has exactly one.
+    app.app_state = app.StateStore(dict(app.app_state.snapshot()[1]))
+    _delegate(app)
+    app.run_simulation(args)
+    resources = app.budget.report()['resources']
+    measured = {
+        'idle_wakeups_per_hour': resources['wakeups']['idle_per_hour'],
+        'wakeups_per_hour': resources['wakeups']['per_hour'],
+    }
+    return {name: (value, limits.get(name), limits.get(name) is None or value <= limits[name])
+            for name, value in measured.items()}
+
+
+def _delegate(app):
+    import menu_bar
+    delegate = menu_bar.create_delegate(app)
+    delegate.applicationDidFinishLaunching_(None)
+    return delegate
+
+
+def load_main(home):
+    """Import main.py against the fakes, with HOME pointing at a scratch directory."""
+    os.environ['HOME'] = home
+    fake_platform.install()
+    defaults = fake_platform.stub_subprocess()
+
+    import main as app
+    from notifier import FakeBackend
+
+    defaults.set_domain(app.shortcut_manager.store.domain, {'AppleSymbolicHotKeys': {}})
+    app.notifier.backend = FakeBackend()
+    # Keep the blocking window up for a millisecond: the pipeline cost is
+    # everything around the wait, not the wait itself.
+    app.BLOCK_DURATION = 0.001
+    app.load_input_blocker()
+    app.load_state()
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results.json"))
+    parser.add_argument("--thresholds", default=THRESHOLDS_FILE)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="run only these benchmarks")
+    args = parser.parse_args(argv)
+
+    with open(args.thresholds) as f:
+        thresholds = json.load(f)
+
+    with tempfile.TemporaryDirectory() as home:
+        with contextlib.redirect_stdout(io.StringIO()):
+            app = load_main(home)
+
+        results = {}
+        failed = []
+        for name, iterations, fn in BENCHMARKS:
+            if args.only and name not in args.only:
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                fn(app, max(1, iterations // 10))  # warm up
+                us = measure(fn, app, iterations, args.repeats)
+            limit = thresholds.get(name)
+            ok = limit is None or us <= limit
+            if not ok:
+                failed.append(name)
+            results[name] = {'us_per_op': round(us, 3), 'iterations': iterations,
+                             'threshold_us': limit, 'ok': ok}
+            status = "ok" if ok else "SLOWER THAN THRESHOLD"
+            limit_text = f"{limit:>10.1f}" if limit is not None else f"{'-':>10}"
+            print(f"{name:<28} {us:10.2f} us/op  limit {limit_text} us  {status}")
+
+        app.state_writer.flush()
+        app.notifier.flush()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            budget = check_budget(app, thresholds.get('budget', {}), os.path.join(home, "budget"))
+        for name, (value, limit, ok) in budget.items():
+            if not ok:
+                failed.append(name)
+            status = "ok" if ok else "OVER BUDGET"
+            limit_text = f"{limit:>10.1f}" if limit is not None else f"{'-':>10}"
+            print(f"{name:<28} {value:10.2f} /hour  limit {limit_text} /hour {status}")
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+        'budget': {name: {'per_hour': value, 'limit': limit, 'ok': ok}
+                   for name, (value, limit, ok) in budget.items()},
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if failed:
+        print(f"Regressions: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Wakeup and resource accounting for the long-running FitBlock process.
+
+Counters are either bumped where the work happens or read from counters the
+components already keep. Sessions are bracketed, so the report can separate
+what an idle FitBlock costs per hour from what a blocking session costs.
+Nothing in here wakes up on its own.
+
+Counter names are "<resource>.<source>", e.g. "wakeups.scheduler" or
+"subprocesses.notifier"; the report sums them per resource as well.
+"""
+
+import threading
+import time
+
+RESOURCES = ("wakeups", "subprocesses", "state_writes", "bytes_written")
+
+
+class ResourceBudget:
+    """Totals per counter, split into session time and idle time."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.started = clock()
+        self.sessions = 0
+
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._sources = {}
+        self._session_counts = {}
+        self._session_seconds = 0.0
+        self._session_start = None
+        self._session_totals = None
+
+    def count(self, name, n=1):
+        """Add n to counter name."""
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + n
+
+    def track(self, name, read):
+        """Report read() as counter name; read must return a running total."""
+        self._sources[name] = read
+
+    def totals(self):
+        """Current value of every counter, pushed and tracked."""
+        with self._lock:
+            totals = dict(self._counts)
+        for name, read in self._sources.items():
+            totals[name] = totals.get(name, 0) + read()
+        return totals
+
+    def session_started(self):
+        self._session_totals = self.totals()
+        self._session_start = self.clock()
+
+    def session_ended(self):
+        if self._session_start is None:
+            return
+        totals = self.totals()
+        with self._lock:
+            for name, value in totals.items():
+                delta = value - self._session_totals.get(name, 0)
+                if delta:
+                    self._session_counts[name] = self._session_counts.get(name, 0) + delta
+            self._session_seconds += self.clock() - self._session_start
+            self._session_start = None
+            self.sessions += 1
+
+    def report(self):
+        """JSON-serializable totals and per-hour rates, overall and while idle."""
+        totals = self.totals()
+        uptime = max(self.clock() - self.started, 1e-9)
+        with self._lock:
+            session_counts = dict(self._session_counts)
+            session_seconds = self._session_seconds
+            if self._session_start is not None:
+                session_seconds += self.clock() - self._session_start
+        idle_hours = max(uptime - session_seconds, 1e-9) / 3600
+
+        counters = {}
+        for name in sorted(totals):
+            total = totals[name]
+            idle = total - session_counts.get(name, 0)
+            counters[name] = {
+                'total': total,
+                'idle': idle,
+                'per_hour': round(total / (uptime / 3600), 3),
+                'idle_per_hour': round(idle / idle_hours, 3),
+            }
+
+        resources = {}
+        for resource in RESOURCES:
+            members = [c for name, c in counters.items() if name.split(".", 1)[0] == resource]
+            total = sum(c['total'] for c in members)
+            idle = sum(c['idle'] for c in members)
+            resources[resource] = {
+                'total': total,
+                'idle': idle,
+                'per_hour': round(total / (uptime / 3600), 3),
+                'idle_per_hour': round(idle / idle_hours, 3),
+            }
+
+        return {
+            'uptime_hours': round(uptime / 3600, 4),
+            'idle_hours': round(idle_hours, 4),
+            'sessions': self.sessions,
+            'resources': resources,
+            'counters': counters,
+        }
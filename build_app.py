@@ -1,18 +1,53 @@
 #!/usr/bin/env python3
 """
 Build script to create a macOS app bundle from the FitBlock.
+
+Builds are incremental. The sources that go into the bundle (the modules,
+FitBlock.spec and the icon) and the toolchain (Python, PyInstaller and
+requirements.txt) are hashed, and the hashes are kept in build/. If nothing
+changed since the last build, PyInstaller isn't run at all. If only the
+sources changed, PyInstaller reuses its analysis cache in build/. Only a
+toolchain change, or --clean, throws that cache away.
+
+Each build ends with a report of what the bundle is made of: the size of
+every module or package in it, and how long the ones FitBlock imports at
+launch take to import. Run it on its own with --report.
 """
 
+import argparse
+import ast
+import hashlib
+import json
 import os
+import platform
+import re
 import subprocess
 import sys
 import shutil
+import tempfile
+import zipfile
+from collections import defaultdict
+
+SPEC_FILE = "FitBlock.spec"
+APP_PATH = "dist/FitBlock.app"
+BUILD_STATE = "build/fitblock-build.json"
+# Scripts in this directory that build or check the app rather than ship in it.
+TOOLS = {"build_app.py", "verify_app.py", "collector.py"}
+# What FitBlock imports on launch, on top of main; the platform backends load lazily.
+LAUNCH_IMPORTS = ["menu_bar", "input_tap", "Quartz", "tkinter"]
+
+LAUNCHER_SCRIPT = """#!/bin/bash
+# Launcher script for FitBlock
+cd "$(dirname "$0")"
+open FitBlock.app
+"""
+
 
 def run_command(cmd, description):
     """Run a command and handle errors."""
     print(f"Running: {description}")
     print(f"Command: {' '.join(cmd)}")
-    
+
     try:
         result = subprocess.run(cmd, check=True, capture_output=True, text=True)
         print(f"✓ {description} completed successfully")
@@ -28,10 +63,197 @@ def run_command(cmd, description):
             print(f"stderr: {e.stderr}")
         return False
 
-def main():
-    print("Building FitBlock macOS App...")
-    print("=" * 50)
-    
+
+def hash_files(paths):
+    """SHA-256 over the names and contents of paths; missing files hash as absent."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(path.encode() + b"\0")
+        if not os.path.exists(path):
+            digest.update(b"<missing>")
+            continue
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_files():
+    """The files whose contents end up in the bundle."""
+    modules = [name for name in os.listdir(".") if name.endswith(".py") and name not in TOOLS]
+    return modules + [SPEC_FILE, "icon.icns"]
+
+
+def toolchain_hash(pyinstaller_version):
+    """Hash of everything that invalidates PyInstaller's cache when it changes."""
+    digest = hashlib.sha256(hash_files(["requirements.txt"]).encode())
+    digest.update(f"{platform.python_implementation()} {sys.version} {pyinstaller_version}".encode())
+    return digest.hexdigest()
+
+
+def load_build_state():
+    try:
+        with open(BUILD_STATE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_build_state(state):
+    os.makedirs(os.path.dirname(BUILD_STATE), exist_ok=True)
+    with open(BUILD_STATE, "w") as f:
+        json.dump(state, f, indent=2)
+
+
+def spec_hidden_imports(spec_file=SPEC_FILE):
+    """The hiddenimports list from the spec's Analysis() call."""
+    with open(spec_file) as f:
+        tree = ast.parse(f.read(), spec_file)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.keyword) and node.arg == "hiddenimports":
+            return ast.literal_eval(node.value)
+    return []
+
+
+def check_hidden_imports(spec_file=SPEC_FILE, name="FitBlock"):
+    """Warn about hidden imports that PyInstaller could not resolve during the last build."""
+    warnings = os.path.join("build", name, f"warn-{name}.txt")
+    if not os.path.exists(warnings):
+        return
+    with open(warnings) as f:
+        missing = set(re.findall(r"missing module named '?([\w.]+)'?", f.read()))
+    for module in spec_hidden_imports(spec_file):
+        if module in missing:
+            print(f"⚠️  Hidden import {module} could not be resolved; remove it from {spec_file}")
+
+
+def module_group(relpath):
+    """Report line a bundled file belongs to: its top-level module, package or framework."""
+    parts = relpath.split(os.sep)
+    name = parts[1] if parts[0] == "lib-dynload" and len(parts) > 1 else parts[0]
+    if name.endswith((".so", ".dylib")):
+        return name.split(".")[0]
+    return name
+
+
+def archive_entries(executable):
+    """(module, compressed size) for everything in the executable's embedded archives.
+
+    Needs PyInstaller's archive readers; returns None where they are missing.
+    """
+    try:
+        from PyInstaller.archive.readers import CArchiveReader
+        archive = CArchiveReader(executable)
+        entries = []
+        for name, (_, length, _, _, typecode) in archive.toc.items():
+            if typecode == "z":
+                pyz = archive.open_embedded_archive(name)
+                entries.extend((module, entry[2]) for module, entry in pyz.toc.items())
+            else:
+                entries.append((name, length))
+        return entries
+    except Exception as e:
+        print(f"⚠️  Could not list the modules inside {executable}: {e}")
+        return None
+
+
+def bundle_sizes(app_path):
+    """Bytes per module group, file count, total size, and whether the archive could be listed."""
+    sizes = defaultdict(int)
+    files = 0
+    contents = os.path.join(app_path, "Contents")
+    executable = os.path.join(contents, "MacOS", "FitBlock")
+    for directory, _, names in os.walk(contents):
+        for name in names:
+            path = os.path.join(directory, name)
+            if os.path.islink(path):
+                continue  # Resources/ and Frameworks/ link to each other
+            files += 1
+            size = os.path.getsize(path)
+            relpath = os.path.relpath(path, contents)
+            top = relpath.split(os.sep)[0]
+            if path == executable:
+                sizes["(executable)"] += size
+            elif name == "base_library.zip":
+                # The stdlib modules Python needs before it can import from the archive.
+                with zipfile.ZipFile(path) as library:
+                    for member in library.infolist():
+                        sizes[member.filename.split("/")[0].split(".")[0]] += member.compress_size
+                sizes["(base_library.zip)"] += size - sum(m.compress_size for m in library.infolist())
+            elif top in ("Frameworks", "Resources") and os.sep in relpath:
+                sizes[module_group(relpath.split(os.sep, 1)[1])] += size
+            else:
+                sizes[f"({relpath})"] += size
+
+    entries = archive_entries(executable) if os.path.exists(executable) else None
+    if entries:
+        # Move the archive's share of the executable onto the modules in it.
+        for module, size in entries:
+            sizes[module.split(".")[0]] += size
+            sizes["(executable)"] -= size
+    total = sum(sizes.values())
+    return sizes, files, total, entries is not None
+
+
+def import_times(modules=LAUNCH_IMPORTS):
+    """Milliseconds spent importing each top-level package when main and modules are imported.
+
+    Measured with python -X importtime in this interpreter, with HOME pointed
+    at a scratch directory. Modules that can't be imported here are skipped,
+    and so is whatever the interpreter imports on its own at startup.
+    """
+    code = ("import main\n"
+            f"for name in {modules!r}:\n"
+            "    try:\n"
+            "        __import__(name)\n"
+            "    except ImportError:\n"
+            "        pass\n")
+    startup = _import_times("pass")
+    return {name: ms for name, ms in _import_times(code).items() if name not in startup}
+
+
+def _import_times(code):
+    with tempfile.TemporaryDirectory() as home:
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True,
+                                text=True, env=dict(os.environ, HOME=home), cwd=os.getcwd())
+    times = defaultdict(float)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        times[name.strip().split(".")[0]] += int(self_us) / 1000
+    return times
+
+
+def print_report(app_path, top=25):
+    """Print the bundle's size per module next to each module's import time at launch."""
+    if not os.path.exists(app_path):
+        print(f"✗ No app bundle at {app_path}")
+        return False
+
+    sizes, files, total, complete = bundle_sizes(app_path)
+    times = import_times()
+    print(f"\nBundle report for {app_path}: {total / 1e6:.1f} MB in {files} files")
+    print(f"{'module':<32} {'size':>10} {'import':>10}")
+    ranked = sorted(sizes.items(), key=lambda item: item[1], reverse=True)
+    for name, size in ranked[:top]:
+        import_ms = f"{times[name]:.1f} ms" if name in times else "-"
+        print(f"{name:<32} {size / 1024:>7,.0f} KB {import_ms:>10}")
+    rest = ranked[top:]
+    if rest:
+        print(f"{f'{len(rest)} others':<32} {sum(size for _, size in rest) / 1024:>7,.0f} KB")
+
+    launch = sum(times.values())
+    print(f"Import time at launch (this interpreter): {launch:.1f} ms")
+    # Without the archive's contents most pure-Python modules can't be found.
+    missing = sorted(name for name in times if name not in sizes) if complete else []
+    if missing:
+        print(f"Imported at launch but not found in the bundle: {', '.join(missing)}")
+    return True
+
+
+def build(clean=False):
+    """Run PyInstaller if the bundle is out of date; returns whether an app is in place."""
     try:
         import PyInstaller
         print(f"✓ PyInstaller version: {PyInstaller.__version__}")
@@ -39,68 +261,99 @@ def main():
         print("✗ PyInstaller not found. Installing...")
         if not run_command([sys.executable, "-m", "pip", "install", "pyinstaller"], "Installing PyInstaller"):
             return False
-    
-    if os.path.exists("dist"):
-        print("Cleaning previous build...")
-        shutil.rmtree("dist")
-    if os.path.exists("build"):
-        shutil.rmtree("build")
-    
-    for spec_file in ["FitBlock.spec", "TrainingBlocker.spec"]:
-        if os.path.exists(spec_file + ".spec"):
-            print(f"Removing old spec file: {spec_file}.spec")
-            os.remove(spec_file + ".spec")
-    
+        import PyInstaller
+
     if os.path.exists("icon.icns"):
         print("✓ Icon file found: icon.icns")
     else:
         print("⚠️  Icon file not found: icon.icns (app will use default icon)")
-    
-    pyinstaller_cmd = [
-        "pyinstaller",
-        "--clean",                      
-        "--distpath=dist",               
-        "--workpath=build",              
-        "FitBlock.spec"                  
-    ]
-    
-    pyinstaller_cmd = [cmd for cmd in pyinstaller_cmd if cmd is not None]
-    
+
+    previous = load_build_state()
+    state = {
+        'toolchain': toolchain_hash(PyInstaller.__version__),
+        'sources': hash_files(source_files()),
+    }
+    if previous.get('toolchain') != state['toolchain']:
+        clean = True
+        if previous:
+            print("Toolchain or requirements changed, rebuilding from scratch")
+
+    if not clean and previous == state and os.path.exists(APP_PATH):
+        print(f"✓ Sources unchanged since the last build ({state['sources'][:12]}), skipping PyInstaller")
+        return True
+
+    if clean:
+        print("Cleaning previous build...")
+        for directory in ("dist", "build"):
+            if os.path.exists(directory):
+                shutil.rmtree(directory)
+
+    # Without --clean PyInstaller reuses the analysis of modules that haven't changed.
+    pyinstaller_cmd = [sys.executable, "-m", "PyInstaller", "--noconfirm",
+                       "--distpath=dist", "--workpath=build", SPEC_FILE]
     if not run_command(pyinstaller_cmd, "Building app with PyInstaller"):
         return False
-    
-    app_path = "dist/FitBlock.app"
-    if os.path.exists(app_path):
-        print(f"✓ App created successfully at: {app_path}")
-        
-        launcher_script = """#!/bin/bash
-# Launcher script for FitBlock
-cd "$(dirname "$0")"
-open FitBlock.app
-"""
-        
-        with open("dist/launch_fitblock.sh", "w") as f:
-            f.write(launcher_script)
-        os.chmod("dist/launch_fitblock.sh", 0o755)
-        
-        print("\n" + "=" * 50)
-        print("BUILD COMPLETED SUCCESSFULLY!")
-        print("=" * 50)
-        print(f"App location: {os.path.abspath(app_path)}")
-        print(f"Launcher script: {os.path.abspath('dist/launch_fitblock.sh')}")
-        print("\nTo run the app:")
-        print("1. Double-click the FitBlock.app in the dist folder")
-        print("2. Or run: ./dist/launch_fitblock.sh")
-        print("3. Or run: open dist/FitBlock.app")
-        print("\nNote: The app will request administrator privileges on first run.")
-        print("You may need to grant Accessibility permissions in System Preferences.")
-        print("The app runs as a background app (no dock icon) - look for it in the menu bar.")
-        
-        return True
-    else:
+    if not os.path.exists(APP_PATH):
         print("✗ App was not created successfully")
         return False
 
+    save_build_state(state)
+    check_hidden_imports()
+    return True
+
+
+def write_launcher(path="dist/launch_fitblock.sh"):
+    """Write the launcher script unless it is already there."""
+    try:
+        with open(path) as f:
+            if f.read() == LAUNCHER_SCRIPT:
+                return
+    except OSError:
+        pass
+    with open(path, "w") as f:
+        f.write(LAUNCHER_SCRIPT)
+    os.chmod(path, 0o755)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build FitBlock.app with PyInstaller.")
+    parser.add_argument("--clean", action="store_true", help="discard build/ and dist/ and rebuild everything")
+    parser.add_argument("--report", metavar="APP", nargs="?", const=APP_PATH,
+                        help=f"only print the size and import-time report (default app: {APP_PATH})")
+    parser.add_argument("--top", type=int, default=25, help="modules to list in the report")
+    args = parser.parse_args(argv)
+
+    if args.report:
+        return print_report(args.report, args.top)
+
+    print("Building FitBlock macOS App...")
+    print("=" * 50)
+
+    if not build(args.clean):
+        return False
+
+    app_path = APP_PATH
+    print(f"✓ App created successfully at: {app_path}")
+    write_launcher()
+
+    print_report(app_path, args.top)
+
+    print("\n" + "=" * 50)
+    print("BUILD COMPLETED SUCCESSFULLY!")
+    print("=" * 50)
+    print(f"App location: {os.path.abspath(app_path)}")
+    print(f"Launcher script: {os.path.abspath('dist/launch_fitblock.sh')}")
+    print("\nTo run the app:")
+    print("1. Double-click the FitBlock.app in the dist folder")
+    print("2. Or run: ./dist/launch_fitblock.sh")
+    print("3. Or run: open dist/FitBlock.app")
+    print("\nNote: The app will request administrator privileges on first run.")
+    print("You may need to grant Accessibility permissions in System Preferences.")
+    print("The app runs as a background app (no dock icon) - look for it in the menu bar.")
+
+    return True
+
+
 if __name__ == "__main__":
     success = main()
-    sys.exit(0 if success else 1) 
\ No newline at end of file
+    sys.exit(0 if success else 1)
@@ -0,0 +1,88 @@
+"""
+Clocks for FitBlock.
+
+Everything in main.py that reads the time goes through one clock object.
+SystemClock is the real thing; VirtualClock only moves when something waits
+on it, which lets the simulation mode replay months of sessions in seconds.
+Sleeping and waiting are coroutines, awaited on the orchestrator's loop.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+
+async def wait_for_event(event, timeout):
+    """Wait on an asyncio.Event for up to timeout seconds; returns whether it was set."""
+    import asyncio
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+class SystemClock:
+    """Wall, monotonic and datetime time from the operating system."""
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def now(self):
+        return datetime.now()
+
+    async def sleep(self, seconds):
+        import asyncio
+        await asyncio.sleep(seconds)
+
+    async def wait(self, event, timeout):
+        """Wait on an asyncio.Event for up to timeout seconds; returns whether it was set."""
+        return await wait_for_event(event, timeout)
+
+
+class VirtualClock:
+    """Clock that advances instantly by however long callers sleep or wait.
+
+    Meant to be driven from a single event loop: a wait returns at once, True
+    if the event is already set and otherwise False after advancing the clock
+    by the full timeout. A wait yields to the loop once, so other tasks still
+    get to run between steps; a sleep doesn't, since the countdown sleeps on
+    every tick and a loop iteration costs more than the tick itself.
+    """
+
+    def __init__(self, start=None):
+        self._time = time.time() if start is None else start
+        self._monotonic = 0.0
+        self._lock = threading.Lock()
+        self.advanced = 0.0
+
+    def time(self):
+        return self._time
+
+    def monotonic(self):
+        return self._monotonic
+
+    def now(self):
+        return datetime.fromtimestamp(self._time)
+
+    def advance(self, seconds):
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._time += seconds
+            self._monotonic += seconds
+            self.advanced += seconds
+
+    async def sleep(self, seconds):
+        self.advance(seconds)
+
+    async def wait(self, event, timeout):
+        import asyncio
+        await asyncio.sleep(0)
+        if event.is_set():
+            return True
+        self.advance(timeout)
+        return False
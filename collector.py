@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Reference collector for FitBlock session uploads.
+
+Accepts the batches SessionUploader POSTs (newline-delimited JSON, usually
+gzip-compressed) and stores every record once in SQLite, keyed by its ID, so
+a batch that is sent again is acknowledged without being counted twice.
+Meant for trying uploads out locally, not for running a fleet on:
+
+    python3 collector.py --port 8765 --db sessions.db
+    FITBLOCK_UPLOAD_URL=http://127.0.0.1:8765/sessions python3 main.py
+
+GET /sessions/summary returns completed and aborted sessions per machine.
+"""
+
+import argparse
+import gzip
+import io
+import json
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MAX_BODY = 64 * 1024 * 1024  # uncompressed bytes per batch
+FIELDS = ('id', 'machine', 'host', 'start', 'end', 'planned', 'actual', 'aborted')
+
+
+class SessionStore:
+    """SQLite table of session records, one row per record ID."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, machine TEXT NOT NULL, host TEXT, "
+            "start REAL NOT NULL, end REAL NOT NULL, planned REAL, actual REAL, aborted INTEGER)")
+        self._db.commit()
+
+    def add(self, records):
+        """Insert records; returns (accepted, duplicates)."""
+        rows = [tuple(record.get(field) for field in FIELDS) for record in records]
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(f"INSERT OR IGNORE INTO sessions VALUES ({', '.join('?' * len(FIELDS))})", rows)
+            self._db.commit()
+            accepted = self._db.total_changes - before
+        return accepted, len(rows) - accepted
+
+    def summary(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT machine, MAX(host), SUM(aborted = 0), SUM(aborted != 0), SUM(actual), MAX(end) "
+                "FROM sessions GROUP BY machine").fetchall()
+        return {machine: {'host': host, 'completed': completed, 'aborted': aborted,
+                          'seconds': seconds, 'last_end': last_end}
+                for machine, host, completed, aborted, seconds, last_end in rows}
+
+
+def parse_batch(body, encoding):
+    """Records in a request body; raises ValueError if it isn't a valid batch."""
+    if encoding == "gzip":
+        try:
+            with gzip.GzipFile(fileobj=io.BytesIO(body)) as f:
+                body = f.read(MAX_BODY + 1)
+        except (OSError, EOFError) as e:
+            raise ValueError(f"bad gzip body: {e}")
+        if len(body) > MAX_BODY:
+            raise ValueError("batch too large")
+    elif encoding not in (None, "identity"):
+        raise ValueError(f"unsupported Content-Encoding {encoding}")
+
+    records = []
+    for number, line in enumerate(body.splitlines(), 1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if not isinstance(record, dict) or not all(key in record for key in ('id', 'machine', 'start', 'end')):
+            raise ValueError(f"line {number}: missing id, machine, start or end")
+        records.append(record)
+    return records
+
+
+class CollectorHandler(BaseHTTPRequestHandler):
+    server_version = "FitBlockCollector/1.0"
+
+    def do_POST(self):
+        if self.path != "/sessions":
+            self._reply(404, {'error': "not found"})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY:
+            self._reply(413, {'error': "batch too large"})
+            return
+        try:
+            records = parse_batch(self.rfile.read(length), self.headers.get('Content-Encoding'))
+        except ValueError as e:
+            self._reply(400, {'error': str(e)})
+            return
+        accepted, duplicates = self.server.store.add(records)
+        self._reply(200, {'accepted': accepted, 'duplicates': duplicates})
+
+    def do_GET(self):
+        if self.path != "/sessions/summary":
+            self._reply(404, {'error': "not found"})
+            return
+        self._reply(200, self.server.store.summary())
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(db, port=8765, host="127.0.0.1", quiet=False):
+    """Collector bound to host:port (0 picks a free port) and storing into db."""
+    server = ThreadingHTTPServer((host, port), CollectorHandler)
+    server.daemon_threads = True
+    server.store = SessionStore(db)
+    server.quiet = quiet
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Collect FitBlock session uploads into SQLite.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default="sessions.db")
+    parser.add_argument("--quiet", action="store_true", help="don't log requests")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.db, args.port, args.host, args.quiet)
+    print(f"Collecting sessions on http://{args.host}:{server.server_address[1]}/sessions into {args.db}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
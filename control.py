@@ -0,0 +1,216 @@
+"""
+Local control socket for a running FitBlock.
+
+The server listens on a Unix-domain socket and answers newline-delimited
+requests on its own thread with a selector, so any number of clients can be
+served without touching the session or AppKit threads. A request is either a
+bare command name ("status\\n") or a JSON object ({"cmd": "status"}); every
+response is a single JSON line.
+"""
+
+import json
+import os
+import selectors
+import socket
+import threading
+
+MAX_REQUEST = 4096
+
+
+class ControlError(Exception):
+    """Raised by the client when the server is unreachable or reports an error."""
+
+
+def encode_response(result=None, error=None):
+    """Encode a response line; handlers may return pre-encoded bytes to skip this."""
+    if error is not None:
+        return json.dumps({'ok': False, 'error': error}).encode() + b"\n"
+    return json.dumps({'ok': True, 'result': result}, default=str).encode() + b"\n"
+
+
+class ControlServer:
+    """Serve commands from handlers on a Unix-domain socket."""
+
+    def __init__(self, path, handlers):
+        self.path = path
+        self.handlers = handlers
+        self.requests = 0
+        self._selector = None
+        self._listener = None
+        self._thread = None
+        self._stopped = False
+        self._wake_r = self._wake_w = None
+
+    def start(self):
+        """Bind the socket and start serving on a daemon thread."""
+        self._remove_stale_socket()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            listener.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        listener.listen(64)
+        listener.setblocking(False)
+
+        self._listener = listener
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(listener, selectors.EVENT_READ, self._accept)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+
+        self._thread = threading.Thread(target=self._run, name="ControlServer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopped = True
+        self._wake_w.send(b"x")
+        self._thread.join(timeout=2.0)
+        self._thread = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except OSError:
+            os.unlink(self.path)
+        else:
+            raise ControlError(f"Another FitBlock is already listening on {self.path}")
+        finally:
+            probe.close()
+
+    def _run(self):
+        try:
+            while not self._stopped:
+                for key, events in self._selector.select():
+                    if key.data is None:
+                        continue
+                    key.data(key.fileobj, events)
+        finally:
+            for key in list(self._selector.get_map().values()):
+                key.fileobj.close()
+            self._selector.close()
+            self._wake_w.close()
+
+    def _accept(self, listener, events):
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except BlockingIOError:
+                return
+            conn.setblocking(False)
+            client = _Client(conn)
+            self._selector.register(conn, selectors.EVENT_READ, client.handler(self))
+
+    def _close(self, client):
+        if client.closed:
+            return
+        client.closed = True
+        self._selector.unregister(client.conn)
+        client.conn.close()
+
+    def dispatch(self, line):
+        """Run one request line and return the encoded response."""
+        self.requests += 1
+        line = line.strip()
+        if line.startswith(b"{"):
+            try:
+                command = json.loads(line).get('cmd', '')
+            except (ValueError, AttributeError):
+                return encode_response(error="malformed request")
+        else:
+            command = line.decode('utf-8', 'replace')
+
+        handler = self.handlers.get(command)
+        if handler is None:
+            return encode_response(error=f"unknown command {command!r}; expected one of {', '.join(self.handlers)}")
+        try:
+            result = handler()
+        except Exception as e:
+            return encode_response(error=str(e))
+        return result if isinstance(result, bytes) else encode_response(result)
+
+
+class _Client:
+    """Per-connection buffers for ControlServer."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.inbuf = b""
+        self.outbuf = b""
+        self.closed = False
+
+    def handler(self, server):
+        def on_event(conn, events):
+            try:
+                if events & selectors.EVENT_READ:
+                    self._read(server)
+                # Answer straight away; EVENT_WRITE is only used once the socket is full.
+                if self.outbuf and not self.closed:
+                    self._write()
+            except OSError:
+                server._close(self)
+                return
+
+            if self.closed:
+                return
+            wanted = selectors.EVENT_READ | (selectors.EVENT_WRITE if self.outbuf else 0)
+            if server._selector.get_key(self.conn).events != wanted:
+                server._selector.modify(self.conn, wanted, on_event)
+
+        return on_event
+
+    def _read(self, server):
+        data = self.conn.recv(MAX_REQUEST)
+        if not data:
+            server._close(self)
+            return
+        self.inbuf += data
+        while b"\n" in self.inbuf:
+            line, self.inbuf = self.inbuf.split(b"\n", 1)
+            self.outbuf += server.dispatch(line)
+        if len(self.inbuf) > MAX_REQUEST:
+            server._close(self)
+
+    def _write(self):
+        try:
+            sent = self.conn.send(self.outbuf)
+        except BlockingIOError:
+            return
+        self.outbuf = self.outbuf[sent:]
+
+
+def request(path, command, timeout=2.0):
+    """Send one command to a running FitBlock and return its result."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+        sock.sendall(command.encode() + b"\n")
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    except OSError as e:
+        raise ControlError(f"Could not reach FitBlock at {path}: {e}")
+    finally:
+        sock.close()
+
+    try:
+        response = json.loads(data)
+    except ValueError:
+        raise ControlError("Malformed response from FitBlock")
+    if not response.get('ok'):
+        raise ControlError(response.get('error', 'unknown error'))
+    return response.get('result')
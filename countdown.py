@@ -0,0 +1,95 @@
+"""
+Drift-free countdown for the blocking window.
+
+The countdown runs against a monotonic deadline, so wall-clock changes cannot
+stretch or shorten a block, and every tick is scheduled for the moment the
+displayed second changes rather than a fixed 1000 ms after the previous tick.
+Labels are only redrawn when their text actually changes.
+"""
+
+import math
+import time
+
+
+class CachedLabel:
+    """Forward text to a setter only when it differs from what is displayed."""
+
+    def __init__(self, set_text):
+        self.set_text = set_text
+        self.text = None
+        self.redraws = 0
+
+    def update(self, text):
+        if text == self.text:
+            return False
+        self.set_text(text)
+        self.text = text
+        self.redraws += 1
+        return True
+
+
+def format_remaining(seconds):
+    minutes, seconds = divmod(seconds, 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+class CountdownEngine:
+    """Compute countdown ticks from a monotonic deadline.
+
+    set_timer_text/set_info_text update the two window labels, info_text()
+    builds the footer text (refreshed every info_interval seconds) and
+    notify(remaining_text) is called every notify_interval seconds.
+    """
+
+    def __init__(self, duration, set_timer_text, set_info_text, info_text, notify=None,
+                 clock=time.monotonic, info_interval=60, notify_interval=30):
+        self.duration = duration
+        self.timer_label = CachedLabel(set_timer_text)
+        self.info_label = CachedLabel(set_info_text)
+        self.info_text = info_text
+        self.notify = notify
+        self.clock = clock
+        self.info_interval = info_interval
+        self.notify_interval = notify_interval
+
+        self.deadline = None
+        self.ticks = 0
+        self._next_info = None
+        self._next_notify = None
+
+    def start(self):
+        """Start the countdown now and render the first tick; returns the delay to the next one."""
+        now = self.clock()
+        self.deadline = now + self.duration
+        self._next_info = now
+        self._next_notify = now
+        return self.tick()
+
+    def remaining(self):
+        """Seconds left, rounded up to the second being displayed."""
+        return max(0, math.ceil(self.deadline - self.clock()))
+
+    def tick(self):
+        """Render the current second; returns milliseconds until the next tick, or None when done."""
+        self.ticks += 1
+        now = self.clock()
+        left = self.deadline - now
+        whole = max(0, math.ceil(left))
+        remaining_text = format_remaining(whole)
+
+        self.timer_label.update(f"Training Session\nTime remaining: {remaining_text}")
+
+        if now >= self._next_info:
+            self.info_label.update(self.info_text())
+            self._next_info = now + self.info_interval
+
+        if whole <= 0:
+            return None
+
+        if self.notify is not None and now >= self._next_notify:
+            self.notify(remaining_text)
+            self._next_notify = now + self.notify_interval
+
+        # Wake up just after the displayed second rolls over.
+        until_next_second = left - (whole - 1)
+        return max(1, math.ceil(until_next_second * 1000))
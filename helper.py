@@ -0,0 +1,425 @@
+"""
+Session primitives for FitBlock, in-process or in a privileged helper.
+
+Blocker owns everything a session changes outside the UI: the symbolic
+hotkeys, the Quartz event tap and the recovery journal. The UI can use it
+directly, or run it in a small helper process that is started once (with
+administrator privileges if needed) and kept warm, so starting a session is
+one round trip over a pipe instead of relaunching the whole app as root.
+
+Frames on the pipe are a 6-byte header (opcode, sequence number, status,
+payload length) followed by a short JSON payload. Replies echo the sequence
+number of their request, so a reply that arrives after its call timed out is
+recognised and dropped instead of answering the next call. The helper exits when the UI's end of the
+pipe closes, ending a running session first.
+
+    python3 helper.py --stub --read-fd 3 --write-fd 4    # stubbed primitives
+"""
+
+import argparse
+import json
+import os
+import plistlib
+import select
+import shlex
+import signal
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+
+import input_tap
+import teardown
+from recovery import RecoveryJournal
+from shortcuts import DefaultsStore, PlistFileStore, ShortcutManager
+
+HEADER = struct.Struct("!BHBH")  # opcode, sequence number, status, payload length
+PING, BEGIN, END, RECOVER, STATS, QUIT = range(1, 7)
+OK, ERROR = 0, 1
+OPCODES = {PING: "ping", BEGIN: "begin", END: "end", RECOVER: "recover", STATS: "stats", QUIT: "quit"}
+CONNECT_TIMEOUT = 60.0  # seconds to wait for an elevated helper (includes the password prompt)
+
+SHORTCUT_ERRORS = (subprocess.CalledProcessError, OSError, plistlib.InvalidFileException)
+
+
+class HelperError(Exception):
+    """Raised when the helper is unreachable or reports an error."""
+
+
+class FrameCutOff(HelperError):
+    """A read timed out partway through a frame; the pipe can't be resynchronised."""
+
+
+# -- framing -----------------------------------------------------------------
+
+def write_frame(fd, opcode, status=OK, payload=None, seq=0):
+    body = b"" if payload is None else json.dumps(payload, separators=(",", ":")).encode()
+    if len(body) > 0xFFFF:
+        raise HelperError(f"payload too large ({len(body)} bytes)")
+    data = HEADER.pack(opcode, seq, status, len(body)) + body
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def _read_exact(fd, size, deadline):
+    data = b""
+    while len(data) < size:
+        if deadline is not None:
+            remaining = max(0.0, deadline - time.monotonic())
+            if not select.select([fd], [], [], remaining)[0]:
+                if data:
+                    raise FrameCutOff("timed out in the middle of a reply from the helper")
+                raise HelperError("timed out waiting for the helper")
+        chunk = os.read(fd, size - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+
+def read_frame(fd, timeout=None):
+    """Read one frame; returns (opcode, seq, status, payload). Raises EOFError when the pipe closes."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    opcode, seq, status, length = HEADER.unpack(_read_exact(fd, HEADER.size, deadline))
+    try:
+        body = _read_exact(fd, length, deadline) if length else b""
+    except HelperError as e:
+        raise FrameCutOff(str(e))
+    return opcode, seq, status, json.loads(body) if body else None
+
+
+# -- primitives ----------------------------------------------------------------
+
+class StubTapSupervisor:
+    """Stand-in for input_tap.TapSupervisor that blocks nothing."""
+
+    def __init__(self):
+        self.mode = None
+        self.tap = None
+        self.sessions = 0
+        self._stopped = threading.Event()
+
+    def create(self, mode='full'):
+        self.mode = mode
+        self.tap = object()
+        self.sessions += 1
+        self._stopped.clear()
+        return self.tap
+
+    def run(self):
+        self._stopped.wait()
+
+    def stop(self):
+        self.tap = None
+        self._stopped.set()
+
+    def stats(self):
+        empty = input_tap.LatencyHistogram().snapshot()
+        return {'mode': self.mode, 'active': self.tap is not None, 'sessions': self.sessions, 'events': 0,
+                'disabled_by_timeout': 0, 'disabled_by_user_input': 0, 'reenabled': 0,
+                'latency_recent': empty, 'latency_lifetime': empty}
+
+
+class Blocker:
+    """Hotkeys, event tap and recovery journal for one session at a time."""
+
+    def __init__(self, shortcut_manager, tap_supervisor, journal, deadline=5.0):
+        self.shortcuts = shortcut_manager
+        self.taps = tap_supervisor
+        self.journal = journal
+        self.deadline = deadline
+        self.active = False
+
+    def begin(self, mode, start):
+        """Journal the session, disable the hotkeys and start the tap; returns step timings."""
+        timings = {}
+        spawns = self._spawns()
+        self.journal.begin(start)
+        self.active = True
+
+        t = time.perf_counter()
+        try:
+            changed = self.shortcuts.disable(before_save=self.journal.record_shortcuts)
+            print(f"System shortcuts disabled ({len(changed)} changed)")
+        except SHORTCUT_ERRORS as e:
+            print(f"Error disabling system shortcuts: {e}")
+        timings['disable_system_shortcuts'] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        tap = None
+        if self.taps is not None and mode is not None:
+            tap = self.taps.create(mode)
+            if tap is not None:
+                threading.Thread(target=self.taps.run, name="EventTap", daemon=True).start()
+        timings['create_event_tap'] = time.perf_counter() - t
+
+        return {'tap': tap is not None, 'timings': timings, 'spawns': self._spawns() - spawns}
+
+    def end(self):
+        """Stop the tap and restore the hotkeys concurrently; returns step results and timings."""
+        timings = {}
+        spawns = self._spawns()
+
+        def timed(name, function):
+            def step():
+                t = time.perf_counter()
+                try:
+                    function()
+                finally:
+                    timings[name] = time.perf_counter() - t
+            return name, step
+
+        steps = [timed("enable_system_shortcuts", self._restore_shortcuts)]
+        if self.taps is not None and self.taps.tap is not None:
+            steps.insert(0, timed("stop_event_tap", self.taps.stop))
+
+        results = teardown.run_steps(steps, self.deadline)
+        self.journal.end()
+        self.active = False
+        return {'results': results, 'timings': dict(timings), 'spawns': self._spawns() - spawns}
+
+    def _spawns(self):
+        """Subprocesses the hotkey store has started so far (0 for stores that spawn none)."""
+        return getattr(self.shortcuts.store, 'spawns', 0)
+
+    def _restore_shortcuts(self):
+        try:
+            # The journal keeps its snapshot unless this restore wrote it back.
+            if self.shortcuts.restore():
+                print("System shortcuts re-enabled")
+                self.journal.shortcuts_restored()
+        except SHORTCUT_ERRORS as e:
+            print(f"Error re-enabling system shortcuts: {e}")
+            raise
+
+    def recover(self):
+        """Undo what an interrupted session left behind; returns what was found, or None."""
+        entry = self.journal.pending()
+        if entry is None:
+            return None
+        if entry['shortcuts']:
+            self.shortcuts.restore(entry['shortcuts'])
+        self.journal.clear()
+        return {'start': entry.get('start') or None, 'ended': entry['ended'], 'restored': len(entry['shortcuts'])}
+
+    def stats(self):
+        return self.taps.stats() if self.taps is not None else None
+
+    def close(self):
+        if self.active:
+            self.end()
+
+
+# -- helper process ------------------------------------------------------------
+
+def serve(blocker, read_fd, write_fd):
+    """Answer frames until QUIT or until the UI's end of the pipe closes."""
+    handlers = {
+        PING: lambda body: {'pid': os.getpid(), 'euid': os.geteuid()},
+        BEGIN: lambda body: blocker.begin(body.get('mode'), body['start']),
+        END: lambda body: blocker.end(),
+        RECOVER: lambda body: blocker.recover(),
+        STATS: lambda body: blocker.stats(),
+    }
+    try:
+        while True:
+            opcode, seq, _, body = read_frame(read_fd)
+            if opcode == QUIT:
+                write_frame(write_fd, QUIT, seq=seq)
+                return
+            handler = handlers.get(opcode)
+            if handler is None:
+                write_frame(write_fd, opcode, ERROR, f"unknown opcode {opcode}", seq)
+                continue
+            try:
+                write_frame(write_fd, opcode, OK, handler(body or {}), seq)
+            except Exception as e:
+                write_frame(write_fd, opcode, ERROR, str(e), seq)
+    except (EOFError, BrokenPipeError):
+        pass
+    finally:
+        # The UI went away mid-session: put the system back before exiting.
+        blocker.close()
+
+
+class HelperClient:
+    """UI side of the helper pipe, with the same methods as Blocker."""
+
+    def __init__(self, read_fd, write_fd, process=None, timeout=10.0):
+        self.read_fd = read_fd
+        self.write_fd = write_fd
+        self.process = process
+        self.timeout = timeout
+        self.round_trips = 0
+        self.stale_replies = 0
+        self._seq = 0
+        self._broken = None
+        self._lock = threading.Lock()
+
+    def call(self, opcode, payload=None, timeout=None):
+        with self._lock:
+            if self._broken is not None:
+                raise HelperError(f"helper connection lost ({self._broken})")
+            self._seq = (self._seq + 1) & 0xFFFF
+            deadline = time.monotonic() + (timeout or self.timeout)
+            try:
+                write_frame(self.write_fd, opcode, OK, payload, self._seq)
+                while True:
+                    reply, seq, status, body = read_frame(self.read_fd, deadline - time.monotonic())
+                    if seq == self._seq:
+                        break
+                    # The reply to an earlier call that timed out; nobody is waiting for it.
+                    self.stale_replies += 1
+            except FrameCutOff as e:
+                # Half a frame is gone for good. Closing the pipe makes the
+                # helper end any session and exit; later calls fail fast.
+                self._broken = str(e)
+                self._close_pipe()
+                raise
+            except (OSError, EOFError) as e:
+                raise HelperError(f"helper is not running ({e or 'pipe closed'})")
+            self.round_trips += 1
+        if reply != opcode:
+            raise HelperError(f"out-of-order reply to {OPCODES.get(opcode)}")
+        if status != OK:
+            raise HelperError(body)
+        return body
+
+    def ping(self):
+        return self.call(PING)
+
+    def begin(self, mode, start):
+        return self.call(BEGIN, {'mode': mode, 'start': start})
+
+    def end(self):
+        return self.call(END, timeout=self.timeout + 5.0)
+
+    def recover(self):
+        return self.call(RECOVER)
+
+    def stats(self):
+        return self.call(STATS)
+
+    def close(self):
+        try:
+            self.call(QUIT, timeout=2.0)
+        except HelperError:
+            pass
+        self._close_pipe()
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=2.0)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def _close_pipe(self):
+        for fd in (self.read_fd, self.write_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.read_fd = self.write_fd = -1
+
+    @classmethod
+    def spawn(cls, command, extra_args=(), output=None):
+        """Start the helper as a child process with the current privileges.
+
+        output is where the helper's stdout and stderr go (default: inherited).
+        """
+        to_helper_r, to_helper_w = os.pipe()
+        from_helper_r, from_helper_w = os.pipe()
+        process = subprocess.Popen(
+            list(command) + ["--read-fd", str(to_helper_r), "--write-fd", str(from_helper_w)] + list(extra_args),
+            pass_fds=(to_helper_r, from_helper_w), close_fds=True, stdout=output, stderr=output)
+        os.close(to_helper_r)
+        os.close(from_helper_w)
+        client = cls(from_helper_r, to_helper_w, process)
+        client.ping()
+        return client
+
+    @classmethod
+    def launch_privileged(cls, command, extra_args=()):
+        """Start the helper as root through an administrator prompt, connected by FIFOs."""
+        directory = tempfile.mkdtemp(prefix="fitblock-helper-")
+        to_helper = os.path.join(directory, "in")
+        from_helper = os.path.join(directory, "out")
+        os.mkfifo(to_helper, 0o600)
+        os.mkfifo(from_helper, 0o600)
+
+        shell = " ".join(shlex.quote(arg) for arg in list(command) + ["--fifo", directory] + list(extra_args))
+        script = f'do shell script "{_applescript_escape(shell)} > /dev/null 2>&1 &" with administrator privileges'
+        try:
+            subprocess.run(["osascript", "-e", script], check=True, capture_output=True)
+            # Same order as the helper: its request FIFO first, then the reply FIFO.
+            write_fd = _open_fifo_writer(to_helper, CONNECT_TIMEOUT)
+            os.set_blocking(write_fd, True)
+            read_fd = os.open(from_helper, os.O_RDONLY)
+        finally:
+            # Both ends are open (or we failed); the names are no longer needed.
+            for path in (to_helper, from_helper):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            os.rmdir(directory)
+        client = cls(read_fd, write_fd)
+        client.ping()
+        return client
+
+
+def _open_fifo_writer(path, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError:  # ENXIO until the helper has opened its end
+            if time.monotonic() > deadline:
+                raise HelperError("helper did not start")
+            time.sleep(0.01)
+
+
+def _applescript_escape(text):
+    return text.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def build_blocker(stub, journal_path, owner=None, deadline=5.0):
+    """Blocker with real primitives, or stubbed ones that change nothing."""
+    journal = RecoveryJournal(journal_path, owner=owner)
+    if stub:
+        store = PlistFileStore(os.path.join(tempfile.mkdtemp(prefix="fitblock-stub-"), "hotkeys.plist"))
+        return Blocker(ShortcutManager(store), StubTapSupervisor(), journal, deadline)
+
+    return Blocker(ShortcutManager(DefaultsStore()), input_tap.load_supervisor(), journal, deadline)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="helper.py", description="FitBlock session helper")
+    parser.add_argument("--read-fd", type=int)
+    parser.add_argument("--write-fd", type=int)
+    parser.add_argument("--fifo", help="directory holding the 'in' and 'out' FIFOs")
+    parser.add_argument("--journal", default=os.path.expanduser("~/.fitblock_recovery.plist"))
+    parser.add_argument("--owner", help="uid:gid that should own the journal")
+    parser.add_argument("--stub", action="store_true", help="use stubbed primitives that change nothing")
+    args = parser.parse_args(argv)
+
+    if args.fifo:
+        read_fd = os.open(os.path.join(args.fifo, "in"), os.O_RDONLY)
+        write_fd = os.open(os.path.join(args.fifo, "out"), os.O_WRONLY)
+    elif args.read_fd is not None and args.write_fd is not None:
+        read_fd, write_fd = args.read_fd, args.write_fd
+    else:
+        parser.error("either --fifo or --read-fd/--write-fd is required")
+
+    # Ctrl-C reaches the whole foreground process group. The UI winds the
+    # session down through the pipe, and serve() restores everything once
+    # the pipe closes, so the helper must not die first.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # A spawned helper inherits the UI's blocked signal mask (see main.watch_signals).
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGINT, signal.SIGTERM})
+    owner = tuple(int(part) for part in args.owner.split(":")) if args.owner else None
+    serve(build_blocker(args.stub, args.journal, owner), read_fd, write_fd)
+
+
+if __name__ == "__main__":
+    main()
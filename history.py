@@ -0,0 +1,218 @@
+"""
+Append-only session history for FitBlock.
+
+Every session is stored as a fixed-size binary record in a memory-mapped
+file. A second small file keeps one rollup record per local calendar day, so
+daily and weekly statistics only have to look at one record per day no
+matter how many sessions were recorded.
+"""
+
+import mmap
+import os
+import struct
+import threading
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+MAGIC = b"FBHIST01"
+HEADER = struct.Struct("<8sII")  # magic, record size, record count
+RECORD = struct.Struct("<ddffB7x")  # start, end, planned, actual, aborted
+DAY = struct.Struct("<iIIf")  # date ordinal, completed, aborted, blocked seconds
+GROW_RECORDS = 1024
+
+SessionRecord = namedtuple('SessionRecord', ['start', 'end', 'planned', 'actual', 'aborted'])
+DayRollup = namedtuple('DayRollup', ['day', 'completed', 'aborted', 'seconds'])
+
+
+def local_day(timestamp):
+    """Return the local calendar date a Unix timestamp falls on."""
+    return datetime.fromtimestamp(timestamp).date()
+
+
+class SessionHistory:
+    """Memory-mapped, append-only store of session records with daily rollups."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rollup_path = path + ".days"
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+        self._count = 0
+        self._days = None
+        self._day_slots = None
+
+    # -- storage -----------------------------------------------------------
+
+    def _open(self):
+        if self._map is not None:
+            return
+        new = not os.path.exists(self.path) or os.path.getsize(self.path) < HEADER.size
+        self._file = open(self.path, "r+b" if not new else "w+b")
+        if new:
+            self._file.write(HEADER.pack(MAGIC, RECORD.size, 0))
+            self._file.truncate(HEADER.size + GROW_RECORDS * RECORD.size)
+            self._file.flush()
+
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, record_size, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{self.path} is not a FitBlock session history file")
+        self._count = min(count, (len(self._map) - HEADER.size) // RECORD.size)
+
+    def _capacity(self):
+        return (len(self._map) - HEADER.size) // RECORD.size
+
+    def _grow(self):
+        size = HEADER.size + (self._capacity() + GROW_RECORDS) * RECORD.size
+        self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # -- writing -----------------------------------------------------------
+
+    def append(self, start, end, planned, aborted=False):
+        """Record one session (start/end are Unix timestamps)."""
+        actual = max(0.0, end - start)
+        with self._lock:
+            self._open()
+            self._load_days()
+            if self._count >= self._capacity():
+                self._grow()
+
+            offset = HEADER.size + self._count * RECORD.size
+            RECORD.pack_into(self._map, offset, start, end, planned, actual, 1 if aborted else 0)
+            self._count += 1
+            # Publish the record by bumping the count only after it is written.
+            HEADER.pack_into(self._map, 0, MAGIC, RECORD.size, self._count)
+            self._map.flush()
+
+            self._update_rollup(local_day(start), aborted, actual)
+
+    def _load_days(self):
+        if self._days is not None:
+            return
+        self._days = {}
+        self._day_slots = {}
+        try:
+            with open(self.rollup_path, "rb") as f:
+                data = f.read()
+            for slot, values in enumerate(DAY.iter_unpack(data[:len(data) - len(data) % DAY.size])):
+                rollup = DayRollup(date.fromordinal(values[0]), *values[1:])
+                self._days[rollup.day] = rollup
+                self._day_slots[rollup.day] = slot
+        except (OSError, ValueError):
+            self._days = None
+
+        if self._days is None or sum(d.completed + d.aborted for d in self._days.values()) != self._count:
+            self._rebuild_rollups()
+
+    def _rebuild_rollups(self):
+        """Recompute the daily rollups from the raw records (O(sessions), only on mismatch)."""
+        self._days = {}
+        for record in self._iter_records():
+            self._add_to_day(local_day(record.start), record.aborted, record.actual)
+        self._write_rollups()
+
+    def _add_to_day(self, day, aborted, seconds):
+        current = self._days.get(day) or DayRollup(day, 0, 0, 0.0)
+        self._days[day] = DayRollup(
+            day,
+            current.completed + (0 if aborted else 1),
+            current.aborted + (1 if aborted else 0),
+            current.seconds + seconds,
+        )
+
+    def _update_rollup(self, day, aborted, seconds):
+        """Add one session to its day and rewrite just that day's rollup record."""
+        self._add_to_day(day, aborted, seconds)
+
+        slot = self._day_slots.get(day)
+        if slot is None:
+            slot = self._day_slots[day] = len(self._day_slots)
+        rollup = self._days[day]
+        with open(self.rollup_path, "r+b" if os.path.exists(self.rollup_path) else "w+b") as f:
+            f.seek(slot * DAY.size)
+            f.write(DAY.pack(day.toordinal(), rollup.completed, rollup.aborted, rollup.seconds))
+
+    def _write_rollups(self):
+        ordered = sorted(self._days.values())
+        self._day_slots = {d.day: slot for slot, d in enumerate(ordered)}
+        payload = b"".join(
+            DAY.pack(d.day.toordinal(), d.completed, d.aborted, d.seconds)
+            for d in ordered)
+        tmp_path = self.rollup_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.rollup_path)
+
+    # -- reading -----------------------------------------------------------
+
+    def __len__(self):
+        with self._lock:
+            if not os.path.exists(self.path):
+                return 0
+            self._open()
+            return self._count
+
+    def _iter_records(self):
+        data = self._map[HEADER.size:HEADER.size + self._count * RECORD.size]
+        for start, end, planned, actual, aborted in RECORD.iter_unpack(data):
+            yield SessionRecord(start, end, planned, actual, bool(aborted))
+
+    def records(self, since=None, chunk=GROW_RECORDS):
+        """Stream session records in the order they were recorded."""
+        index = 0
+        while True:
+            with self._lock:
+                if not os.path.exists(self.path):
+                    return
+                self._open()
+                end = min(self._count, index + chunk)
+                data = self._map[HEADER.size + index * RECORD.size:HEADER.size + end * RECORD.size]
+            if not data:
+                return
+            for start, stop, planned, actual, aborted in RECORD.iter_unpack(data):
+                if since is None or start >= since:
+                    yield SessionRecord(start, stop, planned, actual, bool(aborted))
+            index = end
+
+    def days(self, first=None, last=None):
+        """Return daily rollups between first and last (inclusive), oldest first."""
+        with self._lock:
+            if not os.path.exists(self.path):
+                return []
+            self._open()
+            self._load_days()
+            return [d for d in sorted(self._days.values())
+                    if (first is None or d.day >= first) and (last is None or d.day <= last)]
+
+    def weeks(self, first=None, last=None):
+        """Return rollups per ISO week (keyed by the week's Monday), oldest first."""
+        weeks = {}
+        for d in self.days(first, last):
+            monday = d.day - timedelta(days=d.day.weekday())
+            current = weeks.get(monday) or DayRollup(monday, 0, 0, 0.0)
+            weeks[monday] = DayRollup(monday, current.completed + d.completed,
+                                      current.aborted + d.aborted, current.seconds + d.seconds)
+        return [weeks[monday] for monday in sorted(weeks)]
+
+    def totals(self, first=None, last=None):
+        """Sum of the daily rollups between first and last."""
+        completed = aborted = 0
+        seconds = 0.0
+        for d in self.days(first, last):
+            completed += d.completed
+            aborted += d.aborted
+            seconds += d.seconds
+        return DayRollup(first, completed, aborted, seconds)
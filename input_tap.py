@@ -0,0 +1,289 @@
+"""
+Quartz event-tap helpers for FitBlock's input blocking.
+
+The tap can be created with one of several mask tiers. Every event type in
+the mask crosses from CoreGraphics into the Python callback, so cheaper tiers
+leave high-rate events (mouse movement, drags) out of the tap entirely.
+"""
+
+import threading
+from bisect import bisect_left
+from collections import deque
+from time import perf_counter_ns
+
+KEYBOARD_EVENTS = (
+    'kCGEventKeyDown',
+    'kCGEventKeyUp',
+    'kCGEventFlagsChanged',
+)
+
+CLICK_EVENTS = (
+    'kCGEventLeftMouseDown',
+    'kCGEventRightMouseDown',
+    'kCGEventLeftMouseUp',
+    'kCGEventRightMouseUp',
+    'kCGEventScrollWheel',
+)
+
+MOTION_EVENTS = (
+    'kCGEventMouseMoved',
+    'kCGEventLeftMouseDragged',
+    'kCGEventRightMouseDragged',
+)
+
+TAP_MODES = {
+    'keyboard': KEYBOARD_EVENTS,
+    'clicks': KEYBOARD_EVENTS + CLICK_EVENTS,
+    'full': KEYBOARD_EVENTS + CLICK_EVENTS + MOTION_EVENTS,
+}
+
+
+def event_mask(quartz, mode='full'):
+    """Return the CGEventMask for a tap mode."""
+    try:
+        names = TAP_MODES[mode]
+    except KeyError:
+        raise ValueError(f"Unknown event tap mode {mode!r}; expected one of {', '.join(TAP_MODES)}")
+
+    mask = 0
+    for name in names:
+        mask |= quartz.CGEventMaskBit(getattr(quartz, name))
+    return mask
+
+
+def block_event(proxy, event_type, event, refcon):
+    """Swallow every event delivered to the tap."""
+    return None
+
+
+def create_tap(quartz, mode='full', callback=block_event):
+    """Create and enable a session event tap; returns (tap, run_loop_source) or (None, None).
+
+    The run loop source must be added to the run loop of the thread that runs
+    it, see run_tap_loop().
+    """
+    tap = quartz.CGEventTapCreate(
+        quartz.kCGSessionEventTap,
+        quartz.kCGHeadInsertEventTap,
+        0,
+        event_mask(quartz, mode),
+        callback,
+        None
+    )
+    if not tap:
+        return None, None
+
+    source = quartz.CFMachPortCreateRunLoopSource(None, tap, 0)
+    quartz.CGEventTapEnable(tap, True)
+    return tap, source
+
+
+def run_tap_loop(quartz, source):
+    """Attach source to the calling thread's run loop and run it."""
+    quartz.CFRunLoopAddSource(
+        quartz.CFRunLoopGetCurrent(),
+        source,
+        quartz.kCFRunLoopCommonModes
+    )
+    quartz.CFRunLoopRun()
+
+
+# Upper bounds (in nanoseconds) of the callback latency histogram buckets.
+LATENCY_BUCKETS_NS = (
+    250, 500, 1_000, 2_000, 5_000, 10_000, 20_000, 50_000,
+    100_000, 200_000, 500_000, 1_000_000, 5_000_000,
+)
+
+# Event types CoreGraphics sends to the callback when it disables the tap.
+TAP_DISABLED_BY_TIMEOUT = 0xFFFFFFFE
+TAP_DISABLED_BY_USER_INPUT = 0xFFFFFFFF
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of durations in nanoseconds."""
+
+    def __init__(self, bounds=LATENCY_BUCKETS_NS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns):
+        self.counts[bisect_left(self.bounds, ns)] += 1
+        self.count += 1
+        self.sum_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.sum_ns += other.sum_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    def percentile(self, q):
+        """Return the upper bucket bound below which a fraction q of samples fall."""
+        if not self.count:
+            return 0
+        threshold = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= threshold:
+                return bound
+        return self.max_ns
+
+    def snapshot(self):
+        return {
+            'buckets_ns': list(self.bounds),
+            'counts': list(self.counts),
+            'count': self.count,
+            'sum_ns': self.sum_ns,
+            'max_ns': self.max_ns,
+            'p50_ns': self.percentile(0.5),
+            'p99_ns': self.percentile(0.99),
+        }
+
+
+class RollingHistogram:
+    """Latency histogram over the last few fixed-length windows, plus lifetime totals."""
+
+    def __init__(self, window_seconds=60, windows=10, bounds=LATENCY_BUCKETS_NS):
+        self.window_ns = int(window_seconds * 1e9)
+        self.bounds = bounds
+        self._retired = LatencyHistogram(bounds)
+        self._windows = deque(maxlen=windows)
+        self._current = LatencyHistogram(bounds)
+        self._current_end = 0
+
+    def record(self, ns, now_ns):
+        if now_ns >= self._current_end:
+            self._rotate(now_ns)
+        self._current.record(ns)
+
+    def _rotate(self, now_ns):
+        if len(self._windows) == self._windows.maxlen:
+            self._retired.merge(self._windows[0])
+        self._current = LatencyHistogram(self.bounds)
+        self._current_end = now_ns + self.window_ns
+        self._windows.append(self._current)
+
+    def recent(self):
+        """Merge the retained windows into one histogram."""
+        merged = LatencyHistogram(self.bounds)
+        for window in list(self._windows):
+            merged.merge(window)
+        return merged
+
+    def lifetime(self):
+        """Merge every window ever recorded into one histogram."""
+        merged = self.recent()
+        merged.merge(self._retired)
+        return merged
+
+
+class TapSupervisor:
+    """Own the event tap, re-enable it when macOS disables it and record callback latency.
+
+    macOS disables a tap whose callback is too slow (or during secure input)
+    and tells the callback with a special event type. The supervisor counts
+    those, turns the tap straight back on, and keeps a rolling histogram of
+    how long the handler takes, sampled every sample_every events.
+    """
+
+    def __init__(self, quartz, handler=block_event, window_seconds=60, windows=10, sample_every=8):
+        self.quartz = quartz
+        self.handler = handler
+        self.sample_every = sample_every
+        self.mode = None
+        self.tap = None
+        self.source = None
+        self.run_loop = None
+        self.latency = RollingHistogram(window_seconds, windows)
+        self.events = 0
+        self.disabled_by_timeout = 0
+        self.disabled_by_user_input = 0
+        self.reenabled = 0
+        self.sessions = 0
+        self._lock = threading.Lock()
+
+    def callback(self, proxy, event_type, event, refcon):
+        if event_type >= TAP_DISABLED_BY_TIMEOUT:
+            self._handle_disabled(event_type)
+            return event
+
+        self.events += 1
+        if self.events % self.sample_every:
+            return self.handler(proxy, event_type, event, refcon)
+
+        # Only every sample_every-th event pays for the timing and histogram.
+        start = perf_counter_ns()
+        result = self.handler(proxy, event_type, event, refcon)
+        end = perf_counter_ns()
+        self.latency.record(end - start, end)
+        return result
+
+    def _handle_disabled(self, event_type):
+        if event_type == TAP_DISABLED_BY_TIMEOUT:
+            self.disabled_by_timeout += 1
+        else:
+            self.disabled_by_user_input += 1
+        if self.tap is not None:
+            self.quartz.CGEventTapEnable(self.tap, True)
+            self.reenabled += 1
+
+    def create(self, mode='full'):
+        """Create and enable the tap; returns it, or None if macOS refused."""
+        self.mode = mode
+        self.tap, self.source = create_tap(self.quartz, mode, self.callback)
+        if self.tap is not None:
+            self.sessions += 1
+        return self.tap
+
+    def run(self):
+        """Run the tap on the calling thread until stop() is called."""
+        with self._lock:
+            source = self.source
+            if source is None:
+                return
+            self.run_loop = self.quartz.CFRunLoopGetCurrent()
+        run_tap_loop(self.quartz, source)
+
+    def stop(self):
+        """Disable the tap and stop its run loop so the tap thread exits."""
+        with self._lock:
+            tap, run_loop = self.tap, self.run_loop
+            self.tap = self.source = self.run_loop = None
+        if tap is not None:
+            self.quartz.CGEventTapEnable(tap, False)
+            # Invalidating the port removes its source, so a run loop that
+            # has not started spinning yet returns immediately as well.
+            self.quartz.CFMachPortInvalidate(tap)
+        if run_loop is not None:
+            self.quartz.CFRunLoopStop(run_loop)
+
+    def stats(self):
+        """Return a snapshot of tap health counters and callback latency."""
+        return {
+            'mode': self.mode,
+            'active': self.tap is not None,
+            'sessions': self.sessions,
+            'events': self.events,
+            'disabled_by_timeout': self.disabled_by_timeout,
+            'disabled_by_user_input': self.disabled_by_user_input,
+            'reenabled': self.reenabled,
+            'latency_recent': self.latency.recent().snapshot(),
+            'latency_lifetime': self.latency.lifetime().snapshot(),
+        }
+
+
+def load_supervisor():
+    """TapSupervisor on the real Quartz, or None where PyObjC is missing."""
+    try:
+        import Quartz
+    except ImportError as e:
+        print(f"PyObjC not available - input blocking disabled: {e}")
+        return None
+    return TapSupervisor(Quartz)
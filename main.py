@@ -1,581 +1,899 @@
+import argparse
+import atexit
 import sys
 import os
-import threading
 import time
 import json
-from datetime import datetime, timedelta
-import tkinter as tk
+from datetime import date, datetime, timedelta
 import subprocess
 import signal
-
-try:
-    import Quartz
-    from Foundation import NSObject, NSLog
-    from AppKit import (
-        NSApplication, NSStatusBar, NSMenu, NSMenuItem,
-        NSImage, NSVariableStatusItemLength
-    )
-
-    PYOBJC_AVAILABLE = True
-except ImportError as e:
-    print(f"PyObjC not available: {e}")
-    print("Install with: pip install pyobjc-framework-Quartz pyobjc-framework-Cocoa")
-    PYOBJC_AVAILABLE = False
+import tempfile
+import threading
+import contextlib
+import io
+from contextlib import contextmanager
+
+from budget import ResourceBudget
+from clock import SystemClock, VirtualClock
+import control
+from countdown import CountdownEngine
+import helper
+from helper import SHORTCUT_ERRORS, Blocker, HelperClient, HelperError
+from history import SessionHistory
+import input_tap
+from metrics import MetricsServer, Registry
+from menu_model import format_elapsed, whole_hours
+from overlay import HeadlessRenderer, OverlayManager, TkRenderer
+from notifier import NotificationService, NullBackend
+from orchestrator import Orchestrator
+from recovery import RecoveryJournal
+from scheduler import SessionScheduler
+from skip_rules import SkipRules
+from shortcuts import DefaultsStore, PlistFileStore, ShortcutManager
+from state_store import StateStore
+from state_writer import StateWriter
+import teardown
+from tracing import Tracer
 
 BLOCK_DURATION = 120  # seconds
+SESSION_INTERVAL = 3600  # seconds between sessions, aligned to local midnight
+EVENT_TAP_MODE = os.environ.get("FITBLOCK_TAP_MODE", "full")  # keyboard, clicks or full
+HELPER_MODE = os.environ.get("FITBLOCK_HELPER", "auto")  # auto, local or stub
 STATE_FILE = os.path.expanduser("~/.fitblock_state.json")
-
-app_state = {
+STATE_WRITE_DELAY = 0.5  # seconds to coalesce bursts of state changes
+METRICS_PORT = int(os.environ.get("FITBLOCK_METRICS_PORT", "0"))  # 0 disables /metrics
+HISTORY_FILE = os.path.expanduser("~/.fitblock_history.bin")
+TRACE_DIR = os.environ.get("FITBLOCK_TRACE_DIR")  # per-session Chrome traces when set
+DEFAULT_TRACE_DIR = os.path.expanduser("~/.fitblock_traces")
+CONTROL_SOCKET = os.path.expanduser("~/.fitblock.sock")
+RECOVERY_FILE = os.path.expanduser("~/.fitblock_recovery.plist")
+RULES_FILE = os.path.expanduser("~/.fitblock_rules.json")  # calendars and quiet hours
+TEARDOWN_DEADLINE = 5.0  # seconds allowed for restoring the system after a session
+SHUTDOWN_DEADLINE = 10.0  # seconds for the running session and background tasks to wind down
+UPLOAD_URL = os.environ.get("FITBLOCK_UPLOAD_URL")  # fleet collector for session records; unset disables
+SPOOL_DIR = os.path.expanduser("~/.fitblock_spool")
+HEADLESS = False  # no window, input tap or notifications (simulation mode)
+
+clock = SystemClock()
+orchestrator = Orchestrator(SHUTDOWN_DEADLINE)
+
+state_writer = StateWriter(STATE_FILE, delay=STATE_WRITE_DELAY)
+atexit.register(state_writer.flush)
+
+metrics_registry = Registry()
+sessions_completed_total = metrics_registry.counter(
+    "fitblock_sessions_completed_total", "Blocking sessions that ran to the end.")
+sessions_aborted_total = metrics_registry.counter(
+    "fitblock_sessions_aborted_total", "Blocking sessions interrupted by an error or signal.")
+paused_gauge = metrics_registry.gauge(
+    "fitblock_paused", "1 while training is paused.")
+session_active_gauge = metrics_registry.gauge(
+    "fitblock_session_active", "1 while a blocking session is running.")
+phase_seconds = metrics_registry.histogram(
+    "fitblock_phase_seconds", "Time spent in each phase of a blocking session.", label="phase",
+    label_values=('disable_system_shortcuts', 'create_event_tap', 'create_blocking_window', 'cleanup'))
+notification_seconds = metrics_registry.histogram(
+    "fitblock_notification_seconds", "Time spent running the notification subprocess.",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+tracer = Tracer(TRACE_DIR)
+
+shortcut_manager = ShortcutManager(DefaultsStore())
+session_history = SessionHistory(HISTORY_FILE)
+recovery_journal = RecoveryJournal(RECOVERY_FILE)
+skip_rules = SkipRules(RULES_FILE)
+uploader = None
+if UPLOAD_URL:
+    # Only imported when uploads are configured: uuid and friends cost a few ms at launch.
+    from uploader import SessionUploader
+    uploader = SessionUploader(UPLOAD_URL, SPOOL_DIR)
+overlay = OverlayManager(TkRenderer())  # tkinter is imported when the window is first created
+current_session = {}  # 'start': Unix time of the running session
+tap_supervisor = None  # set by load_input_blocker() when the event tap runs in-process
+blocker = Blocker(shortcut_manager, tap_supervisor, recovery_journal, TEARDOWN_DEADLINE)
+
+
+def initial_state():
+    """Return the state of a fresh install (or after resetting statistics)."""
+    return {
+        'start_time': clock.now(),
+        'sessions_completed': 0,
+        'current_session_start': None,
+        'paused': False,
+        'pause_start_time': None
+    }
+
+
+app_state = StateStore({
     'start_time': None,
     'sessions_completed': 0,
     'current_session_start': None,
     'paused': False,
     'pause_start_time': None
-}
+})
 
 
 def load_state():
     """Load application state from file."""
-    global app_state
     try:
         if os.path.exists(STATE_FILE):
             with open(STATE_FILE, 'r') as f:
                 saved_state = json.load(f)
-                app_state.update(saved_state)
-                if app_state['start_time']:
-                    app_state['start_time'] = datetime.fromisoformat(app_state['start_time'])
-                if app_state['current_session_start']:
-                    app_state['current_session_start'] = datetime.fromisoformat(app_state['current_session_start'])
-                if app_state['pause_start_time']:
-                    app_state['pause_start_time'] = datetime.fromisoformat(app_state['pause_start_time'])
-                print(
-                    f"Loaded state: {app_state['sessions_completed']} sessions completed since {app_state['start_time']}")
+            for key in ('start_time', 'current_session_start', 'pause_start_time'):
+                if saved_state.get(key):
+                    saved_state[key] = datetime.fromisoformat(saved_state[key])
+            # No session can be running yet; a saved one was interrupted and
+            # has already been dealt with by recover_interrupted_session().
+            saved_state['current_session_start'] = None
+            app_state.update(saved_state)
+            print(
+                f"Loaded state: {app_state['sessions_completed']} sessions completed since {app_state['start_time']}")
         else:
-            app_state['start_time'] = datetime.now()
-            app_state['sessions_completed'] = 0
-            app_state['current_session_start'] = None
-            app_state['paused'] = False
-            app_state['pause_start_time'] = None
+            app_state.update(initial_state())
             save_state()
             print("First run - initialized state")
     except Exception as e:
         print(f"Error loading state: {e}")
-        app_state['start_time'] = datetime.now()
-        app_state['sessions_completed'] = 0
-        app_state['current_session_start'] = None
-        app_state['paused'] = False
-        app_state['pause_start_time'] = None
+        app_state.update(initial_state())
+
+
+def update_state_gauges(changed, version):
+    """State subscriber keeping the pause/session gauges current."""
+    state = app_state.snapshot()[1]
+    paused_gauge.set(1 if state['paused'] else 0)
+    session_active_gauge.set(1 if state['current_session_start'] else 0)
 
 
 def save_state():
-    """Save application state to file."""
+    """Queue the current application state for a background write."""
     try:
-        state_to_save = app_state.copy()
-        if state_to_save['start_time']:
-            state_to_save['start_time'] = state_to_save['start_time'].isoformat()
-        if state_to_save['current_session_start']:
-            state_to_save['current_session_start'] = state_to_save['current_session_start'].isoformat()
-        if state_to_save['pause_start_time']:
-            state_to_save['pause_start_time'] = state_to_save['pause_start_time'].isoformat()
-
-        with open(STATE_FILE, 'w') as f:
-            json.dump(state_to_save, f, indent=2)
+        state_to_save = dict(app_state.snapshot()[1])
+        for key in ('start_time', 'current_session_start', 'pause_start_time'):
+            if state_to_save[key]:
+                state_to_save[key] = state_to_save[key].isoformat()
+
+        state_writer.submit(state_to_save)
     except Exception as e:
         print(f"Error saving state: {e}")
 
 
 def get_hours_since_start():
     """Calculate total hours since app first started."""
-    if app_state['start_time']:
-        elapsed = datetime.now() - app_state['start_time']
-        return int(elapsed.total_seconds() // 3600)
-    return 0
+    return whole_hours(app_state['start_time'], clock.now())
 
 
 def format_duration_since_start():
     """Format time elapsed since app first started."""
-    if not app_state['start_time']:
-        return "Unknown"
-
-    elapsed = datetime.now() - app_state['start_time']
-    days = elapsed.days
-    hours, remainder = divmod(elapsed.seconds, 3600)
+    return format_elapsed(app_state['start_time'], clock.now())
 
-    if days > 0:
-        return f"{days}d {hours}h ago"
-    elif hours > 0:
-        return f"{hours}h ago"
-    else:
-        minutes = remainder // 60
-        return f"{minutes}m ago"
 
+def helper_command():
+    """Command line that starts helper.py, from a script or from the bundled app."""
+    if getattr(sys, 'frozen', False):
+        return [sys.executable, "helper"]
+    return [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "helper.py")]
 
-def require_root():
-    """Check if running as root and request elevation if needed."""
-    if os.geteuid() != 0:
-        try:
-            if getattr(sys, 'frozen', False):
-                # Running as bundled app
-                app_path = sys.executable
-                script = f'''
-                do shell script "{app_path}" with administrator privileges
-                '''
-            else:
-                # Running as Python script
-                script = f'''
-                do shell script "python3 '{os.path.abspath(sys.argv[0])}'" with administrator privileges
-                '''
-
-            subprocess.check_call(['osascript', '-e', script])
-        except subprocess.CalledProcessError:
-            print("User cancelled or failed to authenticate.")
-        sys.exit(0)
 
+def start_blocker():
+    """Set up the session primitives, in-process or in a helper depending on HELPER_MODE.
 
-def send_macos_notification(title, message):
-    """Send a macOS notification."""
+    By default they run in-process when FitBlock is already root, and
+    otherwise in a helper started once through an administrator prompt;
+    only the helper runs as root.
+    """
+    global blocker
+    args = ["--journal", RECOVERY_FILE, "--owner", f"{os.getuid()}:{os.getgid()}"]
     try:
-        if getattr(sys, 'frozen', False):
-            base_path = os.path.dirname(sys.executable)
-            icon_path = os.path.join(base_path, "icon.icns")
+        if HELPER_MODE == "stub":
+            blocker = HelperClient.spawn(helper_command(), ["--stub", "--journal", RECOVERY_FILE + ".stub"])
+        elif HELPER_MODE == "local":
+            blocker = HelperClient.spawn(helper_command(), args)
+        elif os.geteuid() != 0:
+            blocker = HelperClient.launch_privileged(helper_command(), args)
         else:
-            icon_path = "icon.icns"
+            load_input_blocker()
+            return
+    except (subprocess.CalledProcessError, OSError, HelperError) as e:
+        print(f"Could not start the privileged helper: {e}")
+        print("User cancelled or failed to authenticate.")
+        sys.exit(0)
 
-        cmd = [
-            "terminal-notifier",
-            "-title", title,
-            "-message", message,
-            "-activate", "com.apple.Terminal"
-        ]
+    atexit.register(blocker.close)
+    print(f"Session helper running ({HELPER_MODE} mode)")
 
-        if os.path.exists(icon_path):
-            cmd.extend(["-appIcon", icon_path])
 
-        subprocess.run(cmd, check=False, capture_output=True)
-    except FileNotFoundError:
-        try:
-            script = f'display notification "{message}" with title "{title}"'
-            subprocess.run(['osascript', '-e', script], check=False)
-        except Exception as e:
-            print(f"Could not send notification: {e}")
+def load_input_blocker():
+    """Run the event tap in this process; imports Quartz, so only call it when blocking here."""
+    global tap_supervisor, blocker
+    tap_supervisor = input_tap.load_supervisor()
+    blocker = Blocker(shortcut_manager, tap_supervisor, recovery_journal, TEARDOWN_DEADLINE)
 
 
-def create_blocking_window():
-    """Create a fullscreen blocking window with countdown."""
-    root = tk.Tk()
-    root.attributes('-fullscreen', True)
-    root.configure(bg='black')
-    root.attributes('-topmost', True)
-    root.overrideredirect(True)
+def get_notification_icon_path():
+    """Resolve the icon shown next to notifications."""
+    if getattr(sys, 'frozen', False):
+        base_path = os.path.dirname(sys.executable)
+        return os.path.join(base_path, "icon.icns")
+    return "icon.icns"
 
-    root.focus_force()
-    root.grab_set()
 
-    label = tk.Label(root, text="", font=("Helvetica", 48), fg="white", bg="black")
-    label.pack(expand=True)
+def notification_sent(seconds):
+    """Record how long the notification subprocess took."""
+    notification_seconds.observe(seconds)
+    tracer.complete("notification_send", seconds)
 
-    info_label = tk.Label(root, text="", font=("Helvetica", 16), fg="#888888", bg="black")
-    info_label.pack(side='bottom', pady=20)
 
-    last_notified = {'time': None}
+notifier = NotificationService(icon_path=get_notification_icon_path(), on_send=notification_sent)
+atexit.register(notifier.flush)
 
-    def update_countdown(end_time):
-        remaining = max(0, int((end_time - datetime.now()).total_seconds()))
-        minutes, seconds = divmod(remaining, 60)
-        label.config(text=f"Training Session\nTime remaining: {minutes:02d}:{seconds:02d}")
 
-        session_num = app_state['sessions_completed'] + 1
-        started_text = format_duration_since_start()
-        total_hours = get_hours_since_start()
-        info_text = f"Session #{session_num} • Started {started_text} • {total_hours} total hours"
-        info_label.config(text=info_text)
-
-        if remaining > 0:
-            now = datetime.now()
-            if (last_notified['time'] is None or
-                    (now - last_notified['time']).total_seconds() >= 30):
-                send_macos_notification("🧠 Training Session",
-                                        f"Time remaining: {minutes:02d}:{seconds:02d}")
-                last_notified['time'] = now
-
-            root.after(1000, update_countdown, end_time)
-        else:
-            root.quit()
+def send_macos_notification(title, message, key=None):
+    """Queue a macOS notification; a pending one with the same key is replaced."""
+    # Counted here rather than when sent, so they are charged to the session that asked.
+    budget.count("wakeups.notifier")
+    notifier.notify(title, message, key=key)
 
-    end_time = datetime.now() + timedelta(seconds=BLOCK_DURATION)
-    update_countdown(end_time)
-    print("Fullscreen blocking window created")
 
-    def on_closing():
-        pass
+@contextmanager
+def session_phase(name):
+    """Time one phase of a session for both the metrics and the trace."""
+    with tracer.span(name), phase_seconds.time(name):
+        yield
 
-    root.protocol("WM_DELETE_WINDOW", on_closing)
-    root.mainloop()
 
+def make_countdown(set_timer_text, set_info_text):
+    """Countdown for one session, rendering through the given label setters."""
+    def info_text():
+        session_num = app_state['sessions_completed'] + 1
+        started_text = format_duration_since_start()
+        total_hours = get_hours_since_start()
+        return f"Session #{session_num} • Started {started_text} • {total_hours} total hours"
+
+    def notify(remaining_text):
+        send_macos_notification("🧠 Training Session",
+                                f"Time remaining: {remaining_text}",
+                                key="countdown")
+
+    return CountdownEngine(
+        BLOCK_DURATION,
+        set_timer_text=set_timer_text,
+        set_info_text=set_info_text,
+        info_text=info_text,
+        notify=notify,
+        clock=clock.monotonic,
+    )
 
-def create_event_tap():
-    """Create a Quartz event tap to block input events."""
-    if not PYOBJC_AVAILABLE:
-        print("PyObjC not available - input blocking disabled")
-        return None
 
-    def event_tap_callback(proxy, event_type, event, refcon):
-        return None
+async def create_blocking_window():
+    """Show the fullscreen blocking overlay and run the countdown until the block is over."""
+    countdown = make_countdown(overlay.renderer.set_timer_text, overlay.renderer.set_info_text)
+    print("Fullscreen blocking window shown")
+    try:
+        await overlay.run_session(countdown, on_visible=tracer.mark_locked)
+    finally:
+        budget.count("wakeups.countdown", countdown.ticks)
 
-    mask = (
-            Quartz.CGEventMaskBit(Quartz.kCGEventKeyDown) |
-            Quartz.CGEventMaskBit(Quartz.kCGEventKeyUp) |
-            Quartz.CGEventMaskBit(Quartz.kCGEventFlagsChanged) |
-            Quartz.CGEventMaskBit(Quartz.kCGEventLeftMouseDown) |
-            Quartz.CGEventMaskBit(Quartz.kCGEventRightMouseDown) |
-            Quartz.CGEventMaskBit(Quartz.kCGEventLeftMouseUp) |
-            Quartz.CGEventMaskBit(Quartz.kCGEventRightMouseUp) |
-            Quartz.CGEventMaskBit(Quartz.kCGEventMouseMoved) |
-            Quartz.CGEventMaskBit(Quartz.kCGEventScrollWheel) |
-            Quartz.CGEventMaskBit(Quartz.kCGEventLeftMouseDragged) |
-            Quartz.CGEventMaskBit(Quartz.kCGEventRightMouseDragged)
-    )
 
-    event_tap = Quartz.CGEventTapCreate(
-        Quartz.kCGSessionEventTap,
-        Quartz.kCGHeadInsertEventTap,
-        0,
-        mask,
-        event_tap_callback,
-        None
-    )
+def prepare_overlay():
+    """Create the hidden overlay window on the orchestrator's thread, ahead of the first session."""
+    try:
+        overlay.prepare()
+    except Exception as e:
+        print(f"Could not create the blocking window yet: {e}")
+
 
-    if not event_tap:
+def start_input_blocking():
+    """Disable the system shortcuts and start the event tap (one round trip with a helper)."""
+    mode = None if HEADLESS else EVENT_TAP_MODE
+    try:
+        result = blocker.begin(mode, current_session['start'])
+    except HelperError as e:
+        print(f"Error starting input blocking: {e}")
+        return False
+
+    for phase, seconds in result['timings'].items():
+        phase_seconds.observe(seconds, phase)
+        tracer.complete(phase, seconds)
+    budget.count("subprocesses.shortcuts", result['spawns'])
+
+    if result['tap']:
+        print(f"Event tap created ({EVENT_TAP_MODE} mode) - input blocking active")
+    elif mode is not None:
         print("Failed to create event tap.")
         print("Make sure:")
         print("1. App has Accessibility permissions (System Preferences > Security & Privacy > Accessibility)")
         print("2. Running with administrator privileges")
-        return None
+    return result['tap']
 
-    run_loop_source = Quartz.CFMachPortCreateRunLoopSource(None, event_tap, 0)
-    Quartz.CFRunLoopAddSource(
-        Quartz.CFRunLoopGetCurrent(),
-        run_loop_source,
-        Quartz.kCFRunLoopCommonModes
-    )
-    Quartz.CGEventTapEnable(event_tap, True)
-    print("Event tap created - input blocking active")
-    return event_tap
-
-
-def disable_system_shortcuts():
-    """Disable system keyboard shortcuts that could bypass blocking."""
-    shortcuts_to_disable = [
-        "52",  # Spotlight
-        "60",  # Spotlight menu
-        "61",  # Spotlight window
-        "64",  # Spotlight
-        "65",  # Spotlight
-        "98",  # Mission Control
-        "32",  # Mission Control F3
-        "34",  # Application windows F10
-        "162",  # Move focus to menu bar
-        "163",  # Move focus to dock
-    ]
 
+def cleanup():
+    """Restore system state; the restore steps run concurrently under TEARDOWN_DEADLINE."""
     try:
-        for shortcut in shortcuts_to_disable:
-            subprocess.run([
-                "defaults", "write", "com.apple.symbolichotkeys",
-                "AppleSymbolicHotKeys", "-dict-add", shortcut,
-                '{"enabled" = 0; "value" = { "parameters" = (); "type" = "standard"; };}'
-            ], check=True, capture_output=True)
-
-        subprocess.run(["killall", "SystemUIServer"], check=True, capture_output=True)
-        print("System shortcuts disabled")
-    except subprocess.CalledProcessError as e:
-        print(f"Error disabling system shortcuts: {e}")
+        result = blocker.end()
+    except HelperError as e:
+        print(f"Error during cleanup: {e}")
+        print("Anything left unrestored will be recovered on the next start")
+        return
 
+    for name, seconds in result['timings'].items():
+        tracer.complete(name, seconds)
+    budget.count("subprocesses.shortcuts", result['spawns'])
+    failed = {name: status for name, status in result['results'].items() if status != teardown.OK}
+    if failed:
+        for name, status in failed.items():
+            print(f"Error during cleanup: {name} {status}")
+        print("Anything left unrestored will be recovered on the next start")
+    else:
+        if 'stop_event_tap' in result['results']:
+            print("Event tap disabled")
+        print("Cleanup completed")
 
-def enable_system_shortcuts():
-    """Re-enable system keyboard shortcuts."""
-    shortcuts_to_enable = [
-        "52", "60", "61", "64", "65", "98", "32", "34", "162", "163"
-    ]
 
+def recover_interrupted_session():
+    """Undo what a session killed before its teardown left behind."""
     try:
-        for shortcut in shortcuts_to_enable:
-            subprocess.run([
-                "defaults", "write", "com.apple.symbolichotkeys",
-                "AppleSymbolicHotKeys", "-dict-add", shortcut,
-                '{"enabled" = 1; "value" = { "parameters" = (); "type" = "standard"; };}'
-            ], check=True, capture_output=True)
+        entry = blocker.recover()
+    except (HelperError,) + SHORTCUT_ERRORS as e:
+        print(f"Error recovering the interrupted session: {e}")
+        return
+    if entry is None:
+        return
 
-        subprocess.run(["killall", "SystemUIServer"], check=True, capture_output=True)
-        print("System shortcuts re-enabled")
-    except subprocess.CalledProcessError as e:
-        print(f"Error re-enabling system shortcuts: {e}")
+    print("Recovering from an interrupted session...")
+    if entry['restored']:
+        print(f"System shortcuts re-enabled ({entry['restored']} restored)")
+    if entry['start']:
+        end = max(entry['start'], entry['ended'])
+        try:
+            session_history.append(entry['start'], end, BLOCK_DURATION, aborted=True)
+        except (OSError, ValueError) as e:
+            print(f"Error recording session: {e}")
+        if uploader is not None:
+            uploader.submit(entry['start'], end, BLOCK_DURATION, aborted=True)
 
 
-def cleanup(event_tap):
-    """Clean up resources and restore system state."""
+def get_tap_stats():
+    """Return event tap health and callback latency, or None without an event tap."""
     try:
-        if event_tap and PYOBJC_AVAILABLE:
-            Quartz.CGEventTapEnable(event_tap, False)
-            print("Event tap disabled")
+        return blocker.stats()
+    except HelperError:
+        return None
 
-        enable_system_shortcuts()
-        print("Cleanup completed")
-    except Exception as e:
-        print(f"Error during cleanup: {e}")
 
+def record_session_end(aborted):
+    """Append the running session, if any, to the session history exactly once."""
+    start = current_session.pop('start', None)
+    if start is None:
+        return
+    end = clock.time()
+    try:
+        session_history.append(start, end, BLOCK_DURATION, aborted=aborted)
+    except (OSError, ValueError) as e:
+        print(f"Error recording session: {e}")
+    if uploader is not None:
+        uploader.submit(start, end, BLOCK_DURATION, aborted)
+
+
+def signal_handler(signum, frame):
+    """Shut down on SIGINT/SIGTERM; a running session is cancelled and restores the system itself."""
+    print("\nReceived interrupt signal, cleaning up...")
+    orchestrator.request_shutdown()
+
+
+def watch_signals():
+    """Take SIGINT/SIGTERM on a "Signals" thread; call before any other thread starts.
+
+    Python signal handlers only run when the main thread executes Python,
+    and behind the menu bar it sits in NSApplication.run() until some UI
+    event arrives. So the signals are blocked in every thread (the mask is
+    inherited) and collected with sigwait() instead.
+    """
+    signals = {signal.SIGINT, signal.SIGTERM}
+    signal.pthread_sigmask(signal.SIG_BLOCK, signals)
 
-def run_event_tap_loop():
-    """Run the Core Foundation run loop for event tapping."""
-    if PYOBJC_AVAILABLE:
-        Quartz.CFRunLoopRun()
+    def wait():
+        while True:
+            signal_handler(signal.sigwait(signals), None)
 
+    threading.Thread(target=wait, name="Signals", daemon=True).start()
 
-def run_blocker():
+
+async def run_blocker():
     """Main blocking function."""
     if app_state['paused']:
         print("App is paused - not starting blocking session")
         return
 
-    print(f"Starting {BLOCK_DURATION} second blocking session...")
+    skip = skip_rules.check(clock.time())
+    if skip:
+        reason, until = skip
+        print(f"Skipping session: {reason} until {datetime.fromtimestamp(until):%H:%M}")
+        return
 
-    app_state['current_session_start'] = datetime.now()
-    save_state()
+    print(f"Starting {BLOCK_DURATION} second blocking session...")
 
-    event_tap = None
+    tracer.begin_session(duration=BLOCK_DURATION, tap_mode=EVENT_TAP_MODE)
+    try:
+        with tracer.span("run_blocker"):
+            await run_session()
+    finally:
+        path = tracer.end_session()
+        if path:
+            print(f"Session trace written to {path}")
 
-    def signal_handler(signum, frame):
-        print("\nReceived interrupt signal, cleaning up...")
-        cleanup(event_tap)
-        sys.exit(0)
 
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+async def run_session():
+    """Lock the machine for BLOCK_DURATION seconds and restore it afterwards, even if cancelled."""
+    budget.session_started()
+    app_state['current_session_start'] = clock.now()
+    current_session['start'] = clock.time()
+    completed = False
 
     try:
-        disable_system_shortcuts()
-
-        event_tap = create_event_tap()
+        with tracer.span("start_input_blocking"):
+            await orchestrator.run_blocking(start_input_blocking)
 
         session_num = app_state['sessions_completed'] + 1
-        send_macos_notification("⚡ FitBlock Active",
-                                f"Session #{session_num} - {BLOCK_DURATION} seconds")
+        with tracer.span("notify_start"):
+            send_macos_notification("⚡ FitBlock Active",
+                                    f"Session #{session_num} - {BLOCK_DURATION} seconds")
 
-        if event_tap:
-            event_tap_thread = threading.Thread(target=run_event_tap_loop, daemon=True)
-            event_tap_thread.start()
-
-        create_blocking_window()
+        with session_phase('create_blocking_window'):
+            await create_blocking_window()
+        completed = True
 
     finally:
-        cleanup(event_tap)
+        with session_phase('cleanup'):
+            await orchestrator.run_blocking(cleanup)
+        with tracer.span("record_session"):
+            record_session_end(aborted=not completed)
+            (sessions_completed_total if completed else sessions_aborted_total).inc()
 
-        app_state['sessions_completed'] += 1
-        app_state['current_session_start'] = None
-        save_state()
+            with app_state.transaction() as state:
+                state['sessions_completed'] += 1
+                state['current_session_start'] = None
 
         print(f"Session completed! Total sessions: {app_state['sessions_completed']}")
+        tap_stats = await orchestrator.run_blocking(get_tap_stats)
+        if tap_stats:
+            latency = tap_stats['latency_recent']
+            print(f"Event tap: {tap_stats['events']} events blocked, "
+                  f"p99 callback {latency['p99_ns'] / 1000:.0f}us, "
+                  f"{tap_stats['reenabled']} re-enables after macOS disabled the tap")
         send_macos_notification("🥇 Training Complete",
                                 f"Session #{app_state['sessions_completed']} finished! 🎉")
+        # Deliver it before closing the books, so its process is charged to this session.
+        await orchestrator.run_blocking(notifier.flush)
+        budget.session_ended()
 
 
-if PYOBJC_AVAILABLE:
-    class AppDelegate(NSObject):
-        def __init__(self):
-            super().__init__()
-            self.menu_update_timer = None
-
-        def applicationDidFinishLaunching_(self, notification):
-            """Set up the menu bar item."""
-            print("Setting up menu bar item...")
-            status_bar = NSStatusBar.systemStatusBar()
-            self.status_item = status_bar.statusItemWithLength_(NSVariableStatusItemLength)
-
-            icon_loaded = False
-
-            icon_paths = []
-
-            if getattr(sys, 'frozen', False):
-                base_path = os.path.dirname(sys.executable)
-                icon_paths.extend([
-                    os.path.join(base_path, "icon.icns"),
-                    os.path.join(base_path, "..", "Resources", "icon.icns"),
-                    os.path.join(base_path, "..", "..", "Resources", "icon.icns"),
-                ])
-            else:
-                icon_paths.append("icon.icns")
-
-            print(f"Looking for icon in paths: {icon_paths}")
-
-            for icon_path in icon_paths:
-                if os.path.exists(icon_path):
-                    print(f"Trying icon path: {icon_path}")
-                    icon = NSImage.alloc().initByReferencingFile_(icon_path)
-                    if icon and icon.isValid():
-                        icon.setSize_((18, 18))  # Resize for menu bar
-                        self.status_item.button().setImage_(icon)
-                        print(f"✓ Icon loaded successfully from: {icon_path}")
-                        icon_loaded = True
-                        break
-                    else:
-                        print(f"✗ Icon file exists but failed to load: {icon_path}")
-                else:
-                    print(f"✗ Icon file not found: {icon_path}")
-
-            if not icon_loaded:
-                self.status_item.button().setTitle_("⏱")
-                print("⚠️  Using text icon (⏱) - no valid icon found")
-
-            self.update_menu()
-
-            self.start_menu_update_timer()
-            print("Menu bar app initialized successfully")
-
-        def update_menu(self):
-            """Update the menu with current stats."""
-            menu = NSMenu.alloc().init()
-
-            if app_state['paused']:
-                status_text = "Training Session Paused"
-            elif app_state['current_session_start']:
-                elapsed = datetime.now() - app_state['current_session_start']
-                minutes = int(elapsed.total_seconds() // 60)
-                seconds = int(elapsed.total_seconds() % 60)
-                elapsed_str = f"{minutes}m {seconds:02d}s"
-                status_text = f"Training Session Active ({elapsed_str})"
-            else:
-                status_text = "Training Session Ready"
-
-            status_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
-                status_text, None, "")
-            status_item.setEnabled_(False)
-            menu.addItem_(status_item)
-
-            if app_state['start_time']:
-                started_text = format_duration_since_start()
-                start_info = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
-                    f"First Started: {started_text}", None, "")
-                start_info.setEnabled_(False)
-                menu.addItem_(start_info)
-
-            sessions_text = f"Sessions completed: {app_state['sessions_completed']}"
-            sessions_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
-                sessions_text, None, "")
-            sessions_item.setEnabled_(False)
-            menu.addItem_(sessions_item)
-
-            total_hours = get_hours_since_start()
-            hours_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
-                f"Total hours tracked: {total_hours}", None, "")
-            hours_item.setEnabled_(False)
-            menu.addItem_(hours_item)
-
-            menu.addItem_(NSMenuItem.separatorItem())
-
-            if app_state['paused']:
-                pause_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
-                    "Resume Training", "resumeTraining:", "")
-                pause_item.setTarget_(self)
-                menu.addItem_(pause_item)
-            else:
-                pause_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
-                    "Pause Training", "pauseTraining:", "")
-                pause_item.setTarget_(self)
-                menu.addItem_(pause_item)
-
-            reset_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
-                "Reset Statistics", "resetStats:", "r")
-            reset_item.setTarget_(self)
-            menu.addItem_(reset_item)
-
-            menu.addItem_(NSMenuItem.separatorItem())
-
-            quit_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
-                "Quit FitBlock", "quitApp:", "q")
-            quit_item.setTarget_(self)
-            menu.addItem_(quit_item)
-
-            self.status_item.setMenu_(menu)
-
-        def start_menu_update_timer(self):
-            """Start a timer to periodically update the menu."""
-            from Foundation import NSTimer
-            self.menu_update_timer = NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
-                1.0, self, "updateMenuTimer:", None, True)
-
-        def updateMenuTimer_(self, timer):
-            """Timer callback to update menu."""
-            self.update_menu()
-
-        def resetStats_(self, sender):
-            """Reset application statistics."""
-            global app_state
-            app_state['start_time'] = datetime.now()
-            app_state['sessions_completed'] = 0
-            app_state['current_session_start'] = None
-            app_state['paused'] = False
-            app_state['pause_start_time'] = None
-            save_state()
-            self.update_menu()
-            print("Statistics reset")
-
-        def pauseTraining_(self, sender):
-            """Pause the training session."""
-            global app_state
-            app_state['paused'] = True
-            app_state['pause_start_time'] = datetime.now()
-            save_state()
-            self.update_menu()
-            print("Training paused")
-
-        def resumeTraining_(self, sender):
-            """Resume the training session."""
-            global app_state
-            app_state['paused'] = False
-            app_state['pause_start_time'] = None
-            save_state()
-            self.update_menu()
-            print("Training resumed")
+scheduler = SessionScheduler(run_blocker, interval=SESSION_INTERVAL, wall_clock=clock.time,
+                             monotonic=clock.monotonic, wait=clock.wait, prepare=prepare_overlay)
+
+
+def make_budget():
+    """Resource budget that also reads the counters the components keep themselves."""
+    resources = ResourceBudget(clock.monotonic)
+    resources.track("wakeups.scheduler", lambda: scheduler.wakeups)
+    resources.track("wakeups.control", lambda: control_server.requests)
+    resources.track("state_writes.state_file", lambda: state_writer.writes)
+    resources.track("bytes_written.state_file", lambda: state_writer.bytes_written)
+    # Processes the backend actually started; coalesced notifications start none.
+    resources.track("subprocesses.notifier", lambda: getattr(notifier.backend, 'spawns', 0))
+    if uploader is not None:
+        resources.track("wakeups.uploader", lambda: uploader.wakeups)
+        resources.track("state_writes.spool", lambda: uploader.spool_writes)
+        resources.track("bytes_written.spool", lambda: uploader.bytes_written)
+    return resources
+
+
+budget = make_budget()
+
+
+def reset_statistics():
+    """Reset application statistics."""
+    app_state.update(initial_state())
+    print("Statistics reset")
+
+
+def pause_training():
+    """Pause the training session."""
+    app_state.update(paused=True, pause_start_time=clock.now())
+    print("Training paused")
+
+
+def resume_training():
+    """Resume the training session."""
+    app_state.update(paused=False, pause_start_time=None)
+    print("Training resumed")
+
+
+def trigger_session():
+    """Start a session now (after the running one, if any)."""
+    scheduler.trigger_now()
+    print("Session triggered")
+
 
-        def quitApp_(self, sender):
-            """Handle quit menu item."""
-            if self.menu_update_timer:
-                self.menu_update_timer.invalidate()
-            NSLog("Quitting FitBlock")
-            NSApplication.sharedApplication().terminate_(self)
+_status_cache = {'key': None, 'response': None}
+
+
+def control_status():
+    """Encoded status response, rebuilt only when the state or schedule changed."""
+    version, state = app_state.snapshot()
+    key = (version, scheduler.next_fire)
+    if _status_cache['key'] != key:
+        next_fire = scheduler.next_fire
+
+        def iso(value):
+            return value.isoformat() if value else None
+
+        _status_cache['response'] = control.encode_response({
+            'version': version,
+            'paused': state['paused'],
+            'session_active': state['current_session_start'] is not None,
+            'sessions_completed': state['sessions_completed'],
+            'start_time': iso(state['start_time']),
+            'current_session_start': iso(state['current_session_start']),
+            'pause_start_time': iso(state['pause_start_time']),
+            'next_session': iso(datetime.fromtimestamp(next_fire)) if next_fire else None,
+            'block_duration': BLOCK_DURATION,
+        })
+        _status_cache['key'] = key
+    return _status_cache['response']
+
+
+def _control_action(action):
+    def handler():
+        action()
+        return {'version': app_state.version}
+    return handler
+
+
+control_server = control.ControlServer(CONTROL_SOCKET, {
+    'status': control_status,
+    'pause': _control_action(pause_training),
+    'resume': _control_action(resume_training),
+    'reset': _control_action(reset_statistics),
+    'trigger': _control_action(trigger_session),
+    'budget': lambda: budget.report(),
+})
+
+
+async def serve():
+    """Root task: the session schedule and the notification worker."""
+    orchestrator.spawn(notifier.run(), "notifier")
+    try:
+        await scheduler.run()
+    finally:
+        # Any session has restored the system by now; deliver what it queued
+        # and persist the final state before the loop goes away.
+        await orchestrator.run_blocking(notifier.flush)
+        await orchestrator.run_blocking(state_writer.flush)
+
+
+def print_shutdown_report():
+    """Summarise how the orchestrator's last run ended."""
+    report = orchestrator.report
+    if not report:
+        return
+    print(f"Shut down in {report['shutdown_seconds'] * 1000:.0f} ms after "
+          f"{report['uptime_seconds']:.0f}s ({report['blocking_calls']} blocking calls, "
+          f"{report['blocking_seconds']:.2f}s)")
+    for name, outcome in report['tasks'].items():
+        if outcome not in ("done", "cancelled"):
+            print(f"  task {name}: {outcome}")
 
 
 def run_menu_bar_app():
-    """Run the menu bar application."""
-    if not PYOBJC_AVAILABLE:
-        print("PyObjC not available - menu bar app disabled")
+    """Run the orchestrator behind the menu bar, or in the foreground where PyObjC is missing."""
+    try:
+        import menu_bar
+    except ImportError as e:
+        print(f"PyObjC not available: {e}")
+        print("Install with: pip install pyobjc-framework-Quartz pyobjc-framework-Cocoa")
+        print("Running without menu bar")
+        orchestrator.run(serve())
+        print_shutdown_report()
         return
 
-    app = NSApplication.sharedApplication()
-    delegate = AppDelegate.alloc().init()
-    app.setDelegate_(delegate)
-    app.run()
+    def stopped():
+        print_shutdown_report()
+        menu_bar.terminate()
 
+    # AppKit needs the main thread, so the loop runs beside it and quits the
+    # app once it has shut down, whether from a signal or the Quit item.
+    print("Starting menu bar app...")
+    orchestrator.start(serve(), on_stopped=stopped)
+    menu_bar.run(sys.modules[__name__])
 
-def main():
+
+def print_stats(args):
+    """Print session statistics from the history store."""
+    if not os.path.exists(HISTORY_FILE):
+        print(f"No session history yet ({HISTORY_FILE})")
+        return
+
+    if args.sessions:
+        print("start,end,planned_seconds,actual_seconds,aborted")
+        for record in session_history.records():
+            print(f"{datetime.fromtimestamp(record.start).isoformat(timespec='seconds')},"
+                  f"{datetime.fromtimestamp(record.end).isoformat(timespec='seconds')},"
+                  f"{record.planned:.0f},{record.actual:.1f},{int(record.aborted)}")
+        return
+
+    today = date.today()
+    monday = today - timedelta(days=today.weekday())
+    total = session_history.totals()
+    week = session_history.totals(monday, today)
+
+    print(f"FitBlock session history ({HISTORY_FILE})")
+    print(f"All time:  {total.completed} completed, {total.aborted} aborted, "
+          f"{total.seconds / 3600:.1f} hours blocked")
+    print(f"This week: {week.completed} completed, {week.aborted} aborted, "
+          f"{week.seconds / 60:.0f} minutes blocked")
+
+    print(f"\nLast {args.days} days:")
+    for d in session_history.days(today - timedelta(days=args.days - 1), today):
+        print(f"  {d.day:%Y-%m-%d %a}  {d.completed:3d} completed  {d.aborted:3d} aborted  "
+              f"{d.seconds / 60:5.0f} min")
+
+    print(f"\nLast {args.weeks} weeks:")
+    for w in session_history.weeks(monday - timedelta(weeks=args.weeks - 1), today):
+        print(f"  week of {w.day:%Y-%m-%d}  {w.completed:4d} completed  {w.aborted:3d} aborted  "
+              f"{w.seconds / 3600:5.1f} h")
+
+
+def print_budget():
+    """Print the running FitBlock's wakeup and resource budget; returns the exit code."""
+    try:
+        report = control.request(CONTROL_SOCKET, "budget")
+    except control.ControlError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        print("The budget covers the running FitBlock; start it first.", file=sys.stderr)
+        return 1
+
+    print(f"FitBlock resource budget: up {report['uptime_hours']:.1f} h, "
+          f"{report['idle_hours']:.1f} h idle, {report['sessions']} sessions")
+    print(f"{'':<26} {'total':>10} {'per hour':>10} {'idle/hour':>10}")
+    for resource, totals in report['resources'].items():
+        print(f"{resource:<26} {totals['total']:>10} {totals['per_hour']:>10.2f} {totals['idle_per_hour']:>10.2f}")
+        for name, counter in report['counters'].items():
+            kind, _, source = name.partition(".")
+            if kind == resource:
+                print(f"  {source:<24} {counter['total']:>10} {counter['per_hour']:>10.2f} "
+                      f"{counter['idle_per_hour']:>10.2f}")
+    return 0
+
+
+def run_ctl(args):
+    """Send a command to the running FitBlock; returns the process exit code."""
+    try:
+        result = control.request(args.socket, args.action)
+    except control.ControlError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if args.action == "status":
+        print(json.dumps(result, indent=2))
+    else:
+        print("ok")
+    return 0
+
+
+def use_simulation(directory, start, duration, interval, rules=None):
+    """Switch to a virtual clock, no-op backends and state files under directory."""
+    global HEADLESS, clock, BLOCK_DURATION, state_writer, session_history, recovery_journal, scheduler, skip_rules
+    global overlay, blocker, budget, orchestrator, uploader
+    HEADLESS = True
+    clock = VirtualClock(start)
+    orchestrator = Orchestrator(SHUTDOWN_DEADLINE, inline=True)
+    BLOCK_DURATION = duration
+
+    state_writer = StateWriter(os.path.join(directory, "state.json"), delay=STATE_WRITE_DELAY,
+                               monotonic=clock.monotonic, inline=True)
+    session_history = SessionHistory(os.path.join(directory, "history.bin"))
+    recovery_journal = RecoveryJournal(os.path.join(directory, "recovery.plist"))
+    blocker = Blocker(shortcut_manager, None, recovery_journal, TEARDOWN_DEADLINE)
+    skip_rules = SkipRules(rules or os.path.join(directory, "rules.json"))
+    uploader = None
+    shortcut_manager.store = PlistFileStore(os.path.join(directory, "hotkeys.plist"))
+    notifier.backend = NullBackend()
+    overlay = OverlayManager(HeadlessRenderer(clock))
+    scheduler = SessionScheduler(run_blocker, interval=interval, wall_clock=clock.time,
+                                 monotonic=clock.monotonic, wait=clock.wait, prepare=prepare_overlay)
+    budget = make_budget()
+    app_state.update(initial_state())
+    app_state.subscribe(lambda changed, version: save_state())
+
+
+def run_simulation(args):
+    """Replay args.sessions scheduled sessions on a virtual clock and report the outcome."""
+    quiet = None
+    if args.quiet_hours:
+        first, last = (int(hour) for hour in args.quiet_hours.split("-"))
+        quiet = (first, last)
+
+    directory = args.dir or tempfile.mkdtemp(prefix="fitblock-sim-")
+    os.makedirs(directory, exist_ok=True)
+    start = datetime.fromisoformat(args.start).timestamp() if args.start else None
+    use_simulation(directory, start, args.duration, args.interval, args.rules)
+
+    counts = {'sessions': 0, 'paused': 0, 'skipped': 0}
+    # Every state change submits a snapshot, and so does each countdown tick
+    # that shows a whole minute. Submits closer together than
+    # STATE_WRITE_DELAY on the virtual clock must make one write.
+    submits = {'count': 0, 'bursts': 0, 'last': None}
+
+    def submitted(*_):
+        now = clock.monotonic()
+        if submits['last'] is None or now - submits['last'] >= STATE_WRITE_DELAY:
+            submits['bursts'] += 1
+        submits['count'] += 1
+        submits['last'] = now
+
+    app_state.subscribe(submitted)
+    set_timer_text = overlay.renderer.set_timer_text
+
+    def tick(text):
+        set_timer_text(text)
+        if text.endswith(":00"):
+            save_state()
+            submitted()
+
+    overlay.renderer.set_timer_text = tick
+
+    async def session():
+        hour = clock.now().hour
+        if quiet is not None:
+            in_quiet = (quiet[0] <= hour < quiet[1]) if quiet[0] <= quiet[1] else (hour >= quiet[0] or hour < quiet[1])
+            if in_quiet and not app_state['paused']:
+                pause_training()
+            elif not in_quiet and app_state['paused']:
+                resume_training()
+        if app_state['paused']:
+            counts['paused'] += 1
+        elif skip_rules.check(clock.time()):
+            counts['skipped'] += 1
+        await run_blocker()
+        counts['sessions'] += 1
+        if counts['sessions'] >= args.sessions:
+            scheduler.stop()
+
+    scheduler.run_session = session
+    simulated_start = clock.time()
+    real_start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        orchestrator.run(scheduler.run())
+        state_writer.flush()
+    real_elapsed = time.perf_counter() - real_start
+    simulated = clock.time() - simulated_start
+
+    assert state_writer.writes == submits['bursts'], \
+        f"{state_writer.writes} state writes for {submits['bursts']} bursts of submits"
+    with open(state_writer.path) as f:
+        persisted = json.load(f)
+    version, state = app_state.snapshot()
+    expected = {key: value.isoformat() if isinstance(value, datetime) else value for key, value in state.items()}
+    assert persisted == expected, f"state file {persisted} does not match the final state {expected}"
+
+    total = session_history.totals()
+    print(f"Simulated {counts['sessions']} scheduled sessions over {simulated / 86400:.1f} days "
+          f"in {real_elapsed:.2f}s ({counts['sessions'] / real_elapsed:.0f} sessions/s, "
+          f"{simulated / real_elapsed:,.0f}x real time)")
+    print(f"Sessions run: {total.completed} completed, {total.aborted} aborted, "
+          f"{counts['paused']} skipped while paused, {counts['skipped']} skipped by rules, "
+          f"{scheduler.skipped} skipped as late")
+    print(f"Scheduler wakeups: {scheduler.wakeups}; state writes: {state_writer.writes} "
+          f"for {submits['count']} snapshots submitted; state file matches the final state")
+    idle = budget.report()['resources']
+    print(f"Idle cost per hour: {idle['wakeups']['idle_per_hour']:.2f} wakeups, "
+          f"{idle['subprocesses']['idle_per_hour']:.2f} subprocesses, "
+          f"{idle['bytes_written']['idle_per_hour']:.0f} bytes written")
+    print(f"Final state ({directory}):")
+    for key, value in state.items():
+        print(f"  {key}: {value.isoformat(timespec='seconds') if isinstance(value, datetime) else value}")
+    print(f"  version: {version}")
+
+
+def parse_args(argv=None):
+    """Parse the command line; no subcommand runs the app."""
+    parser = argparse.ArgumentParser(prog="main.py", description="FitBlock - macOS Focus Application")
+    parser.add_argument("--trace", nargs="?", const=DEFAULT_TRACE_DIR, metavar="DIR",
+                        help=f"write a Chrome trace per session (default DIR: {DEFAULT_TRACE_DIR})")
+    subparsers = parser.add_subparsers(dest="command")
+
+    stats_parser = subparsers.add_parser("stats", help="show session statistics")
+    stats_parser.add_argument("--days", type=int, default=7, help="number of days to list (default: 7)")
+    stats_parser.add_argument("--weeks", type=int, default=4, help="number of weeks to list (default: 4)")
+    stats_parser.add_argument("--sessions", action="store_true", help="stream every session record as CSV")
+    stats_parser.add_argument("--budget", action="store_true",
+                              help="wakeups, subprocesses and writes per hour of the running FitBlock")
+
+    ctl_parser = subparsers.add_parser("ctl", help="control a running FitBlock")
+    ctl_parser.add_argument("action", choices=["status", "pause", "resume", "reset", "trigger"])
+    ctl_parser.add_argument("--socket", default=CONTROL_SOCKET, help=f"control socket (default: {CONTROL_SOCKET})")
+
+    # Listed for --help only: main() hands "helper" and its options to helper.main() untouched.
+    subparsers.add_parser("helper", help="run the session helper (started by FitBlock itself)")
+
+    sim_parser = subparsers.add_parser("simulate", help="replay sessions headless on a virtual clock")
+    sim_parser.add_argument("--sessions", type=int, default=5000, help="scheduled sessions to run (default: 5000)")
+    sim_parser.add_argument("--duration", type=float, default=BLOCK_DURATION,
+                            help=f"block duration in seconds (default: {BLOCK_DURATION})")
+    sim_parser.add_argument("--interval", type=int, default=SESSION_INTERVAL,
+                            help=f"seconds between sessions (default: {SESSION_INTERVAL})")
+    sim_parser.add_argument("--start", help="simulated start time, ISO format (default: now)")
+    sim_parser.add_argument("--quiet-hours", metavar="FROM-TO", help="pause between these hours, e.g. 22-7")
+    sim_parser.add_argument("--rules", help="skip rules file to apply (default: none)")
+    sim_parser.add_argument("--dir", help="directory for the simulated state files (default: a new temp dir)")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Main entry point."""
+    global EVENT_TAP_MODE, uploader
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["helper"]:
+        helper.main(argv[1:])
+        return
+    args = parse_args(argv)
+    if args.command == "stats" and args.budget:
+        sys.exit(print_budget())
+    if args.command == "stats":
+        print_stats(args)
+        return
+    if args.command == "ctl":
+        sys.exit(run_ctl(args))
+    if args.command == "simulate":
+        run_simulation(args)
+        return
+
+    watch_signals()
     print("FitBlock - macOS Focus Application")
     print(f"Block duration: {BLOCK_DURATION} seconds")
-    print(f"PyObjC available: {PYOBJC_AVAILABLE}")
 
+    if args.trace:
+        tracer.enable(args.trace)
+    if tracer.enabled:
+        print(f"Tracing sessions to {tracer.directory}")
+
+    if EVENT_TAP_MODE not in input_tap.TAP_MODES:
+        print(f"Unknown event tap mode {EVENT_TAP_MODE!r} - using full")
+        EVENT_TAP_MODE = "full"
+
+    if uploader is not None:
+        try:
+            uploader.start()
+            atexit.register(uploader.close)
+            print(f"Uploading sessions to {UPLOAD_URL}")
+        except OSError as e:
+            print(f"Session upload disabled: {e}")
+            uploader = None
+
+    start_blocker()
+    recover_interrupted_session()
     load_state()
+    app_state.subscribe(lambda changed, version: save_state())
+    app_state.subscribe(update_state_gauges)
+    update_state_gauges(None, app_state.version)
 
-    require_root()
+    notifier.start()
 
-    if PYOBJC_AVAILABLE:
-        print("Starting menu bar app...")
-        blocker_thread = threading.Thread(target=run_blocker, daemon=True)
-        blocker_thread.start()
+    if METRICS_PORT:
+        try:
+            metrics_server = MetricsServer(metrics_registry, METRICS_PORT)
+            metrics_server.start()
+            print(f"Metrics available at http://127.0.0.1:{metrics_server.port}/metrics")
+        except OSError as e:
+            print(f"Metrics endpoint disabled: {e}")
 
-        run_menu_bar_app()
-    else:
-        print("Running without menu bar (PyObjC not available)")
-        run_blocker()
+    try:
+        control_server.start()
+        atexit.register(control_server.stop)
+    except (OSError, control.ControlError) as e:
+        print(f"Control socket disabled: {e}")
+
+    run_menu_bar_app()
 
 
 if __name__ == "__main__":
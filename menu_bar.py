@@ -0,0 +1,206 @@
+"""
+macOS menu bar item for FitBlock.
+
+This is the only module that needs AppKit, and main.py imports it only when
+it is about to show the menu bar, so the command-line paths never load
+PyObjC. The delegate reaches the app's state, scheduler and actions through
+the main module it is given, so it always sees that module's current values.
+"""
+
+import os
+import sys
+
+import objc
+from AppKit import (
+    NSApplication, NSImage, NSMenu, NSMenuItem, NSStatusBar, NSVariableStatusItemLength,
+    NSWorkspace, NSWorkspaceDidWakeNotification
+)
+from Foundation import (
+    NSLog, NSNotificationCenter, NSObject, NSRunLoop, NSRunLoopCommonModes,
+    NSSystemClockDidChangeNotification, NSTimer
+)
+
+from menu_model import SEPARATOR, MenuModel
+
+
+class AppDelegate(NSObject):
+    def init(self):
+        self = objc.super(AppDelegate, self).init()
+        if self is None:
+            return None
+        self.app = None
+        self.menu_update_timer = None
+        self.menu_model = MenuModel()
+        self.menu_items = {}
+        return self
+
+    def applicationDidFinishLaunching_(self, notification):
+        """Set up the menu bar item."""
+        print("Setting up menu bar item...")
+        status_bar = NSStatusBar.systemStatusBar()
+        self.status_item = status_bar.statusItemWithLength_(NSVariableStatusItemLength)
+
+        icon_loaded = False
+
+        icon_paths = []
+
+        if getattr(sys, 'frozen', False):
+            base_path = os.path.dirname(sys.executable)
+            icon_paths.extend([
+                os.path.join(base_path, "icon.icns"),
+                os.path.join(base_path, "..", "Resources", "icon.icns"),
+                os.path.join(base_path, "..", "..", "Resources", "icon.icns"),
+            ])
+        else:
+            icon_paths.append("icon.icns")
+
+        print(f"Looking for icon in paths: {icon_paths}")
+
+        for icon_path in icon_paths:
+            if os.path.exists(icon_path):
+                print(f"Trying icon path: {icon_path}")
+                icon = NSImage.alloc().initByReferencingFile_(icon_path)
+                if icon and icon.isValid():
+                    icon.setSize_((18, 18))  # Resize for menu bar
+                    self.status_item.button().setImage_(icon)
+                    print(f"✓ Icon loaded successfully from: {icon_path}")
+                    icon_loaded = True
+                    break
+                else:
+                    print(f"✗ Icon file exists but failed to load: {icon_path}")
+            else:
+                print(f"✗ Icon file not found: {icon_path}")
+
+        if not icon_loaded:
+            self.status_item.button().setTitle_("⏱")
+            print("⚠️  Using text icon (⏱) - no valid icon found")
+
+        self.update_menu()
+        self.app.app_state.subscribe(self.state_changed)
+
+        # The scheduler sleeps on the monotonic clock, which stops while
+        # the Mac is asleep; have it re-check the wall clock when needed.
+        NSWorkspace.sharedWorkspace().notificationCenter().addObserver_selector_name_object_(
+            self, "systemDidWake:", NSWorkspaceDidWakeNotification, None)
+        NSNotificationCenter.defaultCenter().addObserver_selector_name_object_(
+            self, "systemClockDidChange:", NSSystemClockDidChangeNotification, None)
+        print("Menu bar app initialized successfully")
+
+    def update_menu(self):
+        """Update the menu with current stats, touching only items that changed."""
+        with self.app.tracer.span("update_menu"):
+            diff = self.menu_model.update(self.app.app_state.snapshot()[1], self.app.clock.now())
+            if diff.rebuild:
+                self.build_menu(diff.items)
+                return
+
+            for spec in diff.changed:
+                self.apply_menu_item(self.menu_items[spec.key], spec)
+
+    @objc.python_method
+    def build_menu(self, items):
+        """Create the NSMenu and its items from scratch."""
+        menu = NSMenu.alloc().init()
+        menu.setDelegate_(self)
+        self.menu_items = {}
+
+        for spec in items:
+            if spec.title is SEPARATOR:
+                item = NSMenuItem.separatorItem()
+            else:
+                item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
+                    spec.title, spec.action, spec.key_equivalent)
+                if spec.action:
+                    item.setTarget_(self)
+                item.setEnabled_(spec.enabled)
+            menu.addItem_(item)
+            self.menu_items[spec.key] = item
+
+        self.status_item.setMenu_(menu)
+
+    @objc.python_method
+    def apply_menu_item(self, item, spec):
+        """Copy the mutable fields of spec onto an existing NSMenuItem."""
+        if item.title() != spec.title:
+            item.setTitle_(spec.title)
+        item.setAction_(spec.action)
+        item.setEnabled_(spec.enabled)
+
+    def menuNeedsUpdate_(self, menu):
+        """Refresh the menu right before it is displayed."""
+        self.update_menu()
+
+    def menuWillOpen_(self, menu):
+        """Keep the elapsed time ticking only while the menu is visible."""
+        self.menu_update_timer = NSTimer.timerWithTimeInterval_target_selector_userInfo_repeats_(
+            1.0, self, "updateMenuTimer:", None, True)
+        NSRunLoop.currentRunLoop().addTimer_forMode_(self.menu_update_timer, NSRunLoopCommonModes)
+
+    def menuDidClose_(self, menu):
+        """Stop the live refresh timer once the menu is dismissed."""
+        if self.menu_update_timer:
+            self.menu_update_timer.invalidate()
+            self.menu_update_timer = None
+
+    def updateMenuTimer_(self, timer):
+        """Timer callback to update menu."""
+        self.app.budget.count("wakeups.menu_timer")
+        self.update_menu()
+
+    def systemDidWake_(self, notification):
+        """Re-check the schedule after the Mac wakes from sleep."""
+        self.app.scheduler.reschedule()
+
+    def systemClockDidChange_(self, notification):
+        """Re-check the schedule after the wall clock was changed."""
+        self.app.scheduler.reschedule()
+
+    @objc.python_method
+    def state_changed(self, changed, version):
+        """State subscriber: refresh the menu on the main thread."""
+        self.performSelectorOnMainThread_withObject_waitUntilDone_("refreshMenu:", None, False)
+
+    def refreshMenu_(self, sender):
+        """Main-thread half of state_changed."""
+        self.app.budget.count("wakeups.menu_refresh")
+        self.update_menu()
+
+    def resetStats_(self, sender):
+        """Reset application statistics."""
+        self.app.reset_statistics()
+
+    def pauseTraining_(self, sender):
+        """Pause the training session."""
+        self.app.pause_training()
+
+    def resumeTraining_(self, sender):
+        """Resume the training session."""
+        self.app.resume_training()
+
+    def quitApp_(self, sender):
+        """Handle quit menu item."""
+        if self.menu_update_timer:
+            self.menu_update_timer.invalidate()
+        NSLog("Quitting FitBlock")
+        # The app terminates once the orchestrator has shut down; see terminate().
+        self.app.orchestrator.request_shutdown()
+
+
+def create_delegate(app):
+    """Application delegate driving the menu for the main module app."""
+    delegate = AppDelegate.alloc().init()
+    delegate.app = app
+    return delegate
+
+
+def terminate():
+    """Quit the Cocoa app; safe from any thread."""
+    NSApplication.sharedApplication().performSelectorOnMainThread_withObject_waitUntilDone_(
+        "terminate:", None, False)
+
+
+def run(app):
+    """Show the menu bar item and run the Cocoa event loop; returns when the app quits."""
+    application = NSApplication.sharedApplication()
+    application.setDelegate_(create_delegate(app))
+    application.run()
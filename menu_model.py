@@ -0,0 +1,104 @@
+"""
+Pure-Python view model for the FitBlock menu bar menu.
+
+The model turns the application state into a flat list of menu item specs and
+diffs it against the last rendered list, so the AppKit layer only has to touch
+the items whose title, action or enabled flag actually changed.
+"""
+
+from collections import namedtuple
+
+MenuItemSpec = namedtuple('MenuItemSpec', ['key', 'title', 'action', 'key_equivalent', 'enabled'])
+MenuDiff = namedtuple('MenuDiff', ['rebuild', 'changed', 'items'])
+
+SEPARATOR = None  # title used for separator specs
+
+
+def format_elapsed(start, now):
+    """Format the time elapsed between start and now as '3d 4h ago' style text."""
+    if not start:
+        return "Unknown"
+
+    elapsed = now - start
+    days = elapsed.days
+    hours, remainder = divmod(elapsed.seconds, 3600)
+
+    if days > 0:
+        return f"{days}d {hours}h ago"
+    elif hours > 0:
+        return f"{hours}h ago"
+    else:
+        minutes = remainder // 60
+        return f"{minutes}m ago"
+
+
+def whole_hours(start, now):
+    """Return the number of full hours between start and now."""
+    if start:
+        return int((now - start).total_seconds() // 3600)
+    return 0
+
+
+def _separator(key):
+    return MenuItemSpec(key, SEPARATOR, None, "", False)
+
+
+def compute_menu_items(state, now):
+    """Return the menu item specs that represent the given state."""
+    if state['paused']:
+        status_text = "Training Session Paused"
+    elif state['current_session_start']:
+        elapsed = (now - state['current_session_start']).total_seconds()
+        minutes = int(elapsed // 60)
+        seconds = int(elapsed % 60)
+        status_text = f"Training Session Active ({minutes}m {seconds:02d}s)"
+    else:
+        status_text = "Training Session Ready"
+
+    items = [MenuItemSpec('status', status_text, None, "", False)]
+
+    if state['start_time']:
+        started_text = format_elapsed(state['start_time'], now)
+        items.append(MenuItemSpec('started', f"First Started: {started_text}", None, "", False))
+
+    items.append(MenuItemSpec(
+        'sessions', f"Sessions completed: {state['sessions_completed']}", None, "", False))
+    items.append(MenuItemSpec(
+        'hours', f"Total hours tracked: {whole_hours(state['start_time'], now)}", None, "", False))
+    items.append(_separator('sep-actions'))
+
+    if state['paused']:
+        items.append(MenuItemSpec('pause', "Resume Training", "resumeTraining:", "", True))
+    else:
+        items.append(MenuItemSpec('pause', "Pause Training", "pauseTraining:", "", True))
+
+    items.append(MenuItemSpec('reset', "Reset Statistics", "resetStats:", "r", True))
+    items.append(_separator('sep-quit'))
+    items.append(MenuItemSpec('quit', "Quit FitBlock", "quitApp:", "q", True))
+    return items
+
+
+class MenuModel:
+    """Track the last rendered menu and report what changed since then."""
+
+    def __init__(self):
+        self.rendered = None
+
+    def update(self, state, now):
+        """Compute the menu for state and diff it against the last rendered one."""
+        return self.diff(compute_menu_items(state, now))
+
+    def diff(self, items):
+        """Diff items against the last rendered list and remember them as rendered."""
+        previous = self.rendered
+        self.rendered = items
+
+        if previous is None or [i.key for i in previous] != [i.key for i in items]:
+            return MenuDiff(True, items, items)
+
+        changed = [new for old, new in zip(previous, items) if old != new]
+        return MenuDiff(False, changed, items)
+
+    def invalidate(self):
+        """Forget the rendered menu so the next update rebuilds it from scratch."""
+        self.rendered = None
@@ -0,0 +1,204 @@
+"""
+Prometheus-style metrics for FitBlock.
+
+Metrics are plain pre-allocated Python objects: recording a value is a few
+integer/float operations with no locking, so the blocking path never waits on
+a scrape. The text exposition is rendered only when something changed since
+the last scrape and served from a cached string otherwise.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Registry:
+    """Set of metrics with a change generation and a cached exposition."""
+
+    def __init__(self):
+        self.metrics = []
+        self.generation = 0
+        self._render_lock = threading.Lock()
+        self._cached = (None, b"")
+
+    def register(self, metric):
+        metric.registry = self
+        self.metrics.append(metric)
+        self.generation += 1
+        return metric
+
+    def counter(self, name, help_text):
+        return self.register(Counter(name, help_text))
+
+    def gauge(self, name, help_text):
+        return self.register(Gauge(name, help_text))
+
+    def histogram(self, name, help_text, label=None, label_values=(None,), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, label, label_values, buckets))
+
+    def render(self):
+        """Return the encoded exposition, re-rendering only if a metric changed."""
+        with self._render_lock:
+            generation = self.generation
+            if self._cached[0] != generation:
+                lines = []
+                for metric in self.metrics:
+                    lines.extend(metric.render())
+                self._cached = (generation, ("\n".join(lines) + "\n").encode("utf-8"))
+            return self._cached[1]
+
+
+class Counter:
+    """Monotonically increasing value."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+        self.registry = None
+
+    def inc(self, amount=1):
+        self.value += amount
+        self.registry.generation += 1
+
+    def render(self):
+        return [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.kind}",
+            f"{self.name} {_format_value(self.value)}",
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value):
+        if value != self.value:
+            self.value = value
+            self.registry.generation += 1
+
+
+class _HistogramSeries:
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram:
+    """Histogram with fixed buckets and an optional single label with known values."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label=None, label_values=(None,), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        self.series = {value: _HistogramSeries(len(self.buckets)) for value in label_values}
+        self.registry = None
+
+    def observe(self, seconds, label_value=None):
+        series = self.series.get(label_value)
+        if series is None:
+            series = self.series[label_value] = _HistogramSeries(len(self.buckets))
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                series.counts[i] += 1
+                break
+        series.count += 1
+        series.sum += seconds
+        self.registry.generation += 1
+
+    @contextmanager
+    def time(self, label_value=None):
+        """Observe the duration of the with-block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, label_value)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for label_value, series in self.series.items():
+            base = [(self.label, label_value)] if self.label else []
+            cumulative = 0
+            for bound, count in zip(self.buckets, series.counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(base + [('le', _format_value(float(bound)))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(base + [('le', '+Inf')])} {series.count}")
+            lines.append(f"{self.name}_sum{_labels(base)} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{_labels(base)} {series.count}")
+        return lines
+
+
+class MetricsServer:
+    """Serve a registry at /metrics from a background HTTP server thread."""
+
+    def __init__(self, registry, port, host="127.0.0.1"):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self.scrapes = 0
+        self._server = None
+
+    def start(self):
+        # Imported here: http.server is the slowest import FitBlock has, and most runs never serve.
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self.registry
+        server_self = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render()
+                server_self.scrapes += 1
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True).start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,195 @@
+"""
+Asynchronous macOS notification delivery for FitBlock.
+
+Notifications are queued and sent by a single worker task on the
+orchestrator's loop, so spawning terminal-notifier or osascript never blocks
+the caller. The available backend is probed once, and a queued notification
+with a coalescing key is replaced by a newer one with the same key if it has
+not been sent yet.
+"""
+
+import os
+import shutil
+import threading
+import time
+from collections import deque
+
+from orchestrator import run_subprocess
+
+SEND_TIMEOUT = 10.0  # seconds before a hung notifier process is killed
+
+
+class TerminalNotifierBackend:
+    """Deliver notifications through the terminal-notifier command."""
+
+    name = "terminal-notifier"
+
+    def __init__(self, executable, icon_path=None):
+        self.executable = executable
+        self.icon_path = icon_path
+        self.spawns = 0
+
+    async def send(self, title, message):
+        cmd = [
+            self.executable,
+            "-title", title,
+            "-message", message,
+            "-activate", "com.apple.Terminal"
+        ]
+        if self.icon_path:
+            cmd.extend(["-appIcon", self.icon_path])
+        self.spawns += 1
+        await run_subprocess(cmd, timeout=SEND_TIMEOUT)
+
+
+class OsascriptBackend:
+    """Deliver notifications through AppleScript's display notification."""
+
+    name = "osascript"
+
+    def __init__(self, executable):
+        self.executable = executable
+        self.spawns = 0
+
+    async def send(self, title, message):
+        script = f'display notification "{_applescript_escape(message)}" with title "{_applescript_escape(title)}"'
+        self.spawns += 1
+        await run_subprocess([self.executable, '-e', script], timeout=SEND_TIMEOUT)
+
+
+class NullBackend:
+    """Drop notifications when no delivery mechanism is available."""
+
+    name = "none"
+    spawns = 0
+
+    async def send(self, title, message):
+        pass
+
+
+class FakeBackend:
+    """Record notifications in memory, optionally simulating a slow send."""
+
+    name = "fake"
+    spawns = 0
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+
+    async def send(self, title, message):
+        import asyncio
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append((title, message))
+
+
+def _applescript_escape(text):
+    return text.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def probe_backend(icon_path=None):
+    """Pick the best available notification backend."""
+    executable = shutil.which("terminal-notifier")
+    if executable:
+        if icon_path and not os.path.exists(icon_path):
+            icon_path = None
+        return TerminalNotifierBackend(executable, icon_path)
+
+    executable = shutil.which("osascript")
+    if executable:
+        return OsascriptBackend(executable)
+
+    return NullBackend()
+
+
+class NotificationService:
+    """Bounded notification queue drained by a worker task (run()) on an event loop."""
+
+    def __init__(self, backend=None, icon_path=None, maxsize=8, on_send=None):
+        self.backend = backend
+        self.on_send = on_send
+        self.icon_path = icon_path
+        self.maxsize = maxsize
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+        self._lock = threading.Lock()
+        self._queue = deque()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._loop = None
+        self._wake = None
+
+    def start(self):
+        """Probe the backend (once)."""
+        with self._lock:
+            if self.backend is None:
+                self.backend = probe_backend(self.icon_path)
+                print(f"Notification backend: {self.backend.name}")
+
+    def notify(self, title, message, key=None):
+        """Queue a notification; never blocks on delivery. Safe from any thread."""
+        with self._lock:
+            if key is not None:
+                for entry in self._queue:
+                    if entry[0] == key:
+                        entry[1] = title
+                        entry[2] = message
+                        self.coalesced += 1
+                        return
+
+            if len(self._queue) >= self.maxsize:
+                self._queue.popleft()
+                self.dropped += 1
+
+            self._queue.append([key, title, message])
+            self._idle.clear()
+            loop = self._loop
+
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                pass  # the loop has just closed
+
+    def flush(self, timeout=2.0):
+        """Wait until every queued notification has been handed to the backend.
+
+        Returns False straight away if no worker is running to send them.
+        """
+        if self._loop is None:
+            return self._idle.is_set()
+        return self._idle.wait(timeout)
+
+    async def run(self):
+        """Worker: send queued notifications one at a time until cancelled."""
+        import asyncio
+        self.start()
+        self._wake = asyncio.Event()
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+        try:
+            while True:
+                with self._lock:
+                    entry = self._queue.popleft() if self._queue else None
+                    if entry is None:
+                        self._idle.set()
+                if entry is None:
+                    await self._wake.wait()
+                    self._wake.clear()
+                    continue
+
+                _, title, message = entry
+                try:
+                    start = time.perf_counter()
+                    await self.backend.send(title, message)
+                    self.sent += 1
+                    if self.on_send is not None:
+                        self.on_send(time.perf_counter() - start)
+                except Exception as e:
+                    print(f"Could not send notification: {e}")
+        finally:
+            with self._lock:
+                self._loop = None
@@ -0,0 +1,223 @@
+"""
+Single asyncio event loop that owns FitBlock's sessions.
+
+The schedule, the sessions it starts, the notification worker and shutdown
+all run as tasks on one loop. Calls that can only block, such as helper
+round trips, go through run_blocking(): the loop waits on them without
+stalling, in order, and a cancelled session still waits for them before its
+cleanup runs. AppKit keeps the main thread and Tk is pumped from the session
+itself, so both hand work to the loop through thread-safe calls instead of
+racing it from their own threads.
+
+Shutdown is structured: request_shutdown() cancels the root task, whose
+finally blocks clean up, then whatever is still running is cancelled and
+awaited within a deadline, and every task's outcome is recorded in report.
+"""
+
+import subprocess
+import threading
+import time
+
+# asyncio is imported where it is used here and in the modules that run on
+# the loop: it costs about as much as the rest of main.py's imports, and
+# stats, ctl and helper never start a loop.
+
+DONE = "done"
+CANCELLED = "cancelled"
+TIMEOUT = "timeout"
+
+
+async def run_subprocess(argv, input=None, timeout=None):
+    """Run argv to completion and capture its output, like subprocess.run(capture_output=True).
+
+    The child is killed if timeout expires (raising subprocess.TimeoutExpired)
+    or if the awaiting task is cancelled.
+    """
+    import asyncio
+    process = await asyncio.create_subprocess_exec(
+        *argv, stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(input), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+        if isinstance(e, asyncio.TimeoutError):
+            raise subprocess.TimeoutExpired(argv, timeout)
+        raise
+    return subprocess.CompletedProcess(argv, process.returncode, stdout, stderr)
+
+
+class Orchestrator:
+    """Run a root coroutine on an event loop and shut it down within a deadline."""
+
+    def __init__(self, deadline=10.0, inline=False):
+        self.deadline = deadline
+        # Run blocking calls on the loop itself, for callers (the simulation)
+        # whose calls are too quick to be worth a hop to the worker thread.
+        self.inline = inline
+        self.loop = None
+        self.report = {}
+        self.blocking_calls = 0
+        self.blocking_seconds = 0.0
+
+        self._root = None
+        self._tasks = {}
+        self._thread = None
+        self._executor = None
+        self._shutdown_requested = False
+
+    @property
+    def running(self):
+        return self.loop is not None
+
+    def run(self, coro):
+        """Run coro on a new loop on this thread until it and its tasks have finished."""
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        # One worker: blocking calls (mostly helper round trips) run one at a time, in order.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="OrchestratorBlocking")
+        self._shutdown_requested = False
+        self.loop = loop
+        try:
+            return loop.run_until_complete(self._main(coro))
+        finally:
+            self.loop = None
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            asyncio.set_event_loop(None)
+            loop.close()
+
+    def start(self, coro, on_stopped=None):
+        """Run coro on a new "Orchestrator" thread; on_stopped() is called there when it is done."""
+        started = threading.Event()
+
+        def target():
+            try:
+                self.run(self._signal_started(coro, started))
+            finally:
+                started.set()
+                if on_stopped is not None:
+                    on_stopped()
+
+        self._thread = threading.Thread(target=target, name="Orchestrator")
+        self._thread.start()
+        started.wait()
+
+    async def _signal_started(self, coro, started):
+        started.set()
+        return await coro
+
+    def join(self, timeout=None):
+        """Wait for the thread started by start() to finish; returns whether it has."""
+        if self._thread is None:
+            return True
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def submit(self, coro):
+        """Schedule coro on the loop from any thread; returns a concurrent.futures.Future."""
+        import asyncio
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback, *args):
+        """Call callback(*args) on the loop; safe from any thread."""
+        loop = self.loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(callback, *args)
+            except RuntimeError:
+                pass  # the loop closed in the meantime
+
+    def spawn(self, coro, name):
+        """Start coro as a tracked task; must be called on the loop."""
+        import asyncio
+        task = asyncio.get_running_loop().create_task(coro, name=name)
+        self._tasks[task] = name
+        task.add_done_callback(self._tasks.pop)
+        return task
+
+    async def run_blocking(self, function, *args):
+        """Run a blocking call on the worker thread and return its result."""
+        import asyncio
+        if self.inline:
+            return self._timed(function, *args)
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self._timed, function, *args)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # The call can't be interrupted; let it finish, so that whatever
+            # undoes it (a session's cleanup) does not run alongside it.
+            await asyncio.wait([future])
+            raise
+
+    def _timed(self, function, *args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.blocking_calls += 1
+            self.blocking_seconds += time.perf_counter() - start
+
+    def request_shutdown(self):
+        """Cancel the root task and give it deadline seconds to finish; safe from any thread."""
+        self.call_soon(self._cancel_root)
+
+    def _cancel_root(self):
+        if self._root is None or self._root.done():
+            return
+        if not self._shutdown_requested:
+            self._shutdown_requested = True
+            self._root.cancel()
+            # A second cancel interrupts cleanup that is stuck past the deadline.
+            self.loop.call_later(self.deadline, self._root.cancel)
+
+    async def _main(self, coro):
+        import asyncio
+        self._root = asyncio.current_task()
+        started = time.perf_counter()
+        outcome = DONE
+        try:
+            return await coro
+        except asyncio.CancelledError:
+            outcome = CANCELLED
+            if not self._shutdown_requested:
+                raise
+        except Exception as e:
+            outcome = f"error: {e}"
+            raise
+        finally:
+            shutdown_start = time.perf_counter()
+            tasks = await self._finish()
+            tasks['root'] = outcome
+            self.report = {
+                'tasks': tasks,
+                'uptime_seconds': round(shutdown_start - started, 3),
+                'shutdown_seconds': round(time.perf_counter() - shutdown_start, 4),
+                'blocking_calls': self.blocking_calls,
+                'blocking_seconds': round(self.blocking_seconds, 4),
+            }
+            self._root = None
+
+    async def _finish(self):
+        """Cancel the tracked tasks that are still running and wait for them, within deadline."""
+        import asyncio
+        outcomes = {}
+        tasks = dict(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=self.deadline)
+        for task, name in tasks.items():
+            if not task.done():
+                outcomes[name] = TIMEOUT
+            elif task.cancelled():
+                outcomes[name] = CANCELLED
+            elif task.exception() is not None:
+                outcomes[name] = f"error: {task.exception()}"
+            else:
+                outcomes[name] = DONE
+        return outcomes
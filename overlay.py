@@ -0,0 +1,150 @@
+"""
+Blocking overlay for FitBlock sessions.
+
+The overlay window is built once, kept withdrawn between sessions and only
+shown, reset and hidden again when a session runs, so locking the screen
+does not pay for creating a Tk interpreter, window and fonts every hour.
+Drawing goes through a renderer: TkRenderer is the real fullscreen window,
+HeadlessRenderer runs the countdown on a clock without any window.
+
+Sessions run on the orchestrator's event loop, so Tk's own mainloop never
+runs: the countdown awaits its next tick and the window processes its
+pending events and redraws right after each one.
+"""
+
+
+class TkRenderer:
+    """Fullscreen black Tk window with the countdown and an info line."""
+
+    def __init__(self, tk=None):
+        self.tk = tk  # the tkinter module; imported on the first create() if not given
+        self.root = None
+        self.label = None
+        self.info_label = None
+        self.windows_created = 0
+
+    def create(self):
+        if self.tk is None:
+            import tkinter
+            self.tk = tkinter
+        root = self.tk.Tk()
+        root.withdraw()
+        root.attributes('-fullscreen', True)
+        root.configure(bg='black')
+        root.overrideredirect(True)
+
+        self.label = self.tk.Label(root, text="", font=("Helvetica", 48), fg="white", bg="black")
+        self.label.pack(expand=True)
+        self.info_label = self.tk.Label(root, text="", font=("Helvetica", 16), fg="#888888", bg="black")
+        self.info_label.pack(side='bottom', pady=20)
+
+        root.protocol("WM_DELETE_WINDOW", lambda: None)
+        self.root = root
+        self.windows_created += 1
+
+    def set_timer_text(self, text):
+        self.label.config(text=text)
+
+    def set_info_text(self, text):
+        self.info_label.config(text=text)
+
+    def show(self):
+        root = self.root
+        root.deiconify()
+        root.attributes('-topmost', True)
+        root.lift()
+        root.focus_force()
+        root.grab_set()
+
+    def hide(self):
+        self.root.grab_release()
+        self.root.withdraw()
+        self.root.update()
+
+    async def run(self, first_delay, tick, on_visible=None):
+        """Call tick() on its own schedule until it returns None, updating the window after each."""
+        import asyncio
+        root = self.root
+        if first_delay is None:
+            return
+        root.update()
+        if on_visible is not None:
+            on_visible()
+        delay = first_delay
+        while delay is not None:
+            await asyncio.sleep(delay / 1000)
+            delay = tick()
+            root.update()
+
+    def destroy(self):
+        if self.root is not None:
+            self.root.destroy()
+            self.root = None
+
+
+class HeadlessRenderer:
+    """Renderer without a window: the countdown sleeps on a clock between ticks."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.timer_text = ""
+        self.info_text = ""
+        self.visible = False
+        self.windows_created = 0
+
+    def create(self):
+        self.windows_created += 1
+
+    def set_timer_text(self, text):
+        self.timer_text = text
+
+    def set_info_text(self, text):
+        self.info_text = text
+
+    def show(self):
+        self.visible = True
+
+    def hide(self):
+        self.visible = False
+
+    async def run(self, first_delay, tick, on_visible=None):
+        if on_visible is not None:
+            on_visible()
+        delay = first_delay
+        while delay is not None:
+            await self.clock.sleep(delay / 1000)
+            delay = tick()
+
+    def destroy(self):
+        pass
+
+
+class OverlayManager:
+    """Show the overlay for a session, creating the window once (or per session if not persistent)."""
+
+    def __init__(self, renderer, persistent=True):
+        self.renderer = renderer
+        self.persistent = persistent
+        self.sessions = 0
+        self._ready = False
+
+    def prepare(self):
+        """Create the hidden window ahead of the first session."""
+        if not self._ready:
+            self.renderer.create()
+            self._ready = True
+
+    async def run_session(self, countdown, on_visible=None):
+        """Show the overlay until countdown has finished."""
+        self.prepare()
+        self.sessions += 1
+        # Render the first tick before showing, so the last session's text never flashes up.
+        first_delay = countdown.start()
+        self.renderer.show()
+        try:
+            await self.renderer.run(first_delay, countdown.tick, on_visible)
+        finally:
+            self.renderer.hide()
+            if not self.persistent:
+                self.renderer.destroy()
+                self._ready = False
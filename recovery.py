@@ -0,0 +1,118 @@
+"""
+Crash-recovery journal for FitBlock sessions.
+
+Before a session changes anything outside the process, the journal records
+what is about to change: the session start and the snapshot of the hotkeys
+being disabled. The journal is removed once teardown has put everything
+back, so finding one at startup means the last session was killed before it
+could clean up, and exactly the recorded changes need to be undone.
+"""
+
+import contextlib
+import os
+import plistlib
+import tempfile
+import time
+
+
+class RecoveryJournal:
+    """Small fsync'd plist describing the changes made by the running session."""
+
+    def __init__(self, path, owner=None):
+        self.path = path
+        self.owner = owner  # (uid, gid) to hand the file to when written as root
+        self._entry = None
+
+    def begin(self, start):
+        """Record that a session started at start (Unix time)."""
+        self._entry = {'pid': os.getpid(), 'start': start, 'shortcuts': {}}
+        self._write()
+
+    def record_shortcuts(self, snapshot):
+        """Record the hotkey snapshot; called before the hotkeys are written."""
+        if self._entry is None:
+            self.begin(time.time())
+        # plist dictionaries cannot hold None, so "had no entry" is stored as False.
+        self._entry['shortcuts'] = {key: False if value is None else value
+                                    for key, value in snapshot.items()}
+        self._write()
+
+    def shortcuts_restored(self):
+        """Forget the hotkey snapshot once the hotkeys are back."""
+        if self._entry is not None and self._entry['shortcuts']:
+            self._entry['shortcuts'] = {}
+            self._write()
+
+    def end(self):
+        """The session is over and recorded; keep the journal only if hotkeys are still changed."""
+        if self._entry is not None and self._entry['shortcuts']:
+            self._entry['start'] = 0.0
+            self._write()
+        else:
+            self.clear()
+
+    def clear(self):
+        """Remove the journal."""
+        self._entry = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def pending(self):
+        """Return the journal left by a crashed session, or None.
+
+        A journal whose process is still alive belongs to a running FitBlock
+        and is not reported.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                entry = plistlib.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, plistlib.InvalidFileException, ValueError) as e:
+            print(f"Ignoring unreadable recovery journal: {e}")
+            return {'pid': 0, 'start': None, 'shortcuts': {}, 'ended': self._mtime()}
+
+        pid = entry.get('pid', 0)
+        if pid and pid != os.getpid() and _process_alive(pid):
+            return None
+        entry['shortcuts'] = {key: None if value is False else value
+                              for key, value in entry.get('shortcuts', {}).items()}
+        entry['ended'] = self._mtime()
+        return entry
+
+    def _mtime(self):
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return 0.0
+
+    def _write(self):
+        # The helper writes this as root into the user's home directory, so
+        # the temporary file must be a fresh one (mkstemp uses O_EXCL and
+        # never follows a planted symlink) and is chowned through its fd.
+        directory, name = os.path.split(self.path)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory or ".")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                plistlib.dump(self._entry, f, fmt=plistlib.FMT_BINARY)
+                f.flush()
+                os.fsync(f.fileno())
+                if self.owner is not None:
+                    os.fchown(f.fileno(), *self.owner)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+            raise
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,146 @@
+"""
+Wall-clock aligned session scheduler.
+
+Sessions fire at every local wall-clock boundary (by default each full hour).
+Between sessions the scheduler task awaits a single timed wait for the
+next boundary, so an idle FitBlock does not wake up at all. The wait is
+measured on the monotonic clock and re-checked against the wall clock
+whenever it ends, which corrects drift and clock changes; system wake and
+clock-change notifications can interrupt the wait early via reschedule().
+The scheduler runs as a task on the orchestrator's loop; stop(),
+reschedule() and trigger_now() may be called from any thread.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+from clock import wait_for_event
+
+
+def next_boundary(now_wall, interval):
+    """Return the first local-time multiple of interval (from midnight) after now_wall."""
+    local = datetime.fromtimestamp(now_wall)
+    midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed = (local - midnight).total_seconds()
+    periods = int(elapsed // interval) + 1
+    return (midnight + timedelta(seconds=periods * interval)).timestamp()
+
+
+class SessionScheduler:
+    """Await run_session() at every wall-clock boundary, one session at a time."""
+
+    def __init__(self, run_session, interval=3600, late_grace=60.0, tolerance=0.01,
+                 wall_clock=time.time, monotonic=time.monotonic, wait=wait_for_event, prepare=None):
+        self.run_session = run_session
+        self.interval = interval
+        self.late_grace = late_grace
+        self.tolerance = tolerance
+        self.wall_clock = wall_clock
+        self.monotonic = monotonic
+        self.wait = wait
+        self.prepare = prepare
+
+        self.next_fire = None
+        self.fired = 0
+        self.skipped = 0
+        self.wakeups = 0
+
+        self._event = None
+        self._loop = None
+        self._lock = threading.Lock()
+        self._trigger = False
+        self._stopped = False
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+        self._wake()
+
+    def reschedule(self):
+        """Re-check the wall clock now (after system wake or a clock change)."""
+        self._wake()
+
+    def trigger_now(self):
+        """Start a session as soon as the current one (if any) has finished."""
+        with self._lock:
+            self._trigger = True
+        self._wake()
+
+    def _wake(self):
+        """Interrupt the current wait, from whichever thread."""
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._event.set)
+            except RuntimeError:
+                pass  # the loop has just closed
+
+    async def run(self):
+        """Scheduler loop, awaiting run_session() at each boundary; returns after stop()."""
+        import asyncio
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        try:
+            await self._run()
+        finally:
+            self._loop = None
+
+    async def _run(self):
+        if self.prepare is not None:
+            # Per-thread setup, e.g. creating the overlay window on the thread that will show it.
+            self.prepare()
+        while True:
+            self.next_fire = next_boundary(self.wall_clock(), self.interval)
+            reason = await self._wait_until(self.next_fire)
+            if reason is None:
+                return
+
+            if reason == 'boundary':
+                lateness = self.wall_clock() - self.next_fire
+                if lateness > self.late_grace:
+                    # Woke up long after the boundary (system sleep, session overrun).
+                    self.skipped += 1
+                    print(f"Skipping session scheduled {lateness:.0f}s ago")
+                    continue
+
+            self.next_fire = None
+            self.fired += 1
+            try:
+                await self.run_session()
+            except Exception as e:
+                print(f"Error running session: {e}")
+
+    async def _wait_until(self, target_wall):
+        """Sleep until target_wall; returns 'boundary', 'trigger' or None when stopped."""
+        deadline = None
+        while True:
+            with self._lock:
+                if self._stopped:
+                    return None
+                if self._trigger:
+                    self._trigger = False
+                    return 'trigger'
+
+            if deadline is None:
+                # Anchor the monotonic deadline to the wall clock.
+                drift = target_wall - self.wall_clock()
+                if drift > self.interval:
+                    # The wall clock jumped backwards past a whole period.
+                    target_wall = next_boundary(self.wall_clock(), self.interval)
+                    self.next_fire = target_wall
+                    drift = target_wall - self.wall_clock()
+                if drift <= self.tolerance:
+                    return 'boundary'
+                deadline = self.monotonic() + drift
+
+            remaining = deadline - self.monotonic()
+            if remaining > 0:
+                notified = await self.wait(self._event, remaining)
+                self.wakeups += 1
+                if not notified:
+                    continue
+                self._event.clear()
+
+            # Timer expired or someone called reschedule(): re-check the wall clock.
+            deadline = None
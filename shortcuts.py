@@ -0,0 +1,149 @@
+"""
+Batched disable/restore of macOS symbolic hotkeys.
+
+The hotkeys domain is read once, the entries FitBlock is about to touch are
+snapshotted, and every change is applied in a single write. Restoring puts
+back exactly the snapshotted entries, so hotkeys the user had disabled on
+their own stay disabled.
+"""
+
+import copy
+import os
+import plistlib
+import subprocess
+
+HOTKEYS_DOMAIN = "com.apple.symbolichotkeys"
+HOTKEYS_KEY = "AppleSymbolicHotKeys"
+
+SHORTCUTS_TO_DISABLE = (
+    "52",  # Spotlight
+    "60",  # Spotlight menu
+    "61",  # Spotlight window
+    "64",  # Spotlight
+    "65",  # Spotlight
+    "98",  # Mission Control
+    "32",  # Mission Control F3
+    "34",  # Application windows F10
+    "162",  # Move focus to menu bar
+    "163",  # Move focus to dock
+)
+
+
+class DefaultsStore:
+    """Read and write the hotkeys domain through one `defaults` call each way."""
+
+    def __init__(self, domain=HOTKEYS_DOMAIN):
+        self.domain = domain
+        self.spawns = 0
+
+    def load(self):
+        self.spawns += 1
+        result = subprocess.run(["defaults", "export", self.domain, "-"],
+                                check=True, capture_output=True)
+        return plistlib.loads(result.stdout) if result.stdout.strip() else {}
+
+    def save(self, data):
+        self.spawns += 1
+        subprocess.run(["defaults", "import", self.domain, "-"],
+                       input=plistlib.dumps(data), check=True, capture_output=True)
+
+    def reload(self):
+        self.spawns += 1
+        subprocess.run(["killall", "SystemUIServer"], check=True, capture_output=True)
+
+
+class PlistFileStore:
+    """Read and write the hotkeys from a plain plist file (used off macOS)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.reloads = 0
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'rb') as f:
+            return plistlib.load(f)
+
+    def save(self, data):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            plistlib.dump(data, f, fmt=plistlib.FMT_BINARY)
+        os.replace(tmp_path, self.path)
+
+    def reload(self):
+        self.reloads += 1
+
+
+class ShortcutManager:
+    """Disable a set of symbolic hotkeys and restore them from a snapshot."""
+
+    def __init__(self, store, shortcut_ids=SHORTCUTS_TO_DISABLE):
+        self.store = store
+        self.shortcut_ids = tuple(shortcut_ids)
+        self.snapshot = None
+        self._document = None
+
+    def disable(self, before_save=None):
+        """Disable the shortcuts in one write; returns the snapshot of what changed.
+
+        The snapshot maps each changed hotkey id to its original entry, or to
+        None if the hotkey had no entry (i.e. was using the system default).
+        before_save(snapshot) is called before anything is written, so the
+        snapshot can be journaled for crash recovery.
+        """
+        data = self.store.load()
+        hotkeys = data.setdefault(HOTKEYS_KEY, {})
+
+        snapshot = {}
+        for shortcut in self.shortcut_ids:
+            entry = hotkeys.get(shortcut)
+            if entry is not None and not entry.get('enabled', True):
+                continue
+
+            snapshot[shortcut] = copy.deepcopy(entry)
+            if entry is None:
+                entry = {'value': {'parameters': [], 'type': 'standard'}}
+            else:
+                entry = dict(entry)
+            entry['enabled'] = False
+            hotkeys[shortcut] = entry
+
+        # Kept before writing: if the write lands but the reload fails,
+        # restore() must still know what to put back.
+        self.snapshot = snapshot
+        self._document = data
+        if snapshot:
+            if before_save is not None:
+                before_save(snapshot)
+            self.store.save(data)
+            self.store.reload()
+        return snapshot
+
+    def restore(self, snapshot=None):
+        """Put back the entries recorded in snapshot (defaults to the last disable()).
+
+        Restoring the manager's own snapshot reuses the document written by
+        disable(); an explicit snapshot (e.g. from a crashed run) reloads it.
+        """
+        data = None
+        if snapshot is None:
+            snapshot = self.snapshot
+            data = self._document
+        self.snapshot = None
+        self._document = None
+        if not snapshot:
+            return False
+
+        if data is None:
+            data = self.store.load()
+        hotkeys = data.setdefault(HOTKEYS_KEY, {})
+        for shortcut, original in snapshot.items():
+            if original is None:
+                hotkeys.pop(shortcut, None)
+            else:
+                hotkeys[shortcut] = original
+
+        self.store.save(data)
+        self.store.reload()
+        return True
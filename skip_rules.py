@@ -0,0 +1,446 @@
+"""
+Calendar and quiet-hours rules for skipping sessions.
+
+Busy time comes from local .ics exports. Each file is parsed once per
+modification time, streaming one VEVENT at a time, and its recurring events
+are expanded only over a window around the current time. The resulting
+intervals are merged into a sorted index, so "is this moment busy" and "when
+is the next free moment" are binary searches. Quiet hours are daily
+time-of-day ranges and are checked arithmetically.
+
+Rules are configured in a small JSON file:
+
+    {
+        "calendars": ["~/Calendars/work.ics"],
+        "quiet_hours": ["22:00-07:00", "12:30-13:15"]
+    }
+"""
+
+import bisect
+import json
+import os
+from collections import namedtuple
+from datetime import date, datetime, time as dtime, timedelta, timezone
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+    ZoneInfoNotFoundError = KeyError
+
+EXPAND_BEFORE = timedelta(days=1)
+EXPAND_AFTER = timedelta(days=14)
+MAX_OCCURRENCES = 100000  # per recurring event, guards against runaway rules
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+
+CalendarEvent = namedtuple('CalendarEvent', ['uid', 'start', 'end', 'rrule', 'exdates', 'recurrence_id'])
+
+
+# -- parsing ---------------------------------------------------------------
+
+def unfold(lines):
+    """Join RFC 5545 folded continuation lines, yielding one logical line at a time."""
+    current = None
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def parse_property(line):
+    """Split 'NAME;PARAM=x:value' into (name, params, value)."""
+    head, _, value = line.partition(":")
+    name, *params = head.split(";")
+    return name.upper(), dict(param.split("=", 1) for param in params if "=" in param), value
+
+
+def parse_datetime(value, params):
+    """Parse a DATE or DATE-TIME value; all-day dates come back as date objects."""
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.strptime(value, "%Y%m%d").date()
+    if value.endswith("Z"):
+        return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+    parsed = datetime.strptime(value, "%Y%m%dT%H%M%S")
+    tzid = params.get("TZID")
+    if tzid and ZoneInfo is not None:
+        try:
+            return parsed.replace(tzinfo=ZoneInfo(tzid.strip('"')))
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return parsed  # floating time: local wall clock
+
+
+def parse_duration(value):
+    """Parse an RFC 5545 DURATION such as PT1H30M or P1D."""
+    sign = -1 if value.startswith("-") else 1
+    value = value.lstrip("+-").lstrip("P")
+    total = timedelta()
+    number = ""
+    in_time = False
+    for char in value:
+        if char == "T":
+            in_time = True
+        elif char.isdigit():
+            number += char
+        else:
+            amount = int(number or 0)
+            number = ""
+            if char == "W":
+                total += timedelta(weeks=amount)
+            elif char == "D":
+                total += timedelta(days=amount)
+            elif char == "H" and in_time:
+                total += timedelta(hours=amount)
+            elif char == "M" and in_time:
+                total += timedelta(minutes=amount)
+            elif char == "S" and in_time:
+                total += timedelta(seconds=amount)
+    return sign * total
+
+
+def parse_ics(lines):
+    """Stream the busy timed events of an iCalendar file.
+
+    Cancelled, transparent (free) and all-day events are left out: an
+    all-day entry is usually a reminder or a holiday, not a meeting.
+    A malformed event is reported and skipped; the rest of the file is
+    still used.
+    """
+    event = None
+    error = None
+    for line in unfold(lines):
+        if line == "BEGIN:VEVENT":
+            event = {'exdates': []}
+            error = None
+            continue
+        if event is None:
+            continue
+        if line == "END:VEVENT":
+            parsed = None
+            if error is None:
+                try:
+                    parsed = _finish_event(event)
+                except (ValueError, TypeError, OverflowError) as e:
+                    error = e
+            if error is not None:
+                print(f"Skipping calendar event {event.get('UID', '(no UID)')}: {error}")
+            event = None
+            if parsed is not None:
+                yield parsed
+            continue
+        if error is not None:
+            continue
+
+        try:
+            name, params, value = parse_property(line)
+            if name in ("DTSTART", "DTEND", "RECURRENCE-ID"):
+                event[name] = parse_datetime(value, params)
+            elif name == "EXDATE":
+                event['exdates'].extend(parse_datetime(v, params) for v in value.split(",") if v)
+            elif name in ("UID", "RRULE", "DURATION", "STATUS", "TRANSP"):
+                event[name] = value.strip()
+        except ValueError as e:
+            error = e
+
+
+def _finish_event(event):
+    """CalendarEvent for a parsed VEVENT, or None if it is not busy time.
+
+    Raises ValueError or TypeError for events that cannot be expanded, such
+    as a floating DTSTART with a zoned DTEND or a non-numeric COUNT.
+    """
+    start = event.get("DTSTART")
+    if not isinstance(start, datetime):
+        return None
+    if event.get("STATUS", "").upper() == "CANCELLED" or event.get("TRANSP", "").upper() == "TRANSPARENT":
+        return None
+
+    end = event.get("DTEND")
+    if not isinstance(end, datetime):
+        end = start + parse_duration(event["DURATION"]) if "DURATION" in event else start
+    if end <= start:
+        return None
+
+    rrule = None
+    if "RRULE" in event:
+        rrule = dict(part.split("=", 1) for part in event["RRULE"].split(";") if "=" in part)
+        _check_rrule(rrule)
+    return CalendarEvent(event.get("UID"), start, end, rrule, frozenset(_instant(d) for d in event['exdates']),
+                         event.get("RECURRENCE-ID"))
+
+
+def _check_rrule(rule):
+    """Raise ValueError if occurrences() could not read INTERVAL, COUNT or UNTIL."""
+    int(rule.get("INTERVAL", "1"))
+    int(rule.get("COUNT", "0"))
+    if "UNTIL" in rule:
+        parse_datetime(rule["UNTIL"], {})
+
+
+def _instant(value):
+    """Unix time of a datetime; naive values are local time."""
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime.combine(value, dtime())
+    return value.timestamp()
+
+
+# -- recurrence expansion ----------------------------------------------------
+
+def occurrences(event, window_start, window_end):
+    """Yield (start, end) Unix times of event's occurrences overlapping the window."""
+    duration = event.end - event.start
+    if event.rrule is None:
+        start = _instant(event.start)
+        end = _instant(event.end)
+        if end > window_start and start < window_end:
+            yield start, end
+        return
+
+    rule = event.rrule
+    freq = rule.get("FREQ", "").upper()
+    interval = max(1, int(rule.get("INTERVAL", "1")))
+    count = int(rule["COUNT"]) if "COUNT" in rule else None
+    until = _instant(parse_datetime(rule["UNTIL"], {})) if "UNTIL" in rule else None
+
+    if freq == "DAILY":
+        steps = _stepped(event.start, timedelta(days=interval))
+    elif freq == "WEEKLY":
+        days = [WEEKDAYS[d[-2:]] for d in rule.get("BYDAY", "").split(",") if d[-2:] in WEEKDAYS]
+        steps = _weekly(event.start, interval, sorted(days) or [event.start.weekday()])
+    elif freq == "MONTHLY" and "BYDAY" not in rule:
+        steps = _monthly(event.start, interval)
+    elif freq == "YEARLY" and "BYDAY" not in rule:
+        steps = _monthly(event.start, 12 * interval)
+    else:
+        # Rules this parser does not understand still block their first occurrence.
+        steps = iter([event.start])
+
+    for index, current in enumerate(steps):
+        if (count is not None and index >= count) or index >= MAX_OCCURRENCES:
+            return
+        start = _instant(current)
+        if until is not None and start > until:
+            return
+        if start >= window_end:
+            return
+        end = _instant(current + duration)
+        if end > window_start and start not in event.exdates:
+            yield start, end
+
+
+def _stepped(start, step):
+    current = start
+    while True:
+        yield current
+        current += step
+
+
+def _weekly(start, interval, weekdays):
+    week = start - timedelta(days=start.weekday())
+    while True:
+        for weekday in weekdays:
+            current = week + timedelta(days=weekday)
+            if current >= start:
+                yield current
+        week += timedelta(weeks=interval)
+
+
+def _monthly(start, months):
+    index = 0
+    while True:
+        month = start.month - 1 + index * months
+        year = start.year + month // 12
+        try:
+            yield start.replace(year=year, month=month % 12 + 1)
+        except ValueError:
+            pass  # e.g. the 31st in a shorter month
+        index += 1
+
+
+# -- index -----------------------------------------------------------------
+
+class IntervalIndex:
+    """Sorted, merged busy intervals with binary-search queries."""
+
+    def __init__(self, intervals):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def busy_until(self, t):
+        """End of the busy interval containing t, or None if t is free."""
+        i = bisect.bisect_right(self.starts, t) - 1
+        if i >= 0 and t < self.ends[i]:
+            return self.ends[i]
+        return None
+
+    def next_free(self, t):
+        """First free moment at or after t (merged intervals never touch)."""
+        end = self.busy_until(t)
+        return t if end is None else end
+
+    def next_busy(self, t):
+        """Start of the first busy interval after t, or None."""
+        i = bisect.bisect_right(self.starts, t)
+        return self.starts[i] if i < len(self.starts) else None
+
+
+class CalendarSource:
+    """One .ics file, parsed once per modification and indexed around the current time."""
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        self.parses = 0
+        self.builds = 0
+        self._stamp = None
+        self._events = []
+        self._index = None
+        self._window = (0.0, 0.0)
+
+    def index(self, t):
+        """Interval index covering t, re-parsing only if the file changed."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self._stamp = None
+            self._events = []
+            self._index = IntervalIndex([])
+            return self._index
+
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != self._stamp:
+            # Stamped even if parsing fails, so a broken file is reported once, not every session.
+            self._stamp = stamp
+            self._index = None
+            self.parses += 1
+            try:
+                self._events = self._parse()
+            except (OSError, ValueError, TypeError, OverflowError) as e:
+                print(f"Ignoring calendar {self.path}: {e}")
+                self._events = []
+
+        # Only re-expand recurrences once t leaves the window (with a day of slack).
+        if self._index is None or not (self._window[0] <= t <= self._window[1] - EXPAND_BEFORE.total_seconds()):
+            self._window = (t - EXPAND_BEFORE.total_seconds(), t + EXPAND_AFTER.total_seconds())
+            self._index = IntervalIndex(
+                interval for event in self._events for interval in self._occurrences(event))
+            self.builds += 1
+        return self._index
+
+    def _occurrences(self, event):
+        try:
+            return list(occurrences(event, *self._window))
+        except (ValueError, TypeError, OverflowError) as e:
+            print(f"Skipping calendar event {event.uid} in {self.path}: {e}")
+            return []
+
+    def _parse(self):
+        events = []
+        overridden = {}
+        with open(self.path, encoding="utf-8", errors="replace") as f:
+            for event in parse_ics(f):
+                events.append(event)
+                if event.recurrence_id is not None:
+                    overridden.setdefault(event.uid, set()).add(_instant(event.recurrence_id))
+        if not overridden:
+            return events
+        # A RECURRENCE-ID event replaces one occurrence of its series.
+        return [event._replace(exdates=event.exdates | overridden[event.uid])
+                if event.rrule and event.uid in overridden else event
+                for event in events]
+
+
+class QuietHours:
+    """Daily time-of-day ranges ("22:00-07:00") during which sessions are skipped."""
+
+    def __init__(self, ranges):
+        self.ranges = []
+        for text in ranges:
+            first, last = (datetime.strptime(part.strip(), "%H:%M").time() for part in text.split("-"))
+            self.ranges.append((first, last))
+
+    def quiet_until(self, t):
+        """End of the quiet range containing t (Unix time), or None."""
+        now = datetime.fromtimestamp(t)
+        for first, last in self.ranges:
+            today_first = datetime.combine(now.date(), first)
+            today_last = datetime.combine(now.date(), last)
+            if first <= last:
+                if today_first <= now < today_last:
+                    return today_last.timestamp()
+            elif now >= today_first:
+                return (today_last + timedelta(days=1)).timestamp()
+            elif now < today_last:
+                return today_last.timestamp()
+        return None
+
+
+class SkipRules:
+    """Decide whether a session should be skipped, from a JSON rules file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.calendars = []
+        self.quiet_hours = QuietHours([])
+        self._stamp = None
+
+    def _reload(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self._stamp = None
+            self.calendars = []
+            self.quiet_hours = QuietHours([])
+            return
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return
+        self._stamp = stamp
+        try:
+            with open(self.path) as f:
+                config = json.load(f)
+            known = {source.path: source for source in self.calendars}
+            self.calendars = [known.get(os.path.expanduser(path)) or CalendarSource(path)
+                              for path in config.get("calendars", [])]
+            self.quiet_hours = QuietHours(config.get("quiet_hours", []))
+        except (OSError, ValueError) as e:
+            print(f"Error loading skip rules from {self.path}: {e}")
+            self.calendars = []
+            self.quiet_hours = QuietHours([])
+
+    def check(self, t):
+        """Return (reason, until) if a session at Unix time t should be skipped, else None."""
+        self._reload()
+        until = self.quiet_hours.quiet_until(t)
+        if until is not None:
+            return "quiet hours", until
+        for source in self.calendars:
+            until = source.index(t).busy_until(t)
+            if until is not None:
+                return "calendar event", until
+        return None
+
+    def next_free(self, t):
+        """First moment at or after t when no rule applies."""
+        self._reload()
+        for _ in range(1000):
+            skip = self.check(t)
+            if skip is None:
+                return t
+            t = skip[1]
+        return t
@@ -0,0 +1,95 @@
+"""
+Thread-safe, versioned application state with change subscriptions.
+
+FitBlock's state is touched from the session thread, the AppKit main thread
+and the Tk countdown. StateStore serializes every change behind one lock,
+bumps a version number per committed change and tells subscribers what
+changed, so consumers can react instead of polling.
+"""
+
+import threading
+from contextlib import contextmanager
+
+
+class StateStore:
+    """Dict-like state container with atomic updates and change notifications."""
+
+    def __init__(self, initial):
+        self._lock = threading.RLock()
+        self._data = dict(initial)
+        self._version = 0
+        self._snapshot = (0, dict(self._data))
+        self._subscribers = []
+
+    @property
+    def version(self):
+        return self._version
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def snapshot(self):
+        """Return (version, dict) for a consistent view of the state.
+
+        The dict is shared between callers of the same version and must not
+        be modified.
+        """
+        with self._lock:
+            if self._snapshot[0] != self._version:
+                self._snapshot = (self._version, dict(self._data))
+            return self._snapshot
+
+    def update(self, values=None, **fields):
+        """Atomically apply several fields at once."""
+        changes = dict(values or {}, **fields)
+        with self.transaction() as state:
+            state.update(changes)
+
+    @contextmanager
+    def transaction(self):
+        """Yield a draft of the state; it is committed atomically when the block exits.
+
+        Use this for read-modify-write changes such as incrementing a counter.
+        """
+        with self._lock:
+            draft = dict(self._data)
+            yield draft
+            changed = {key for key, value in draft.items()
+                       if key not in self._data or self._data[key] != value}
+            if not changed:
+                return
+            self._data = draft
+            self._version += 1
+            version = self._version
+            subscribers = list(self._subscribers)
+
+        self._notify(subscribers, changed, version)
+
+    def subscribe(self, callback):
+        """Call callback(changed_keys, version) after every committed change.
+
+        Callbacks run on the thread that made the change, outside the lock.
+        Returns a function that removes the subscription.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def _notify(self, subscribers, changed, version):
+        for callback in subscribers:
+            try:
+                callback(changed, version)
+            except Exception as e:
+                print(f"Error in state subscriber: {e}")
@@ -0,0 +1,158 @@
+"""
+Background writer for the FitBlock state file.
+
+Snapshots submitted in quick succession are coalesced into a single write,
+and every write goes through a temporary file that is fsynced and atomically
+renamed over the target, so a crash never leaves a half-written state file.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class StateWriter:
+    """Coalesce state snapshots and write them atomically off the caller's thread."""
+
+    def __init__(self, path, delay=0.5, monotonic=time.monotonic, inline=False):
+        self.path = path
+        self.delay = delay
+        self.monotonic = monotonic
+        # Write on the submitting thread instead of a writer thread, timing
+        # the debounce on monotonic: for the simulation, whose virtual clock
+        # a writer thread waiting in real time would never see move.
+        self.inline = inline
+        self.writes = 0
+        self.bytes_written = 0
+
+        self._cond = threading.Condition()
+        self._pending = None
+        self._last_submit = 0.0
+        self._submitted = 0
+        self._written = 0
+        self._flush_requested = False
+        self._closed = False
+        self._thread = None
+
+    def submit(self, data):
+        """Queue a JSON-serializable snapshot; only the newest pending one is written."""
+        with self._cond:
+            if self._closed:
+                self._write(data)
+                return
+            if self.inline and self._pending is not None and \
+                    self.monotonic() - self._last_submit >= self.delay:
+                self._write_pending()
+            self._pending = data
+            self._submitted += 1
+            self._last_submit = self.monotonic()
+            if self.inline:
+                return
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="StateWriter", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self, timeout=5.0):
+        """Write any pending snapshot now and wait for it to reach disk."""
+        if self.inline:
+            with self._cond:
+                self._write_pending()
+            return True
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            target = self._submitted
+            if self._written >= target:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._written < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._thread.is_alive():
+                    break
+                self._cond.wait(remaining)
+            self._flush_requested = False
+            return self._written >= target
+
+    def close(self, timeout=5.0):
+        """Flush pending data and stop the writer thread."""
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        return flushed
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+
+                # Debounce: keep absorbing submits until things go quiet.
+                while not (self._flush_requested or self._closed):
+                    remaining = self._last_submit + self.delay - self.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                data = self._pending
+                generation = self._submitted
+                self._pending = None
+
+            try:
+                self._write(data)
+            except Exception as e:
+                print(f"Error saving state: {e}")
+
+            with self._cond:
+                self._written = generation
+                self._cond.notify_all()
+
+    def _write_pending(self):
+        """Write the pending snapshot on this thread (inline writers only)."""
+        if self._pending is None:
+            return
+        data, self._pending = self._pending, None
+        try:
+            self._write(data)
+        except Exception as e:
+            print(f"Error saving state: {e}")
+        self._written = self._submitted
+
+    def _write(self, data):
+        payload = json.dumps(data, indent=2).encode("utf-8")
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(
+            prefix="." + os.path.basename(self.path) + ".", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                os.fchmod(f.fileno(), 0o644)
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            dir_fd = None
+        if dir_fd is not None:
+            try:
+                os.fsync(dir_fd)
+            except OSError:
+                pass
+            finally:
+                os.close(dir_fd)
+
+        self.writes += 1
+        self.bytes_written += len(payload)
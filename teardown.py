@@ -0,0 +1,42 @@
+"""
+Bounded-time teardown for FitBlock sessions.
+
+Restore steps (stopping the event tap and putting the shortcuts back) are
+independent, so they run concurrently and the whole teardown is bounded by
+one deadline instead of the sum of every subprocess call. State is not a step
+here: StateWriter persists it on its own thread. Steps
+run on daemon threads rather than an executor: a step stuck past the deadline
+must not keep the process alive at exit.
+"""
+
+import threading
+import time
+
+OK = "ok"
+TIMEOUT = "timeout"
+
+
+def run_steps(steps, deadline):
+    """Run (name, function) steps concurrently, waiting at most deadline seconds.
+
+    Returns {name: "ok" | "timeout" | "error: ..."} in step order.
+    """
+    results = {name: TIMEOUT for name, _ in steps}
+    threads = []
+
+    for name, function in steps:
+        def run(name=name, function=function):
+            try:
+                function()
+                results[name] = OK
+            except Exception as e:
+                results[name] = f"error: {e}"
+
+        thread = threading.Thread(target=run, name=f"Teardown-{name}", daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    end = time.monotonic() + deadline
+    for thread in threads:
+        thread.join(max(0.0, end - time.monotonic()))
+    return dict(results)
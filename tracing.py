@@ -0,0 +1,140 @@
+"""
+Span tracing for FitBlock sessions.
+
+Spans are recorded as Chrome trace events and written to one JSON file per
+session, which can be opened in chrome://tracing or https://ui.perfetto.dev.
+When tracing is disabled, span() returns a shared no-op context manager, so
+instrumented code only pays for an attribute check and an empty with-block.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+MAX_EVENTS = 100000
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args = dict(self.args, error=exc_type.__name__)
+        self.tracer._record("X", self.name, self.start, end - self.start, self.args)
+        return False
+
+
+class Tracer:
+    """Collect spans and write them out as Chrome trace-event JSON per session."""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.enabled = directory is not None
+        self.files_written = 0
+        self._events = deque(maxlen=MAX_EVENTS)
+        self._thread_names = {}
+        self._session = None
+
+    def enable(self, directory):
+        """Start tracing into directory."""
+        self.directory = directory
+        self.enabled = True
+
+    def span(self, name, **args):
+        """Context manager timing the enclosed block."""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, args)
+
+    def complete(self, name, seconds, **args):
+        """Record a span that just ended after the given duration."""
+        if self.enabled:
+            duration = int(seconds * 1e9)
+            self._record("X", name, time.perf_counter_ns() - duration, duration, args)
+
+    def instant(self, name, **args):
+        """Record a point-in-time marker."""
+        if self.enabled:
+            self._record("i", name, time.perf_counter_ns(), None, args)
+
+    def _record(self, phase, name, start_ns, duration_ns, args):
+        thread = threading.current_thread()
+        tid = thread.ident
+        if tid not in self._thread_names:
+            self._thread_names[tid] = thread.name
+        event = {"name": name, "ph": phase, "ts": start_ns / 1000, "pid": os.getpid(), "tid": tid}
+        if duration_ns is not None:
+            event["dur"] = duration_ns / 1000
+        else:
+            event["s"] = "t"
+        if args:
+            event["args"] = args
+        self._events.append(event)
+
+    def begin_session(self, **metadata):
+        """Mark the start of a session; its trace file covers events since the previous one."""
+        if self.enabled:
+            self._session = {"start_ns": time.perf_counter_ns(), "started": datetime.now(), **metadata}
+
+    def mark_locked(self):
+        """Record the moment the screen is locked, for time-to-lock tracking."""
+        if self.enabled and self._session is not None and "locked_ns" not in self._session:
+            self._session["locked_ns"] = time.perf_counter_ns()
+            self.instant("screen_locked")
+
+    def end_session(self):
+        """Write the collected events to a trace file and return its path."""
+        if not self.enabled or self._session is None:
+            return None
+        session, self._session = self._session, None
+
+        events = []
+        while self._events:
+            events.append(self._events.popleft())
+        pid = os.getpid()
+        for tid, name in list(self._thread_names.items()):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+
+        started = session.pop("started")
+        start_ns = session.pop("start_ns")
+        locked_ns = session.pop("locked_ns", None)
+        other = dict(session, started=started.isoformat())
+        if locked_ns is not None:
+            other["time_to_lock_ms"] = round((locked_ns - start_ns) / 1e6, 3)
+
+        path = os.path.join(self.directory, f"fitblock-{started:%Y%m%d-%H%M%S}.trace.json")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, "w") as f:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": other}, f)
+        except OSError as e:
+            print(f"Error writing trace: {e}")
+            return None
+        self.files_written += 1
+        return path
@@ -0,0 +1,281 @@
+"""
+Upload of FitBlock session records to a fleet collector.
+
+submit() only appends the record to an in-memory queue and wakes the
+uploader thread, so the session that just ended never waits on the disk or
+the network. The thread appends queued records to an on-disk spool
+(newline-delimited JSON) and POSTs them in gzip-compressed batches, oldest
+first, advancing an acknowledged offset after every accepted batch. A failed
+upload (network error, 5xx, 408 or 429) is retried with exponential backoff,
+while a batch the collector rejects outright with another 4xx is logged and
+dropped; a laptop that was offline for a week catches up in a few large
+batches.
+
+Every record carries an ID derived from the machine and the session start,
+so a batch that is sent again after a lost response is deduplicated by the
+collector (see collector.py) instead of being counted twice.
+"""
+
+import json
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+
+RECORD_NAMESPACE = uuid.UUID("5d9a3d1e-6f0b-4c55-9a57-1f8e0f6b2c41")
+
+
+class SessionUploader:
+    """Spool session records on disk and ship them to endpoint in batches."""
+
+    def __init__(self, endpoint, spool_dir, batch_size=500, timeout=10.0,
+                 backoff=5.0, max_backoff=900.0):
+        self.endpoint = endpoint
+        self.spool_dir = spool_dir
+        self.spool_path = os.path.join(spool_dir, "sessions.jsonl")
+        self.offset_path = os.path.join(spool_dir, "uploaded")
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.machine_id = None
+        self.host = socket.gethostname()
+        self.wakeups = 0
+        self.batches = 0
+        self.uploaded = 0
+        self.failures = 0
+        self.rejected = 0
+        self.bytes_sent = 0
+        self.spool_writes = 0
+        self.bytes_written = 0
+
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._closed = False
+        self._thread = None
+        self._file_lock = threading.Lock()
+        self._offset = 0
+        self._unsent = False
+        self._retry_at = None
+        self._attempts = 0
+
+    def start(self):
+        """Open the spool and start the uploader thread; pending records are sent straight away."""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.machine_id = self._load_machine_id()
+        self._repair()
+        self._offset = self._load_offset()
+        with self._cond:
+            self._unsent = self._spooled_size() > self._offset
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="SessionUploader", daemon=True)
+                self._thread.start()
+
+    def record_id(self, start):
+        """Stable ID of the session that started at start on this machine."""
+        return str(uuid.uuid5(RECORD_NAMESPACE, f"{self.machine_id}/{start!r}"))
+
+    def submit(self, start, end, planned, aborted):
+        """Queue a finished session for upload; never blocks on the spool or the network."""
+        record = {
+            'id': self.record_id(start),
+            'machine': self.machine_id,
+            'host': self.host,
+            'start': start,
+            'end': end,
+            'planned': planned,
+            'actual': end - start,
+            'aborted': bool(aborted),
+        }
+        with self._cond:
+            self._queue.append(record)
+            self._cond.notify()
+
+    def pending(self):
+        """Records queued or spooled but not yet accepted by the collector."""
+        with self._file_lock:
+            try:
+                with open(self.spool_path, "rb") as f:
+                    f.seek(self._offset)
+                    spooled = sum(1 for _ in f)
+            except OSError:
+                spooled = 0
+        with self._cond:
+            return spooled + len(self._queue)
+
+    def close(self, timeout=2.0):
+        """Spool whatever is still queued and stop the thread, without waiting for uploads."""
+        with self._cond:
+            self._closed = True
+            records = list(self._queue)
+            self._queue.clear()
+            self._cond.notify()
+        if records:
+            self._spool(records)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # -- uploader thread -----------------------------------------------------
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed and not self._upload_due():
+                    timeout = None if self._retry_at is None else max(0.0, self._retry_at - time.monotonic())
+                    self._cond.wait(timeout)
+                records = list(self._queue)
+                self._queue.clear()
+                closed = self._closed
+            self.wakeups += 1
+
+            if records:
+                self._spool(records)
+            if closed:
+                return
+            if self._upload_due():
+                self._upload_pending()
+
+    def _upload_due(self):
+        return self._unsent and (self._retry_at is None or time.monotonic() >= self._retry_at)
+
+    def _upload_pending(self):
+        """Send spooled batches until the spool is empty, an upload fails, or close() is called."""
+        while not self._closed:
+            batch, end = self._read_batch()
+            if not batch:
+                with self._cond:
+                    self._unsent = False
+                self._compact()
+                return
+            try:
+                self._post(batch)
+            except Exception as e:
+                status = getattr(e, 'code', None)  # set on urllib.error.HTTPError
+                if status is not None and 400 <= status < 500 and status not in (408, 429):
+                    # The collector will never take this batch; retrying it
+                    # would only hold up everything spooled behind it.
+                    print(f"Collector rejected {len(batch)} sessions, dropping them: {e}")
+                    self.rejected += len(batch)
+                    self._attempts = 0
+                    self._retry_at = None
+                    self._store_offset(end)
+                    continue
+                self.failures += 1
+                self._attempts += 1
+                delay = min(self.max_backoff, self.backoff * 2 ** (self._attempts - 1))
+                delay *= random.uniform(0.5, 1.0)
+                self._retry_at = time.monotonic() + delay
+                print(f"Could not upload {len(batch)} sessions, retrying in {delay:.1f}s: {e}")
+                return
+            self._attempts = 0
+            self._retry_at = None
+            self.batches += 1
+            self.uploaded += len(batch)
+            self._store_offset(end)
+
+    def _post(self, lines):
+        import gzip
+        import urllib.request
+
+        body = gzip.compress(b"".join(lines), compresslevel=6)
+        request = urllib.request.Request(self.endpoint, data=body, method="POST", headers={
+            'Content-Type': "application/x-ndjson",
+            'Content-Encoding': "gzip",
+            'User-Agent': "FitBlock",
+        })
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+        self.bytes_sent += len(body)
+
+    # -- spool ---------------------------------------------------------------
+
+    def _spool(self, records):
+        payload = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records).encode()
+        with self._file_lock:
+            try:
+                with open(self.spool_path, "ab") as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                print(f"Error spooling sessions for upload: {e}")
+                return
+            self.spool_writes += 1
+            self.bytes_written += len(payload)
+        with self._cond:
+            self._unsent = True
+
+    def _spooled_size(self):
+        try:
+            return os.path.getsize(self.spool_path)
+        except OSError:
+            return 0
+
+    def _read_batch(self):
+        """Up to batch_size complete lines after the acknowledged offset, and the offset after them."""
+        with self._file_lock:
+            try:
+                with open(self.spool_path, "rb") as f:
+                    f.seek(self._offset)
+                    lines = []
+                    for line in f:
+                        lines.append(line)
+                        if len(lines) >= self.batch_size:
+                            break
+            except OSError:
+                return [], self._offset
+        return lines, self._offset + sum(len(line) for line in lines)
+
+    def _compact(self):
+        """Empty the spool once everything in it has been accepted."""
+        with self._file_lock:
+            if self._offset and self._spooled_size() == self._offset:
+                with open(self.spool_path, "wb"):
+                    pass
+                self._write_offset(0)
+
+    def _repair(self):
+        """Drop a record left half-written by a crash, so the spool ends on a full line."""
+        try:
+            with open(self.spool_path, "rb+") as f:
+                data = f.read()
+                if data and not data.endswith(b"\n"):
+                    f.truncate(data.rfind(b"\n") + 1)
+        except OSError:
+            pass
+
+    def _store_offset(self, offset):
+        with self._file_lock:
+            self._write_offset(offset)
+
+    def _write_offset(self, offset):
+        fd, tmp_path = tempfile.mkstemp(prefix=".uploaded.", suffix=".tmp", dir=self.spool_dir)
+        with os.fdopen(fd, "w") as f:
+            f.write(str(offset))
+        os.replace(tmp_path, self.offset_path)
+        self._offset = offset
+
+    def _load_offset(self):
+        try:
+            with open(self.offset_path) as f:
+                offset = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+        return min(offset, self._spooled_size())
+
+    def _load_machine_id(self):
+        path = os.path.join(self.spool_dir, "machine_id")
+        try:
+            with open(path) as f:
+                return str(uuid.UUID(f.read().strip()))
+        except (OSError, ValueError):
+            pass
+        machine_id = str(uuid.uuid4())
+        with open(path, "w") as f:
+            f.write(machine_id + "\n")
+        return machine_id
@@ -1,85 +1,527 @@
 #!/usr/bin/env python3
 """
 Script to verify the app bundle has the correct icon and structure.
+
+It also checks that every file in the bundle is the one that was built, in
+plain Python and without codesign, so it runs on Linux as well:
+
+- Info.plist is read with plistlib and has to name an executable and an icon
+  that are in the bundle.
+- The main executable's code signature seals Info.plist and
+  _CodeSignature/CodeResources, and CodeResources seals everything else:
+  resources by SHA-256 or SHA-1, symlinks by their target, and nested code
+  (extension modules, Python3.framework) by the cdhash of its own signature.
+  The page hashes in each signature are checked against the file as well.
+- Unsigned bundles are checked against a JSON manifest instead, written with
+  --write-manifest from a bundle that is known to be good.
+
+Files are hashed on a thread pool. The hashes are cached by path, size and
+mtime in ~/.fitblock_verify_cache.json, so verifying an unchanged bundle again
+only has to stat its files.
 """
 
+import argparse
+import hashlib
+import json
 import os
-import subprocess
+import plistlib
+import re
+import struct
 import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_APP = "dist/FitBlock.app"
+CACHE_FILE = os.path.expanduser("~/.fitblock_verify_cache.json")
+REQUIRED_KEYS = ["CFBundleExecutable", "CFBundleIdentifier", "CFBundleName", "CFBundlePackageType"]
+
+# Mach-O and code signature constants (mach-o/loader.h, fat.h and Security's cscdefs.h).
+MH_MAGIC = 0xfeedface
+MH_MAGIC_64 = 0xfeedfacf
+FAT_MAGIC = 0xcafebabe
+FAT_MAGIC_64 = 0xcafebabf
+LC_CODE_SIGNATURE = 0x1d
+CSMAGIC_EMBEDDED_SIGNATURE = 0xfade0cc0
+CSMAGIC_CODEDIRECTORY = 0xfade0c02
+CS_HASH_TYPES = {1: hashlib.sha1, 2: hashlib.sha256, 3: hashlib.sha256, 4: hashlib.sha384}
+SLOT_INFO_PLIST = 1
+SLOT_RESOURCES = 3
+
+
+class HashCache:
+    """Digests of files keyed by path, reused while their size and mtime stay the same."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.bytes_hashed = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        if path:
+            try:
+                with open(path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def digest(self, path, kind):
+        """'sha256' or 'sha1' hex digest of path, or 'code': its code signature (see code_signature)."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry['stamp'] == stamp and kind in entry:
+                self.hits += 1
+                return entry[kind]
+
+        value = code_signature(path) if kind == "code" else file_digest(path, kind)
+        with self._lock:
+            self.misses += 1
+            self.bytes_hashed += st.st_size
+            entry = self._entries.get(path)
+            if entry is None or entry['stamp'] != stamp:
+                entry = self._entries[path] = {'stamp': stamp}
+            entry[kind] = value
+            self._dirty = True
+        return value
+
+    def save(self):
+        """Write the cache atomically, dropping files that no longer exist."""
+        if not self.path or not self._dirty:
+            return
+        entries = {path: entry for path, entry in self._entries.items() if os.path.exists(path)}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".fitblock_verify_cache.", suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️  Could not save hash cache: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._dirty = False
+
+
+def file_digest(path, kind):
+    digest = hashlib.new(kind)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_signature(path):
+    """Read and check the embedded code signature of a Mach-O file.
+
+    Returns {'directories': [...], 'pages_ok': bool} with one entry per code
+    directory in every architecture: its hash type, the cdhash, and the hashes
+    of the special slots (Info.plist, CodeResources, ...). pages_ok is whether
+    every code page hashes to what its code directory says. A file that is not
+    Mach-O or not signed gives {'error': reason}.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < 8:
+        return {'error': "not a Mach-O file"}
+
+    magic = struct.unpack_from(">I", data)[0]
+    if magic in (FAT_MAGIC, FAT_MAGIC_64):
+        count = struct.unpack_from(">I", data, 4)[0]
+        fmt, size = (">IIQQI", 32) if magic == FAT_MAGIC_64 else (">IIIII", 20)
+        slices = [struct.unpack_from(fmt, data, 8 + i * size)[2:4] for i in range(count)]
+    else:
+        slices = [(0, len(data))]
+
+    directories = []
+    pages_ok = True
+    for offset, length in slices:
+        try:
+            found, ok = _slice_signature(memoryview(data)[offset:offset + length])
+        except (ValueError, struct.error) as e:
+            return {'error': str(e)}
+        directories.extend(found)
+        pages_ok = pages_ok and ok
+    return {'directories': directories, 'pages_ok': pages_ok}
+
+
+def _slice_signature(image):
+    magic = struct.unpack_from("<I", image)[0]
+    if magic not in (MH_MAGIC, MH_MAGIC_64):
+        raise ValueError("not a Mach-O file")
+    ncmds = struct.unpack_from("<I", image, 16)[0]
+    offset = 32 if magic == MH_MAGIC_64 else 28
+    for _ in range(ncmds):
+        cmd, cmdsize = struct.unpack_from("<II", image, offset)
+        if cmd == LC_CODE_SIGNATURE:
+            dataoff, datasize = struct.unpack_from("<II", image, offset + 8)
+            break
+        offset += cmdsize
+    else:
+        raise ValueError("not signed")
+
+    blob = image[dataoff:dataoff + datasize]
+    magic, _, count = struct.unpack_from(">III", blob)
+    if magic != CSMAGIC_EMBEDDED_SIGNATURE:
+        raise ValueError("malformed code signature")
+
+    directories = []
+    pages_ok = True
+    for i in range(count):
+        _, blob_offset = struct.unpack_from(">II", blob, 12 + 8 * i)
+        magic, length = struct.unpack_from(">II", blob, blob_offset)
+        if magic != CSMAGIC_CODEDIRECTORY:
+            continue
+        directory = blob[blob_offset:blob_offset + length]
+        (hash_offset, n_special, n_code, code_limit,
+         hash_size, hash_type, page_shift) = struct.unpack_from(">16xI4xIIIBBxB", directory)
+        hash_function = CS_HASH_TYPES.get(hash_type)
+        if hash_function is None:
+            raise ValueError(f"unknown hash type {hash_type}")
+
+        page = 1 << page_shift if page_shift else code_limit
+        for slot in range(n_code):
+            start = slot * page
+            expected = directory[hash_offset + slot * hash_size:hash_offset + (slot + 1) * hash_size]
+            if hash_function(image[start:min(start + page, code_limit)]).digest()[:hash_size] != expected:
+                pages_ok = False
+                break
+
+        special = {}
+        for slot in range(1, n_special + 1):
+            value = bytes(directory[hash_offset - slot * hash_size:hash_offset - (slot - 1) * hash_size])
+            if any(value):
+                special[str(slot)] = value.hex()
+        directories.append({
+            'hash_type': hash_function().name,
+            'hash_size': hash_size,
+            'cdhash': hash_function(directory).digest()[:20].hex(),
+            'special': special,
+        })
+    if not directories:
+        raise ValueError("no code directory")
+    return directories, pages_ok
+
+
+def matching_rule(path, rules):
+    """The CodeResources rule that applies to path: the matching one with the highest weight."""
+    best, best_weight = None, -1.0
+    for pattern, rule in rules.items():
+        weight = rule.get('weight', 1.0) if isinstance(rule, dict) else 1.0
+        if weight > best_weight and re.search(pattern, path):
+            best, best_weight = (rule if isinstance(rule, dict) else {}), weight
+    return best
+
+
+def bundle_layout(path):
+    """(root, executable, Info.plist, CodeResources) of a nested .framework, .app or .bundle."""
+    if os.path.isdir(os.path.join(path, "Versions")):
+        root = os.path.realpath(os.path.join(path, "Versions", "Current"))
+        info = os.path.join(root, "Resources", "Info.plist")
+        executable_dir = root
+    else:
+        root = os.path.join(path, "Contents")
+        info = os.path.join(root, "Info.plist")
+        executable_dir = os.path.join(root, "MacOS")
+    try:
+        with open(info, "rb") as f:
+            name = plistlib.load(f).get('CFBundleExecutable')
+    except (OSError, plistlib.InvalidFileException):
+        name = None
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    return root, os.path.join(executable_dir, name), info, os.path.join(root, "_CodeSignature", "CodeResources")
+
+
+class BundleVerifier:
+    """Check a bundle against its code signature or a manifest, hashing files in parallel."""
+
+    def __init__(self, cache, workers=None):
+        self.cache = cache
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 2)
+        self.problems = []
+        self.sealed = 0
+        self._jobs = []
+        self._checks = []
+
+    def verify_signature(self, app_path, executable):
+        """Queue checks for the signed bundle at app_path and everything it seals."""
+        contents = os.path.join(app_path, "Contents")
+        self._plan_signed(contents, executable, os.path.join(contents, "Info.plist"),
+                          os.path.join(contents, "_CodeSignature", "CodeResources"), label="")
+        return self.run()
+
+    def verify_manifest(self, app_path, manifest):
+        """Queue checks for every file in a manifest written by write_manifest()."""
+        listed = manifest['files']
+        for relpath, entry in listed.items():
+            path = os.path.join(app_path, relpath)
+            if 'symlink' in entry:
+                self._checks.append(("symlink", relpath, path, entry['symlink']))
+            else:
+                self._jobs.append((path, "sha256"))
+                self._checks.append(("sha256", relpath, path, entry['sha256']))
+        for relpath in walk_bundle(app_path):
+            if relpath not in listed:
+                self.problems.append(f"{relpath}: not in the manifest")
+        return self.run()
+
+    def run(self):
+        """Hash everything that was queued on the thread pool, then evaluate the checks."""
+        jobs = [job for job in dict.fromkeys(self._jobs) if os.path.isfile(job[0])]
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="Verify") as pool:
+            list(pool.map(lambda job: self.cache.digest(*job), jobs))
+        for check in self._checks:
+            self._evaluate(*check)
+        self._jobs, self._checks = [], []
+        return not self.problems
 
-def verify_app_bundle():
-    """Verify the app bundle structure and icon."""
-    app_path = "dist/FitBlock.app"
-    
+    def _plan_signed(self, root, executable, info_plist, code_resources, label):
+        try:
+            with open(code_resources, "rb") as f:
+                resources = plistlib.load(f)
+        except (OSError, plistlib.InvalidFileException) as e:
+            self.problems.append(f"{label}_CodeSignature/CodeResources: {e}")
+            return
+
+        self._jobs += [(executable, "code"), (info_plist, "sha256"), (code_resources, "sha256")]
+        self._checks.append(("seals", label + os.path.relpath(executable, root), executable,
+                             {SLOT_INFO_PLIST: info_plist, SLOT_RESOURCES: code_resources}))
+
+        files = resources.get('files2', {})
+        rules = resources.get('rules2', {})
+        nested = set()
+        for relpath, entry in files.items():
+            path = os.path.join(root, relpath)
+            name = label + relpath
+            if not isinstance(entry, dict):
+                entry = {'hash': entry}
+            if 'symlink' in entry:
+                self._checks.append(("symlink", name, path, entry['symlink']))
+            elif 'cdhash' in entry:
+                if os.path.isdir(path) and not os.path.islink(path):
+                    # A nested framework or bundle, sealed by its own signature.
+                    nested.add(relpath)
+                    layout = bundle_layout(path)
+                    self._plan_signed(*layout, label=name + "/")
+                    self._checks.append(("code", name, layout[1], entry['cdhash'].hex()))
+                else:
+                    self._jobs.append((path, "code"))
+                    self._checks.append(("code", name, path, entry['cdhash'].hex()))
+            elif 'hash2' in entry:
+                self._jobs.append((path, "sha256"))
+                self._checks.append(("sha256", name, path, entry['hash2'].hex(), entry.get('optional')))
+            elif 'hash' in entry:
+                self._jobs.append((path, "sha1"))
+                self._checks.append(("sha1", name, path, entry['hash'].hex(), entry.get('optional')))
+
+        # Everything else in the bundle has to be sealed too, unless a rule omits it.
+        skip = {os.path.relpath(executable, root), os.path.relpath(info_plist, root)}
+        for relpath in walk_bundle(root, prune=nested):
+            if relpath in files or relpath in skip or relpath.startswith("_CodeSignature/"):
+                continue
+            rule = matching_rule(relpath, rules)
+            if rule is None or not rule.get('omit'):
+                self.problems.append(f"{label}{relpath}: not sealed by the code signature")
+
+    def _evaluate(self, kind, name, path, expected, optional=False):
+        if kind == "symlink":
+            if not os.path.islink(path):
+                self.problems.append(f"{name}: expected a symlink to {expected}")
+            elif os.readlink(path) != expected:
+                self.problems.append(f"{name}: links to {os.readlink(path)}, expected {expected}")
+            else:
+                self.sealed += 1
+            return
+
+        if not os.path.isfile(path):
+            if not optional:
+                self.problems.append(f"{name}: missing")
+            return
+
+        if kind in ("sha256", "sha1"):
+            if self.cache.digest(path, kind) != expected:
+                self.problems.append(f"{name}: contents changed ({kind} mismatch)")
+            else:
+                self.sealed += 1
+            return
+
+        signature = self.cache.digest(path, "code")
+        if 'error' in signature:
+            self.problems.append(f"{name}: {signature['error']}")
+            return
+        if not signature['pages_ok']:
+            self.problems.append(f"{name}: code pages don't match its signature")
+            return
+
+        if kind == "code":
+            if expected not in {d['cdhash'] for d in signature['directories']}:
+                self.problems.append(f"{name}: signature changed (cdhash mismatch)")
+                return
+        else:  # "seals": the signature must cover these files as they are now
+            for slot, sealed_path in expected.items():
+                if not any(self._sealed(d, slot, sealed_path) for d in signature['directories']):
+                    self.problems.append(f"{name}: {os.path.basename(sealed_path)} changed since signing")
+                    return
+        self.sealed += 1
+
+    def _sealed(self, directory, slot, path):
+        expected = directory['special'].get(str(slot))
+        if expected is None or not os.path.isfile(path):
+            return False
+        actual = self.cache.digest(path, directory['hash_type'])
+        return actual[:directory['hash_size'] * 2] == expected
+
+
+def walk_bundle(root, prune=()):
+    """Relative paths of the files and symlinks under root, skipping the directories in prune."""
+    for directory, dirs, files in os.walk(root):
+        relative = os.path.relpath(directory, root)
+        prefix = "" if relative == "." else relative + "/"
+        for name in list(dirs):
+            if prefix + name in prune:
+                dirs.remove(name)
+            elif os.path.islink(os.path.join(directory, name)):
+                yield prefix + name
+        for name in files:
+            yield prefix + name
+
+
+def write_manifest(app_path, output, cache, workers=None):
+    """Write a JSON manifest of every file in the bundle (SHA-256 and size) and every symlink."""
+    relpaths = list(walk_bundle(app_path))
+    files = {}
+    paths = {}
+    for relpath in relpaths:
+        path = os.path.join(app_path, relpath)
+        if os.path.islink(path):
+            files[relpath] = {'symlink': os.readlink(path)}
+        else:
+            paths[relpath] = path
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 2)) as pool:
+        digests = pool.map(lambda path: cache.digest(path, "sha256"), paths.values())
+        for (relpath, path), digest in zip(paths.items(), digests):
+            files[relpath] = {'sha256': digest, 'size': os.path.getsize(path)}
+    with open(output, "w") as f:
+        json.dump({'files': dict(sorted(files.items()))}, f, indent=1)
+    print(f"✓ Manifest of {len(files)} entries written to {output}")
+
+
+def verify_app_bundle(app_path=DEFAULT_APP):
+    """Verify the app bundle structure and icon; returns Info.plist, or None if it's broken."""
     if not os.path.exists(app_path):
-        print("✗ App bundle not found: dist/FitBlock.app")
-        return False
-    
+        print(f"✗ App bundle not found: {app_path}")
+        return None
+
     print(f"✓ App bundle found: {app_path}")
-    
+
     # Check app bundle structure
     contents_path = os.path.join(app_path, "Contents")
     if not os.path.exists(contents_path):
         print("✗ App bundle missing Contents directory")
-        return False
-    
+        return None
+
     # Check Info.plist
     info_plist = os.path.join(contents_path, "Info.plist")
-    if not os.path.exists(info_plist):
+    try:
+        with open(info_plist, "rb") as f:
+            info = plistlib.load(f)
+    except FileNotFoundError:
         print("✗ App bundle missing Info.plist")
-        return False
-    
+        return None
+    except plistlib.InvalidFileException as e:
+        print(f"✗ Could not read Info.plist: {e}")
+        return None
+
+    missing = [key for key in REQUIRED_KEYS if not info.get(key)]
+    if missing:
+        print(f"✗ Info.plist is missing {', '.join(missing)}")
+        return None
+
     # Check executable
-    macos_path = os.path.join(contents_path, "MacOS")
-    if not os.path.exists(macos_path):
-        print("✗ App bundle missing MacOS directory")
-        return False
-    
-    executable = os.path.join(macos_path, "FitBlock")
-    if not os.path.exists(executable):
-        print("✗ App bundle missing FitBlock executable")
-        return False
-    
+    executable = os.path.join(contents_path, "MacOS", info['CFBundleExecutable'])
+    if not os.path.isfile(executable):
+        print(f"✗ App bundle missing {info['CFBundleExecutable']} executable")
+        return None
+    with open(executable, "rb") as f:
+        magic = f.read(4)
+    if len(magic) == 4 and (struct.unpack("<I", magic)[0] in (MH_MAGIC, MH_MAGIC_64)
+                            or struct.unpack(">I", magic)[0] in (FAT_MAGIC, FAT_MAGIC_64)):
+        print("✓ App bundle is a valid macOS application")
+    else:
+        print("⚠️  App bundle may not be a valid macOS application")
+
     print("✓ App bundle structure is correct")
-    
-    # Check if icon is included
-    resources_path = os.path.join(contents_path, "Resources")
-    if os.path.exists(resources_path):
-        icon_in_resources = os.path.join(resources_path, "icon.icns")
-        if os.path.exists(icon_in_resources):
-            print("✓ Icon found in app bundle resources")
-        else:
-            print("⚠️  Icon not found in app bundle resources")
-    
-    # Check app icon using file command
-    try:
-        result = subprocess.run(["file", app_path], capture_output=True, text=True)
-        if "Mach-O" in result.stdout:
-            print("✓ App bundle is a valid macOS application")
-        else:
-            print("⚠️  App bundle may not be a valid macOS application")
-    except Exception as e:
-        print(f"⚠️  Could not verify app bundle type: {e}")
-    
-    # Check if icon is set in Info.plist
+
+    # Check that the icon is set in Info.plist and included
+    icon_file = info.get('CFBundleIconFile')
+    if not icon_file:
+        print("⚠️  No icon specified in Info.plist")
+    elif os.path.exists(os.path.join(contents_path, "Resources", icon_file)):
+        print(f"✓ App icon set to: {icon_file}")
+    else:
+        print(f"⚠️  Icon {icon_file} not found in app bundle resources")
+
+    return info
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify FitBlock.app's structure and contents.")
+    parser.add_argument("app", nargs="?", default=DEFAULT_APP)
+    parser.add_argument("--manifest", help="check against this manifest instead of the code signature")
+    parser.add_argument("--write-manifest", metavar="FILE", help="write a manifest of the bundle and exit")
+    parser.add_argument("--cache", default=CACHE_FILE, help=f"hash cache (default {CACHE_FILE})")
+    parser.add_argument("--no-cache", action="store_true", help="hash every file again")
+    parser.add_argument("--workers", type=int, help="hashing threads")
+    args = parser.parse_args(argv)
+
+    cache = HashCache(None if args.no_cache else args.cache)
+    start = time.perf_counter()
     try:
-        result = subprocess.run([
-            "defaults", "read", info_plist, "CFBundleIconFile"
-        ], capture_output=True, text=True)
-        if result.returncode == 0:
-            icon_file = result.stdout.strip()
-            print(f"✓ App icon set to: {icon_file}")
+        if args.write_manifest:
+            write_manifest(args.app, args.write_manifest, cache, args.workers)
+            return True
+
+        info = verify_app_bundle(args.app)
+        if info is None:
+            return False
+
+        verifier = BundleVerifier(cache, args.workers)
+        code_resources = os.path.join(args.app, "Contents", "_CodeSignature", "CodeResources")
+        if args.manifest:
+            with open(args.manifest) as f:
+                ok = verifier.verify_manifest(args.app, json.load(f))
+            source = f"manifest {args.manifest}"
+        elif os.path.exists(code_resources):
+            executable = os.path.join(args.app, "Contents", "MacOS", info['CFBundleExecutable'])
+            ok = verifier.verify_signature(args.app, executable)
+            source = "code signature"
         else:
-            print("⚠️  No icon specified in Info.plist")
-    except Exception as e:
-        print(f"⚠️  Could not read Info.plist: {e}")
-    
-    return True
+            print("✗ App bundle is not signed; pass --manifest to check its contents")
+            return False
+    finally:
+        cache.save()
+
+    elapsed = time.perf_counter() - start
+    for problem in verifier.problems[:50]:
+        print(f"✗ {problem}")
+    if len(verifier.problems) > 50:
+        print(f"✗ ... and {len(verifier.problems) - 50} more")
+    status = "✓" if ok else "✗"
+    print(f"{status} {verifier.sealed} entries match the {source}, {len(verifier.problems)} problems "
+          f"({cache.misses} files, {cache.bytes_hashed / 1e6:.1f} MB hashed, {elapsed * 1000:.0f} ms)")
+    return ok
+
 
 if __name__ == "__main__":
-    success = verify_app_bundle()
+    success = main()
     if success:
         print("\n✓ App bundle verification completed!")
     else:
         print("\n✗ App bundle verification failed!")
-    sys.exit(0 if success else 1) 
\ No newline at end of file
+    sys.exit(0 if success else 1)